@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+"""
+Keystroke-latency benchmarks. Replays a key stream headlessly over a synthetic file and
+reports latency percentiles per operation and peak memory as JSON, so results from
+different versions can be compared.
+
+    python benchmark.py --lines 100000 --line-length 80 --keys 5000 -o results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import region
+from model import WindowedLines
+from headless import HeadlessDriver, batch_category, synthetic_text, synthetic_keys, load_keys
+from phonemes import PHONEME_DICT, PhonemeEnums, Phoneme, phoneme_key
+
+RESULTS_VERSION = 1
+
+def percentiles(samples:list[float]) -> dict:
+    """Summarises latencies in seconds as microsecond percentiles."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    def at(fraction:float) -> float:
+        return round(ordered[min(int(fraction*len(ordered)), len(ordered)-1)]*1e6, 2)
+    return {
+        "count": len(ordered),
+        "mean_us": round(sum(ordered)/len(ordered)*1e6, 2),
+        "p50_us": at(0.5),
+        "p90_us": at(0.9),
+        "p99_us": at(0.99),
+        "max_us": round(ordered[-1]*1e6, 2),
+    }
+
+def timed(function, repeat:int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter()-start)
+    return samples
+
+def phoneme_lookups(count:int, seed:int=0) -> list[float]:
+    """Times InputPhoneme.update_phonemes plus the panel text over random phoneme words."""
+    from dict_phoneme_interpreter import DictPhonemeInterpreter
+    from input_phoneme import InputPhoneme
+    rng = random.Random(seed)
+    codes = sorted(PHONEME_DICT)
+    interpreter = DictPhonemeInterpreter()
+    interpreter.preload()
+    input_phoneme = InputPhoneme(interpreter=interpreter)
+    samples = []
+    while len(samples) < count:
+        for code in rng.sample(codes, rng.randint(1, 5)):
+            for char in code:
+                start = time.perf_counter()
+                input_phoneme.update_phonemes(char)
+                input_phoneme.get_panel_text()
+                samples.append(time.perf_counter()-start)
+        input_phoneme.complete()
+    return samples
+
+class EnumPhoneme:
+    """Phoneme as it was before it had slots and a code, for comparison."""
+    def __init__(self, phoneme:PhonemeEnums, capitalized:bool=False):
+        self.phoneme = phoneme
+        self.capitalized = capitalized
+
+def phoneme_keys(count:int, seed:int=0) -> dict:
+    """Compares building and looking up dictionary keys from tuples of PhonemeEnums members
+    against byte strings of phoneme codes, and the size of a phoneme object of each kind."""
+    rng = random.Random(seed)
+    members = list(PhonemeEnums)
+    sequences = [[rng.choice(members) for _ in range(rng.randint(1, 8))] for _ in range(count)]
+    old = [[EnumPhoneme(member) for member in sequence] for sequence in sequences]
+    new = [[Phoneme(member) for member in sequence] for sequence in sequences]
+    old_dict = {tuple(p.phoneme for p in phonemes): True for phonemes in old[::2]}
+    new_dict = {phoneme_key(phonemes): True for phonemes in new[::2]}
+    def old_lookups():
+        for phonemes in old:
+            old_dict.get(tuple(p.phoneme for p in phonemes))
+    def new_lookups():
+        for phonemes in new:
+            new_dict.get(phoneme_key(phonemes))
+    return {
+        "enum_tuple_lookup": percentiles([t/count for t in timed(old_lookups, 5)]),
+        "byte_key_lookup": percentiles([t/count for t in timed(new_lookups, 5)]),
+        "enum_phoneme_bytes": sys.getsizeof(old[0][0]) + sys.getsizeof(old[0][0].__dict__),
+        "slotted_phoneme_bytes": sys.getsizeof(new[0][0]),
+    }
+
+def run_benchmarks(lines:int=10000, line_length:int=80, key_count:int=2000, keys:list[int]=None,
+                   repeat:int=5, window_size:tuple[int, int]=(50, 120), dictionary:bool=True, seed:int=0,
+                   batches:list[list[int]]=None) -> dict:
+    """Replays batches, as recorded by nick --record-keys, or else keys, or synthetic keys,
+    one key per batch as typed."""
+    if batches is None:
+        batches = [[key] for key in (keys if keys is not None else synthetic_keys(key_count, seed))]
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "bench.txt")
+        with open(filename, "wb") as f:
+            f.write(synthetic_text(lines, line_length, seed))
+        model = WindowedLines(filename=filename, window_size=window_size)
+        results = {
+            "read_file": percentiles(timed(model.read_file, repeat)),
+            "print_window": percentiles(timed(model.print_window, repeat*10)),
+        }
+
+        by_category:dict[str, list[float]] = {}
+        handled_batches = []
+        renders = []
+        def on_batch(batch:list[int], handled:float, rendered:float):
+            by_category.setdefault(batch_category(batch), []).append(handled)
+            handled_batches.append(handled)
+            renders.append(rendered)
+        HeadlessDriver(model).replay(batches, on_batch)
+        for category, samples in sorted(by_category.items()):
+            results[category] = percentiles(samples)
+        results["batch"] = percentiles(handled_batches)
+        results["view_update"] = percentiles(renders)
+        results["write_file"] = percentiles(timed(model.write_file, repeat))
+
+        model = WindowedLines(filename=filename, window_size=window_size)
+        model.read_file()
+        model.set_mark()
+        model.end_of_buffer()
+        results["region_indent"] = percentiles(timed(lambda: region.indent(model), repeat))
+
+        results["phoneme_keys"] = phoneme_keys(min(key_count, 20000), seed)
+        if dictionary:
+            try:
+                results["phoneme_lookup"] = percentiles(phoneme_lookups(min(key_count, 2000), seed))
+            except FileNotFoundError as e:
+                results["phoneme_lookup"] = {"count": 0, "skipped": str(e)}
+
+        tracemalloc.start()
+        model = WindowedLines(filename=filename, window_size=window_size)
+        model.read_file()
+        HeadlessDriver(model).replay(batches)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "version": RESULTS_VERSION,
+        "config": {"lines": lines, "line_length": line_length, "keys": sum(map(len, batches)), "batches": len(batches), "repeat": repeat,
+                   "window_size": list(window_size), "seed": seed},
+        "python": platform.python_version(),
+        "results": results,
+        "peak_traced_bytes": peak,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def main(argv:list[str]=None):
+    parser = argparse.ArgumentParser(description="Benchmark editor hot paths headlessly.")
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--line-length", type=int, default=80)
+    parser.add_argument("--keys", type=int, default=2000, help="number of synthetic keys to replay")
+    parser.add_argument("--keys-file", help="replay keys recorded with nick --record-keys instead")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-dictionary", action="store_true", help="skip the phoneme lookup benchmark")
+    parser.add_argument("-o", "--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+    results = run_benchmarks(lines=args.lines, line_length=args.line_length, key_count=args.keys,
+                             batches=load_keys(args.keys_file) if args.keys_file else None,
+                             repeat=args.repeat, dictionary=not args.no_dictionary)
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
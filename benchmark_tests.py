@@ -0,0 +1,64 @@
+import curses
+import json
+import os
+import tempfile
+import unittest
+from model import WindowedLines, PASTE_START, PASTE_END
+from controller import Controller
+from headless import HeadlessDriver, HeadlessWindow, batch_category, synthetic_keys, load_keys
+from benchmark import percentiles, run_benchmarks
+
+class BenchmarkTest(unittest.TestCase):
+    def test_percentiles(self):
+        stats = percentiles([i/1e6 for i in range(1, 101)])
+        assert stats["count"] == 100
+        assert stats["p50_us"] == 51
+        assert stats["p99_us"] == 100
+        assert stats["max_us"] == 100
+        assert percentiles([]) == {"count": 0}
+
+    def test_replay(self):
+        model = WindowedLines(filename="", window_size=(4, 10))
+        driver = HeadlessDriver(model)
+        seen = []
+        driver.replay([[ord("h"), ord("i"), 10], [ord("x")], [curses.KEY_BACKSPACE, curses.KEY_UP]],
+                      lambda batch, handled, rendered: seen.append(batch_category(batch)))
+        assert seen == ["insert", "insert", "mixed"]
+        assert driver.window.lines[0].rstrip() == "hi"
+        assert (model.cursor_row, model.cursor_position) == (0, 0)
+        assert len(model.history.undo_stack) == 3
+
+    def test_replay_paste_batch(self):
+        model = WindowedLines(filename="", window_size=(4, 10))
+        HeadlessDriver(model).replay([PASTE_START + [ord("a"), 10, ord("b")] + PASTE_END])
+        assert model.get_curr_line() == "b" and model.buffer.get_line(0) == "a"
+        assert len(model.history.undo_stack) == 1
+
+    def test_recorded_keys(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "keys.jsonl")
+            model = WindowedLines(filename="", window_size=(4, 10))
+            window = HeadlessWindow(4, 11, keys=[ord("a"), ord("b")])
+            with open(path, "w") as key_log:
+                controller = Controller(model=model, view=HeadlessDriver(model).view, window=window, key_log=key_log)
+                controller.record_keys(controller.read_keys())
+                controller.record_keys([ord("c")])
+            assert load_keys(path) == [[ord("a"), ord("b")], [ord("c")]]
+
+    def test_run_benchmarks(self):
+        keys = synthetic_keys(200)
+        assert len(keys) == 200
+        results = run_benchmarks(lines=200, line_length=40, keys=keys, repeat=2, dictionary=False)
+        json.dumps(results)
+        assert results["config"]["keys"] == results["config"]["batches"] == 200
+        for name in ("read_file", "write_file", "print_window", "insert", "batch", "view_update", "region_indent"):
+            assert results["results"][name]["count"] > 0
+        assert results["peak_traced_bytes"] > 0
+        keys = results["results"]["phoneme_keys"]
+        assert keys["byte_key_lookup"]["count"] == keys["enum_tuple_lookup"]["count"] == 5
+        assert keys["slotted_phoneme_bytes"] < keys["enum_phoneme_bytes"]
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -0,0 +1,193 @@
+"""
+A compact, versioned, memory-mappable phoneme dictionary.
+
+Every section is read straight out of the mapped file, so opening a dictionary does not
+deserialise anything. Layout (little-endian, sections aligned to 8 bytes):
+
+    header        magic, version, entry/word-id/word counts, offsets of the six sections
+    key_offsets   u32 * (entries+1)   end of each key in keys, starting with 0
+    keys          the sorted phoneme sequences, one byte (a PhonemeEnums value) per phoneme
+    entry_words   u32 * (entries+1)   end of each entry's run in word_ids, starting with 0
+    word_ids      u32 per (entry, word) index into the string pool
+    word_offsets  u32 * (words+1)     end of each word in pool, starting with 0
+    pool          the distinct words, UTF-8 encoded
+
+Because nothing is copied out of the mapping, editor processes that open the same file
+share its pages in the page cache instead of each holding a copy. The dictionary can also
+be published to a named shared memory segment and attached to by name.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+SHARED_MEMORY_PREFIX = "shm:"
+
+MAGIC = b"NICKDICT"
+VERSION = 1
+HEADER = struct.Struct("<8sIIII6Q")
+
+def align(offset:int) -> int:
+    return (offset+7) & ~7
+
+def write_dictionary(entries:dict[bytes, list[str]], path:str) -> None:
+    """Writes entries, a map from phoneme sequences to words, as a binary dictionary."""
+    keys = sorted(entries)
+    word_ids:dict[str, int] = {}
+    key_blob, pool = bytearray(), bytearray()
+    key_offsets, entry_words, ids, word_offsets = array('I', [0]), array('I', [0]), array('I'), array('I', [0])
+    for key in keys:
+        key_blob += key
+        key_offsets.append(len(key_blob))
+        for word in entries[key]:
+            if word not in word_ids:
+                word_ids[word] = len(word_ids)
+                pool += word.encode("UTF-8")
+                word_offsets.append(len(pool))
+            ids.append(word_ids[word])
+        entry_words.append(len(ids))
+    if sys.byteorder != "little":
+        for section in (key_offsets, entry_words, ids, word_offsets):
+            section.byteswap()
+    sections = [key_offsets.tobytes(), bytes(key_blob), entry_words.tobytes(), ids.tobytes(), word_offsets.tobytes(), bytes(pool)]
+
+    offsets, position = [], align(HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        position = align(position+len(section))
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), len(ids), len(word_ids), *offsets))
+        for offset, section in zip(offsets, sections):
+            f.write(b"\0"*(offset-f.tell()))
+            f.write(section)
+    os.replace(temp_path, path)
+
+class DictionaryKeys:
+    """The sorted phoneme sequences of a dictionary as a read-only sequence of bytes."""
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+
+    def __len__(self) -> int:
+        return self.dictionary.entry_count
+
+    def __getitem__(self, i:int) -> bytes:
+        return self.dictionary.key(i)
+
+class DictionaryWords:
+    """The words of each entry of a dictionary as a read-only sequence of lists."""
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+
+    def __len__(self) -> int:
+        return self.dictionary.entry_count
+
+    def __getitem__(self, i:int) -> list[str]:
+        return self.dictionary.words(i)
+
+def untracked_shared_memory(name:str, create:bool=False, size:int=0):
+    """Creates or attaches to the segment called name without leaving it to this process's
+    resource tracker, which would unlink it when the process exits, so the segment lives
+    until unlink_shared_memory is called."""
+    from multiprocessing import shared_memory
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    from multiprocessing import resource_tracker
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+def publish_shared_memory(path:str, name:str):
+    """Copies the dictionary file at path into a new shared memory segment called name."""
+    with open(path, "rb") as f:
+        data = f.read()
+    BinaryDictionary(data=data)
+    segment = untracked_shared_memory(name, create=True, size=len(data))
+    segment.buf[:len(data)] = data
+    return segment
+
+def unlink_shared_memory(name:str) -> None:
+    from multiprocessing import shared_memory
+    segment = shared_memory.SharedMemory(name=name)
+    segment.close()
+    segment.unlink() # also drops the tracker's registration made on attaching
+
+def open_dictionary(location:str):
+    """Opens the dictionary file at location, or attaches to the shared memory segment
+    named after a "shm:" prefix."""
+    if location.startswith(SHARED_MEMORY_PREFIX):
+        return BinaryDictionary.from_shared_memory(location[len(SHARED_MEMORY_PREFIX):])
+    return BinaryDictionary(location)
+
+class BinaryDictionary:
+    def __init__(self, path:str=None, data=None):
+        """Maps the dictionary at path, or reads it from data, any object supporting the buffer protocol."""
+        self.shared_memory = None
+        if data is None:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_RANDOM"):
+                data.madvise(mmap.MADV_RANDOM)
+        self.data = data
+        magic, version, self.entry_count, id_count, self.word_count, *offsets = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path or 'data'} is not a phoneme dictionary")
+        if version != VERSION:
+            raise ValueError(f"{path or 'data'} has unsupported dictionary version {version}")
+        key_offsets, self.keys_start, entry_words, word_ids, word_offsets, self.pool_start = offsets
+        self.key_offsets = self.u32_section(key_offsets, self.entry_count+1)
+        self.entry_words = self.u32_section(entry_words, self.entry_count+1)
+        self.word_ids = self.u32_section(word_ids, id_count)
+        self.word_offsets = self.u32_section(word_offsets, self.word_count+1)
+        self.keys = DictionaryKeys(self)
+        self.values = DictionaryWords(self)
+
+    @classmethod
+    def from_shared_memory(cls, name:str):
+        segment = untracked_shared_memory(name)
+        dictionary = cls(data=segment.buf)
+        dictionary.shared_memory = segment
+        return dictionary
+
+    def close(self) -> None:
+        """Releases the views into the data, and detaches from a shared memory segment."""
+        for section in (self.key_offsets, self.entry_words, self.word_ids, self.word_offsets):
+            if isinstance(section, memoryview):
+                section.release()
+        if self.shared_memory is not None:
+            self.shared_memory.close()
+            self.shared_memory = None
+
+    def u32_section(self, offset:int, count:int):
+        if sys.byteorder == "little":
+            return memoryview(self.data)[offset:offset+4*count].cast('I')
+        section = array('I', self.data[offset:offset+4*count])
+        section.byteswap()
+        return section
+
+    def __len__(self) -> int:
+        return self.entry_count
+
+    def key(self, i:int) -> bytes:
+        return bytes(self.data[self.keys_start+self.key_offsets[i]:self.keys_start+self.key_offsets[i+1]])
+
+    def word(self, word_id:int) -> str:
+        return str(self.data[self.pool_start+self.word_offsets[word_id]:self.pool_start+self.word_offsets[word_id+1]], "UTF-8")
+
+    def words(self, i:int) -> list[str]:
+        return [self.word(word_id) for word_id in self.word_ids[self.entry_words[i]:self.entry_words[i+1]]]
+
+    def index(self, key:bytes) -> int:
+        """The entry index of key, or -1 if it is not in the dictionary."""
+        i = bisect_left(self.keys, key)
+        return i if i < self.entry_count and self.key(i) == key else -1
+
+    def get(self, key:bytes, default:list[str]=None) -> list[str]:
+        i = self.index(key)
+        return self.words(i) if i >= 0 else default
+
+    def __contains__(self, key:bytes) -> bool:
+        return self.index(key) >= 0
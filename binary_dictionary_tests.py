@@ -0,0 +1,104 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import binary_dictionary
+from phonemes import Phoneme, PhonemeEnums
+from binary_dictionary import BinaryDictionary, write_dictionary, HEADER, open_dictionary, publish_shared_memory, unlink_shared_memory
+from build_dictionary import parse_cmudict, convert_pickle
+from dict_phoneme_interpreter import DictPhonemeInterpreter
+
+CMUDICT = """\
+;;; comment
+hi HH AY1
+high HH AY1
+hide HH AY1 D
+home HH OW1 M # a comment
+bout B AW1 T
+bout(2) B AW1 T
+about AH0 B AW1 T
+""".splitlines()
+
+def seq(*phonemes) -> bytes:
+    return bytes(p.value for p in phonemes)
+
+class BinaryDictionaryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "dictionary.bin")
+        write_dictionary(parse_cmudict(CMUDICT), self.path)
+        self.dictionary = BinaryDictionary(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_parse_cmudict(self):
+        entries = parse_cmudict(CMUDICT)
+        assert entries[seq(PhonemeEnums.h, PhonemeEnums.aɪ)] == ["hi", "high"]
+        assert entries[seq(PhonemeEnums.b, PhonemeEnums.aʊ, PhonemeEnums.t)] == ["bout"]
+        self.assertRaises(ValueError, parse_cmudict, ["bad QQ"])
+
+    def test_lookup(self):
+        assert len(self.dictionary) == 5
+        assert self.dictionary.get(seq(PhonemeEnums.h, PhonemeEnums.aɪ)) == ["hi", "high"]
+        assert self.dictionary.get(seq(PhonemeEnums.h), []) == []
+        assert seq(PhonemeEnums.ʌ, PhonemeEnums.b, PhonemeEnums.aʊ, PhonemeEnums.t) in self.dictionary
+        keys = [self.dictionary.keys[i] for i in range(len(self.dictionary))]
+        assert keys == sorted(keys)
+
+    def test_rejects_other_versions(self):
+        with open(self.path, "r+b") as f:
+            f.seek(8)
+            f.write(b"\x63\0\0\0")
+        self.assertRaises(ValueError, BinaryDictionary, self.path)
+        with open(self.path, "wb") as f:
+            f.write(b"\0"*HEADER.size)
+        self.assertRaises(ValueError, BinaryDictionary, self.path)
+
+    def test_convert_pickle(self):
+        entries = convert_pickle({(PhonemeEnums.h, PhonemeEnums.aɪ): ["hey"]})
+        assert entries == {seq(PhonemeEnums.h, PhonemeEnums.aɪ): ["hey"]}
+
+    def test_interpreter(self):
+        interpreter = DictPhonemeInterpreter(dictionary=self.dictionary, top_k=2)
+        phonemes = [Phoneme(phoneme=PhonemeEnums.h), Phoneme(phoneme=PhonemeEnums.aɪ)]
+        assert interpreter.interpret(phonemes) == ["hi", "high"]
+        assert interpreter.complete(phonemes[:1]) == ["hi", "high"]
+        assert interpreter.complete(phonemes) == ["hide"]
+
+    def test_shared_memory(self):
+        name = f"nick-test-{os.getpid()}"
+        segment = publish_shared_memory(self.path, name)
+        try:
+            dictionary = open_dictionary("shm:" + name)
+            assert dictionary.get(seq(PhonemeEnums.h, PhonemeEnums.aɪ)) == ["hi", "high"]
+            phonemes = [Phoneme(phoneme=PhonemeEnums.h)]
+            expected = DictPhonemeInterpreter(dictionary=self.dictionary).complete(phonemes)
+            assert DictPhonemeInterpreter(dictionary=dictionary).complete(phonemes) == expected
+            dictionary.close()
+        finally:
+            segment.close()
+            unlink_shared_memory(name)
+
+    def test_shared_memory_outlives_attached_process(self):
+        name = f"nick-test-child-{os.getpid()}"
+        segment = publish_shared_memory(self.path, name)
+        try:
+            # the child waits for its resource tracker to exit, so anything it would unlink is gone
+            attach = (f"from binary_dictionary import open_dictionary; print(len(open_dictionary('shm:{name}')));"
+                      "from multiprocessing import resource_tracker; resource_tracker._resource_tracker._stop()")
+            env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(binary_dictionary.__file__)))
+            child = subprocess.run([sys.executable, "-c", attach], env=env, capture_output=True, text=True)
+            assert child.returncode == 0 and child.stdout.strip() == str(len(self.dictionary))
+            dictionary = open_dictionary("shm:" + name)
+            assert dictionary.get(seq(PhonemeEnums.h, PhonemeEnums.aɪ)) == ["hi", "high"]
+            dictionary.close()
+        finally:
+            segment.close()
+            unlink_shared_memory(name)
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
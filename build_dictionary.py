@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Compiles the CMU pronouncing dictionary (or an old saved_dictionary.pkl) into the
+binary phoneme dictionary read by DictPhonemeInterpreter.
+
+    python build_dictionary.py cmudict.dict -o phoneme_dictionary.bin
+"""
+
+import argparse
+import pickle
+from typing import Iterable
+from phonemes import PhonemeEnums
+from binary_dictionary import write_dictionary, publish_shared_memory, unlink_shared_memory
+
+ARPABET = {
+    "P": PhonemeEnums.p,
+    "T": PhonemeEnums.t,
+    "K": PhonemeEnums.k,
+    "CH": PhonemeEnums.tʃ,
+    "F": PhonemeEnums.f,
+    "TH": PhonemeEnums.θ,
+    "S": PhonemeEnums.s,
+    "SH": PhonemeEnums.ʃ,
+    "HH": PhonemeEnums.h,
+    "B" :PhonemeEnums.b,
+    "D": PhonemeEnums.d,
+    "G": PhonemeEnums.g,
+    "JH": PhonemeEnums.dʒ,
+    "V": PhonemeEnums.v,
+    "DH": PhonemeEnums.ð,
+    "Z": PhonemeEnums.z,
+    "ZH": PhonemeEnums.ʒ,
+    "M": PhonemeEnums.m,
+    "N": PhonemeEnums.n,
+    "NG": PhonemeEnums.ŋ,
+    "Y": PhonemeEnums.j,
+    "W": PhonemeEnums.w,
+    "R": PhonemeEnums.r,
+    "L": PhonemeEnums.l,
+
+    "IH":PhonemeEnums.ɪ,"IH0":PhonemeEnums.ɪ,"IH1":PhonemeEnums.ɪ,"IH2":PhonemeEnums.ɪ,
+    "EH":PhonemeEnums.ɛ,"EH0":PhonemeEnums.ɛ,"EH1":PhonemeEnums.ɛ,"EH2":PhonemeEnums.ɛ,
+    "AE":PhonemeEnums.æ,"AE0":PhonemeEnums.æ,"AE1":PhonemeEnums.æ,"AE2":PhonemeEnums.æ,
+    "AA":PhonemeEnums.ɑ,"AA0":PhonemeEnums.ɑ,"AA1":PhonemeEnums.ɑ,"AA2":PhonemeEnums.ɑ,
+    "AH":PhonemeEnums.ʌ,"AH0":PhonemeEnums.ʌ,"AH2":PhonemeEnums.ʌ,
+    "UH":PhonemeEnums.ʊ,"UH0":PhonemeEnums.ʊ,"UH1":PhonemeEnums.ʊ,"UH2":PhonemeEnums.ʊ,
+    "AO":PhonemeEnums.ɔ,"AO0":PhonemeEnums.ɔ,"AO1":PhonemeEnums.ɔ,"AO2":PhonemeEnums.ɔ,
+    "ER":PhonemeEnums.ɜr,"ER0":PhonemeEnums.ɜr,"ER1":PhonemeEnums.ɜr,"ER2":PhonemeEnums.ɜr,
+    "IY":PhonemeEnums.i,"IY0":PhonemeEnums.i,"IY1":PhonemeEnums.i,"IY2":PhonemeEnums.i,
+    "EY":PhonemeEnums.eɪ,"EY0":PhonemeEnums.eɪ,"EY1":PhonemeEnums.eɪ,"EY2":PhonemeEnums.eɪ,
+    "OW":PhonemeEnums.oʊ,"OW0":PhonemeEnums.oʊ,"OW1":PhonemeEnums.oʊ,"OW2":PhonemeEnums.oʊ,
+    "UW":PhonemeEnums.u,"UW0":PhonemeEnums.u,"UW1":PhonemeEnums.u,"UW2":PhonemeEnums.u,
+    "AY":PhonemeEnums.aɪ,"AY0":PhonemeEnums.aɪ,"AY1":PhonemeEnums.aɪ,"AY2":PhonemeEnums.aɪ,
+    "OY": PhonemeEnums.ɔɪ,"OY0": PhonemeEnums.ɔɪ,"OY1": PhonemeEnums.ɔɪ,"OY2": PhonemeEnums.ɔɪ,
+    "AW": PhonemeEnums.aʊ,"AW0": PhonemeEnums.aʊ,"AW1": PhonemeEnums.aʊ,"AW2": PhonemeEnums.aʊ,
+
+    "AH1": PhonemeEnums.ə,
+}
+
+def parse_cmudict(lines:Iterable[str]) -> dict[bytes, list[str]]:
+    """Maps each pronunciation, as bytes of PhonemeEnums values, to its words in dictionary order."""
+    entries:dict[bytes, list[str]] = {}
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line or line.startswith(";;;"):
+            continue
+        word, *symbols = line.split()
+        word = word.split("(", 1)[0]
+        try:
+            key = bytes(ARPABET[symbol].value for symbol in symbols)
+        except KeyError as e:
+            raise ValueError(f"line {number}: unknown phoneme {e.args[0]}") from e
+        words = entries.setdefault(key, [])
+        if word not in words:
+            words.append(word)
+    return entries
+
+def convert_pickle(word_dict:dict) -> dict[bytes, list[str]]:
+    """Converts a saved_dictionary.pkl dict of PhonemeEnums tuples to words."""
+    return {bytes(p.value for p in key): list(words) for key, words in word_dict.items()}
+
+def main(argv:list[str]=None):
+    parser = argparse.ArgumentParser(description="Build the binary phoneme dictionary.")
+    parser.add_argument("source", nargs="?", help="a cmudict file, or a .pkl dictionary from dictionary_formatting.ipynb")
+    parser.add_argument("-o", "--output", default="phoneme_dictionary.bin")
+    parser.add_argument("--shared-memory", metavar="NAME",
+                        help="also publish the dictionary to a shared memory segment; editors attach with NICK_DICTIONARY=shm:NAME")
+    parser.add_argument("--unlink", metavar="NAME", help="remove a published shared memory segment and exit")
+    args = parser.parse_args(argv)
+    if args.unlink:
+        unlink_shared_memory(args.unlink)
+        return
+    if not args.source:
+        parser.error("a source dictionary is required")
+    if args.source.endswith(".pkl"):
+        with open(args.source, "rb") as f:
+            entries = convert_pickle(pickle.load(f))
+    else:
+        with open(args.source, encoding="UTF-8") as f:
+            entries = parse_cmudict(f)
+    write_dictionary(entries, args.output)
+    print(f"wrote {len(entries)} pronunciations to {args.output}")
+    if args.shared_memory:
+        publish_shared_memory(args.output, args.shared_memory)
+        print(f"published {args.output} as shared memory segment {args.shared_memory}")
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,201 @@
 import curses
-from model import WindowedLines
+import json
+import os
+import selectors
+import signal
+import sys
+import threading
+import time
+from model import WindowedLines, PASTE_START, PASTE_END, find_keys, ends_in_prefix
 from view import View
 
+MAX_BATCH = 1024
+POLL_MS = 50
+FRAME_SECONDS = 1/60
+PROFILE_KEY = curses.KEY_F12
+
+def resize_terminal() -> None:
+    """Resizes curses' screen to the terminal's new size."""
+    columns, lines = os.get_terminal_size(sys.__stdout__.fileno())
+    curses.resizeterm(lines, columns)
+
 class Controller:
     """The connection between the model and the view"""
-    def __init__(self, model:WindowedLines, view:View, window:curses.window):
+    def __init__(self, model:WindowedLines, view:View, window:curses.window, key_log=None, input_fd:int=None,
+                 session=None, dump_profile=None, resize_terminal=resize_terminal):
         self.model = model
+        self.session = session
         self.view = view
         self.window = window
+        self.key_log = key_log
+        self.input_fd = input_fd
+        self.dump_profile = dump_profile
+        self.resize_terminal = resize_terminal
+        self.resize_fd:int = None
+        self.restore_signal:tuple = None
+        self.dirty = False
+        self.last_frame = 0.0
+
+    def record_keys(self, keys:list[int]) -> None:
+        """Appends a batch of keys to the key log, one JSON list per line, for replaying in benchmarks."""
+        if self.key_log:
+            self.key_log.write(json.dumps(keys) + "\n")
+
+    def read_keys(self) -> list[int]:
+        """Blocks for one key, then drains every key already pending so they render as one frame.
+        A paste start marker cut by MAX_BATCH is read whole, and a bracketed paste is read to
+        its end marker. While a search runs, waits at most POLL_MS so its progress is shown,
+        returning no keys if none came."""
+        self.window.timeout(POLL_MS if self.model.is_searching() else -1)
+        key = self.window.getch()
+        if key == -1:
+            return []
+        keys = [key]
+        self.window.nodelay(True)
+        while len(keys) < MAX_BATCH:
+            key = self.window.getch()
+            if key == -1:
+                break
+            keys.append(key)
+        self.window.nodelay(False)
+        if len(keys) == MAX_BATCH:
+            while ends_in_prefix(keys, PASTE_START): # a paste start marker cut by the limit
+                keys.append(self.window.getch())
+        if self.in_paste(keys):
+            while keys[-len(PASTE_END):] != PASTE_END:
+                keys.append(self.window.getch())
+        return keys
+
+    def in_paste(self, keys:list[int]) -> bool:
+        """Whether keys end partway through a bracketed paste."""
+        start = find_keys(keys, PASTE_START)
+        while start != -1:
+            end = find_keys(keys, PASTE_END, start)
+            if end == -1:
+                return True
+            start = find_keys(keys, PASTE_START, end)
+        return False
+
+    def resize(self) -> None:
+        """Fits every buffer to the terminal after it was resized."""
+        rows, cols = self.window.getmaxyx()
+        window_size = (rows, cols-1)
+        if self.session:
+            self.session.window_size = window_size
+        for model in self.session.models if self.session else [self.model]:
+            model.resize(window_size)
+        self.view.phoneme_panel = None
+
+    def watch_resize(self, selector:selectors.BaseSelector) -> None:
+        """Wakes the selector when the terminal is resized. Curses only notes a SIGWINCH for
+        its next getch, and select retries after a signal, so a resize would wait for the
+        next key. Instead Python handles SIGWINCH and writes it to a pipe the selector
+        watches. Signals can only be handled on the main thread."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        self.resize_fd, write_fd = os.pipe()
+        os.set_blocking(self.resize_fd, False)
+        os.set_blocking(write_fd, False)
+        wakeup_fd = signal.set_wakeup_fd(write_fd, warn_on_full_buffer=False)
+        self.restore_signal = (wakeup_fd, signal.signal(signal.SIGWINCH, lambda signum, frame: None))
+        selector.register(self.resize_fd, selectors.EVENT_READ, self.handle_resize)
+
+    def unwatch_resize(self) -> None:
+        """Restores the SIGWINCH handling watch_resize replaced."""
+        if self.resize_fd is None:
+            return
+        wakeup_fd, handler = self.restore_signal
+        signal.signal(signal.SIGWINCH, signal.SIG_DFL if handler is None else handler)
+        os.close(signal.set_wakeup_fd(wakeup_fd))
+        os.close(self.resize_fd)
+        self.resize_fd = None
+
+    def handle_resize(self) -> None:
+        """Resizes to the terminal if a SIGWINCH is among the signals written to the pipe."""
+        signals = b""
+        try:
+            while chunk := os.read(self.resize_fd, 4096):
+                signals += chunk
+        except BlockingIOError:
+            pass
+        if signal.SIGWINCH in signals:
+            self.resize_terminal()
+            self.resize()
+
+    def handle_keys(self) -> None:
+        keys = self.read_keys()
+        if curses.KEY_RESIZE in keys:
+            keys = [key for key in keys if key != curses.KEY_RESIZE]
+            self.resize()
+        if self.dump_profile and PROFILE_KEY in keys:
+            keys = [key for key in keys if key != PROFILE_KEY]
+            self.model.message = self.dump_profile()
+            self.model.damage_all()
+        if keys:
+            self.record_keys(keys)
+            if self.session:
+                self.session.putch_keys(keys)
+                self.model = self.session.model
+            else:
+                self.model.putch_keys(keys)
+
+    def render(self) -> None:
+        """Draws a frame if anything changed, at most once per FRAME_SECONDS."""
+        if self.dirty and time.monotonic()-self.last_frame >= FRAME_SECONDS:
+            self.view.update(model=self.model)
+            self.last_frame = time.monotonic()
+            self.dirty = False
+
+    def select_timeout(self) -> float:
+        """How long to wait for input: until the next frame is due if one is waiting, a poll
+        interval while a search runs, and otherwise indefinitely."""
+        timeouts = []
+        if self.dirty:
+            timeouts.append(max(self.last_frame+FRAME_SECONDS-time.monotonic(), 0))
+        if self.model.is_searching():
+            timeouts.append(POLL_MS/1000)
+        return min(timeouts) if timeouts else None
+
+    def loop(self) -> None:
+        """Waits on the terminal and on finished background tasks with a selector, so reading
+        keys, changing the model and drawing frames are separate steps, and work such as
+        saving runs off the input path."""
+        selector = selectors.DefaultSelector()
+        selector.register(self.input_fd if self.input_fd is not None else sys.stdin.fileno(), selectors.EVENT_READ, self.handle_keys)
+        if self.model.tasks:
+            selector.register(self.model.tasks.fileno(), selectors.EVENT_READ, self.model.tasks.finish_ready)
+        self.watch_resize(selector)
+        try:
+            while self.model.is_running():
+                self.step(selector)
+        finally:
+            self.unwatch_resize()
+        if self.model.tasks:
+            self.model.tasks.wait()
+        selector.close()
+
+    def step(self, selector:selectors.BaseSelector) -> None:
+        """One turn of the loop: handles whatever is ready, then draws a frame if one is due."""
+        for key, events in selector.select(self.select_timeout()):
+            key.data()
+            self.dirty = True
+        if self.model.search:
+            self.model.poll_search()
+            self.dirty = True
+        self.render()
 
     def run(self):
         "the loop connecting the model to user input, displayed using a curses view."
         curses.noecho()
         curses.cbreak()
         curses.raw()
+        sys.stdout.write("\x1b[?2004h") # bracketed paste on
+        sys.stdout.flush()
 
-        while self.model.is_running():
-            self.model.putch(self.window.getch())
-            self.view.update(model=self.model)
+        self.loop()
 
+        sys.stdout.write("\x1b[?2004l")
+        sys.stdout.flush()
         curses.nocbreak()
         curses.echo()
         curses.endwin()
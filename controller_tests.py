@@ -0,0 +1,104 @@
+import os
+import selectors
+import signal
+import tempfile
+import unittest
+from model import WindowedLines
+from model import PASTE_START, PASTE_END
+from controller import Controller, MAX_BATCH
+from headless import HeadlessDriver, HeadlessWindow
+from task_runner import TaskRunner
+
+class ControllerTest(unittest.TestCase):
+    def test_task_runner(self):
+        tasks = TaskRunner()
+        results = []
+        tasks.submit(lambda: 6*7, lambda result, error: results.append((result, error)))
+        tasks.submit(lambda: 1/0, lambda result, error: results.append((result, type(error))))
+        tasks.wait()
+        assert results == [(42, None), (None, ZeroDivisionError)]
+
+    def test_resize_signal_wakes_selector(self):
+        model = WindowedLines(filename="", window_size=(3, 10))
+        driver = HeadlessDriver(model, 4, 11)
+        read_fd, write_fd = os.pipe()
+        controller = Controller(model=model, view=driver.view, window=driver.window, input_fd=read_fd,
+                                resize_terminal=lambda: driver.window.resize(6, 21))
+        selector = selectors.DefaultSelector()
+        selector.register(read_fd, selectors.EVENT_READ, controller.handle_keys)
+        controller.watch_resize(selector)
+        try:
+            signal.raise_signal(signal.SIGWINCH)
+            controller.step(selector)
+        finally:
+            controller.unwatch_resize()
+            selector.close()
+            os.close(read_fd)
+            os.close(write_fd)
+        assert model.window_size == (6, 20) and controller.resize_fd is None
+        assert signal.getsignal(signal.SIGWINCH) == signal.SIG_DFL
+
+    def test_loop_saves_in_background(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "loop.txt")
+            with open(filename, "wb") as f:
+                f.write(b"one\ntwo\n")
+            model = WindowedLines(filename=filename, window_size=(3, 10), tasks=TaskRunner())
+            model.read_file()
+            driver = HeadlessDriver(model, 4, 11)
+            driver.window.keys = [3, 19, ord("!"), 19, ord("x")] # popped from the end
+            read_fd, write_fd = os.pipe()
+            os.write(write_fd, b"\0")
+            controller = Controller(model=model, view=driver.view, window=driver.window, input_fd=read_fd)
+            controller.loop()
+            os.close(read_fd)
+            os.close(write_fd)
+            assert not model.is_running() and model.saving == 0
+            assert model.message == f"Saved {filename}"
+            with open(filename, "rb") as f:
+                assert f.read() == b"x!one\ntwo\n"
+
+    def test_save_snapshot_ignores_later_edits(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "snapshot.txt")
+            tasks = TaskRunner()
+            model = WindowedLines(filename=filename, tasks=tasks)
+            model.read_file()
+            model.insert_text("kept")
+            model.putch(19)
+            model.insert_text(" later")
+            tasks.wait()
+            with open(filename, "rb") as f:
+                assert f.read() == b"kept"
+            assert model.get_panel_text() == f"Saved {filename}"
+            model.putch(ord("!"))
+            assert model.message is None and model.get_curr_line() == "kept later!"
+
+    def test_paste_marker_split_by_batch_limit(self):
+        model = WindowedLines(filename="", window_size=(3, 10))
+        driver = HeadlessDriver(model, 4, 11)
+        typed = [ord("a")]*(MAX_BATCH-3)
+        driver.window = HeadlessWindow(4, 11, keys=typed + PASTE_START + [ord("b"), 10, ord("c")] + PASTE_END)
+        controller = Controller(model=model, view=driver.view, window=driver.window)
+        keys = controller.read_keys()
+        assert len(keys) > MAX_BATCH and keys[-len(PASTE_END):] == PASTE_END
+        model.putch_keys(keys)
+        assert model.buffer.get_line(0) == "a"*(MAX_BATCH-3) + "b" and model.get_curr_line() == "c"
+        assert controller.read_keys() == [3]
+
+    def test_save_message_names_saved_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "before.txt")
+            tasks = TaskRunner()
+            model = WindowedLines(filename=filename, tasks=tasks)
+            model.read_file()
+            model.insert_text("kept")
+            model.putch(19)
+            model.filename = os.path.join(directory, "after.txt")
+            tasks.wait()
+            assert model.message == f"Saved {filename}"
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -1,16 +1,83 @@
-import pickle
-from phonemes import PhonemeEnums, Phoneme
-from phoneme_interpreter_interface import PhonemeInterpreterInterface
+import os
+import threading
+from phonemes import Phoneme, phoneme_key
+from phoneme_interpreter_interface import PhonemeInterpreterInterface, PhonemeLookup
+from phoneme_trie import PhonemeTrie, TrieNode
+from binary_dictionary import BinaryDictionary, open_dictionary
 
-with open('saved_dictionary.pkl', 'rb') as f:
-    word_dict = pickle.load(f)
+DICTIONARY_PATH = 'phoneme_dictionary.bin'
+DICTIONARY_ENV = 'NICK_DICTIONARY'
+
+default_dictionary:BinaryDictionary = None
+default_dictionary_lock = threading.Lock()
+
+def get_default_dictionary() -> BinaryDictionary:
+    """Opens the dictionary on first use and shares it afterwards. It is the file, or the
+    "shm:"-prefixed shared memory segment, named by $NICK_DICTIONARY, so that every editor
+    process on a machine can map one copy, or else DICTIONARY_PATH."""
+    global default_dictionary
+    with default_dictionary_lock:
+        if default_dictionary is None:
+            default_dictionary = open_dictionary(os.environ.get(DICTIONARY_ENV, DICTIONARY_PATH))
+        return default_dictionary
+
+class TrieLookup(PhonemeLookup):
+    """Descends the interpreter's trie by one node per appended phoneme."""
+    def __init__(self, interpreter):
+        super().__init__(interpreter)
+        self.node:TrieNode = None
+
+    def append(self, phoneme:Phoneme) -> None:
+        trie = self.interpreter.get_trie()
+        if not self.phonemes:
+            self.node = trie.root
+        super().append(phoneme)
+        if self.node:
+            self.node = trie.child(self.node, phoneme.code)
+
+    def words(self) -> list[str]:
+        return self.interpreter.get_trie().words(self.node) if self.node and self.phonemes else []
+
+    def completions(self) -> list[str]:
+        return self.interpreter.get_trie().completions(self.node) if self.node and self.phonemes else []
 
 class DictPhonemeInterpreter(PhonemeInterpreterInterface):
-    def __init__(self):
-        self.word_dict = word_dict
-    
-    def interpret(self, phonemes:list[Phoneme]):
-        phoneme_enums:tuple[PhonemeEnums] = tuple([p.phoneme for p in phonemes])
-        if phoneme_enums in self.word_dict:
-            return self.word_dict[phoneme_enums]
-        return []
\ No newline at end of file
+    def __init__(self, frequencies:dict[str, int]=None, top_k:int=10, dictionary:BinaryDictionary=None):
+        """frequencies optionally ranks words for PhonemeTrie. The dictionary file has no
+        frequencies, so without it completions are ranked by length."""
+        self.dictionary = dictionary
+        self.frequencies = frequencies
+        self.top_k = top_k
+        self.trie:PhonemeTrie = None
+
+    def get_dictionary(self) -> BinaryDictionary:
+        if self.dictionary is None:
+            self.dictionary = get_default_dictionary()
+        return self.dictionary
+
+    def interpret(self, phonemes:bytes | list[Phoneme]) -> list[str]:
+        return self.get_dictionary().get(phoneme_key(phonemes), [])
+
+    def get_trie(self) -> PhonemeTrie:
+        """The dictionary's keys are stored sorted, so the trie indexes them in place. Built
+        once, even if a preload and the first keystroke ask for it together."""
+        if self.trie is None:
+            dictionary = self.get_dictionary()
+            with default_dictionary_lock:
+                if self.trie is None:
+                    self.trie = PhonemeTrie(dictionary.keys, dictionary.values,
+                                            frequencies=self.frequencies, top_k=self.top_k)
+        return self.trie
+
+    def complete(self, phonemes:bytes | list[Phoneme]) -> list[str]:
+        node = self.get_trie().find(phoneme_key(phonemes)) if phonemes else None
+        return self.get_trie().completions(node) if node else []
+
+    def fuzzy(self, phonemes:bytes | list[Phoneme], max_distance:int=1) -> list[str]:
+        return self.get_trie().fuzzy(phoneme_key(phonemes), max_distance) if phonemes else []
+
+    def lookup(self) -> TrieLookup:
+        return TrieLookup(self)
+
+    def preload(self) -> None:
+        self.get_trie()
@@ -0,0 +1,122 @@
+"""
+The width of text on the terminal. East Asian wide and fullwidth characters take two
+columns, combining marks and other zero-width characters none, and a tab runs to the next
+multiple of tab_size. Other control characters are drawn as "?".
+
+Most lines are printable ASCII, where offsets and columns are the same, and are
+recognised without looking at each character. For any other line the column at which
+each character starts is computed once and cached until the line is edited, so mapping
+between offsets and columns on a long line is an index or a bisection.
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from line_cache import LineCache
+
+TAB_SIZE = 4
+ZERO_WIDTH_CATEGORIES = ("Mn", "Me", "Cf")
+RUNS = re.compile(r"[ -~]+|\t|[^ -~\t]+")
+
+char_widths:dict[int, str] = {} # code point to its width as a one-character string, for str.translate
+
+def char_width(char:str) -> int:
+    width = char_widths.get(ord(char))
+    if width is None:
+        if unicodedata.category(char) in ZERO_WIDTH_CATEGORIES:
+            width = "\0"
+        elif unicodedata.east_asian_width(char) in ("W", "F"):
+            width = "\2"
+        else:
+            width = "\1"
+        char_widths[ord(char)] = width
+    return ord(width)
+
+def is_plain(line:str) -> bool:
+    """Whether every character of line is printable ASCII, one column wide."""
+    return line.isascii() and line.isprintable()
+
+def prefix_widths(line:str, tab_size:int=TAB_SIZE) -> array:
+    """The column at which each character of line starts, followed by the line's width.
+    Runs of characters other than tabs are translated to their widths and summed without
+    a Python call per character."""
+    columns = array('I', [0])
+    column = 0
+    for match in RUNS.finditer(line):
+        run = match.group()
+        if run == "\t":
+            column += tab_size - column % tab_size
+            columns.append(column)
+        elif run.isascii() and run.isprintable():
+            columns.extend(range(column+1, column+len(run)+1))
+            column += len(run)
+        else:
+            for char in set(run):
+                char_width(char)
+            columns.pop()
+            columns.extend(accumulate(run.translate(char_widths).encode("latin-1"), initial=column))
+            column = columns[-1]
+    return columns
+
+class DisplayWidths:
+    def __init__(self, buffer, tab_size:int=TAB_SIZE):
+        self.buffer = buffer
+        self.tab_size = tab_size
+        self.cache = LineCache()
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def invalidate(self, row:int) -> None:
+        self.cache.invalidate(row)
+
+    def invalidate_from(self, row:int) -> None:
+        self.cache.invalidate_from(row)
+
+    def prefix(self, row:int) -> array:
+        """prefix_widths of the line at row, or None if the line is plain."""
+        if row in self.cache:
+            return self.cache.get(row)
+        line = self.buffer.get_line(row)
+        return self.cache.put(row, None if is_plain(line) else prefix_widths(line, self.tab_size))
+
+    def column(self, row:int, offset:int) -> int:
+        """The column at which the character at offset starts."""
+        columns = self.prefix(row)
+        return offset if columns is None else columns[min(offset, len(columns)-1)]
+
+    def offset(self, row:int, column:int) -> int:
+        """The offset of the character covering column, or the line's length past its end."""
+        columns = self.prefix(row)
+        if columns is None:
+            return min(column, len(self.buffer.get_line(row)))
+        return min(bisect_right(columns, column), len(columns))-1
+
+    def render(self, row:int, left:int, width:int, start:int=None, end:int=None) -> str:
+        """The line at row as drawn from column left across width columns, padded with
+        spaces, or only its characters from start to end if they are given. A character
+        cut by the left edge is drawn as spaces, and one that would cross the right edge
+        is left off."""
+        line = self.buffer.get_line(row)
+        columns = self.prefix(row)
+        if columns is None:
+            return (line[left:left+width] if start is None else line[start:end]).ljust(width)
+        if start is None:
+            start = bisect_right(columns, left)-1
+            end = max(bisect_right(columns, left+width)-1, start)
+        pieces = []
+        if start < len(line) and columns[start] < left:
+            pieces.append(" " * (columns[start+1]-left))
+            start += 1
+        stop = max(start, min(end, len(line)))
+        for i in range(start, stop):
+            char = line[i]
+            if char == "\t":
+                pieces.append(" " * (columns[i+1]-columns[i]))
+            elif char < " " or char == "\x7f":
+                pieces.append("?")
+            else:
+                pieces.append(char)
+        return "".join(pieces) + " " * (width-(columns[stop]-left))
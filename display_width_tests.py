@@ -0,0 +1,77 @@
+import curses
+import unittest
+from list_text_buffer import ListTextBuffer
+from display_width import DisplayWidths, char_width, prefix_widths
+from model import WindowedLines
+
+class DisplayWidthTest(unittest.TestCase):
+    def setUp(self):
+        self.buffer = ListTextBuffer()
+        self.buffer.load("plain\n日本語x\nét\na\tb\tc\nhəˈloʊ".encode())
+        self.widths = DisplayWidths(self.buffer, tab_size=4)
+
+    def test_char_widths(self):
+        assert char_width("a") == 1 and char_width("ə") == 1
+        assert char_width("日") == 2 and char_width("\u0301") == 0
+        assert list(prefix_widths("a\tb", 4)) == [0, 1, 4, 5]
+
+    def test_columns_and_offsets(self):
+        assert self.widths.prefix(0) is None
+        assert self.widths.column(0, 3) == 3 and self.widths.offset(0, 9) == 5
+        assert self.widths.column(1, 2) == 4 and self.widths.column(1, 4) == 7
+        assert self.widths.offset(1, 3) == 1 and self.widths.offset(1, 6) == 3
+        assert self.widths.column(2, 2) == 1 and self.widths.offset(2, 1) == 2
+        assert self.widths.column(3, 3) == 5 and self.widths.offset(3, 2) == 1
+
+    def test_render(self):
+        assert self.widths.render(1, 0, 5) == "日本 "
+        assert self.widths.render(1, 1, 6) == " 本語x"
+        assert self.widths.render(3, 0, 10) == "a   b   c "
+        assert self.widths.render(2, 0, 3) == "e\u0301t "
+
+    def test_invalidation(self):
+        assert self.widths.column(1, 1) == 2
+        self.buffer.set_line(1, "ab")
+        assert self.widths.column(1, 1) == 2
+        self.widths.invalidate(1)
+        assert self.widths.column(1, 1) == 1
+
+    def test_cursor_on_wide_text(self):
+        model = WindowedLines(filename="", window_size=(2, 6))
+        model.insert_text("日本語日本語")
+        assert model.top_window_col == 6
+        assert model.cursor_window_position() == (0, 6)
+        assert model.window_row(0) == "日本語"
+        model.left()
+        model.left()
+        model.left()
+        model.left()
+        assert model.top_window_col == 0 and model.cursor_window_position() == (0, 4)
+        assert model.window_row(0) == "日本語"
+        model.toggle_wrap()
+        assert model.print_window() == "日本語\n日本語"
+        assert model.cursor_window_position() == (0, 4)
+        model.down()
+        assert model.cursor_position == 5 and model.cursor_window_position() == (1, 4)
+
+    def test_up_and_down_keep_screen_column(self):
+        model = WindowedLines(filename="", window_size=(4, 20))
+        model.insert_text("abcdef\n日本語x\na\tb")
+        model.goto_line(0)
+        for _ in range(4):
+            model.right()
+        model.down()
+        assert model.cursor_position == 2 and model.cursor_window_position() == (1, 4)
+        model.down()
+        assert model.cursor_position == 2 and model.cursor_window_position() == (2, 4)
+        model.up()
+        model.up()
+        assert model.cursor_position == 4
+        model.putch(curses.KEY_END)
+        model.up()
+        assert model.cursor_position == 2 and model.cursor_window_position() == (1, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -0,0 +1,124 @@
+"""
+An append-only journal of the edits made since a file was last saved, kept next to the
+file so that they can be replayed over it after a crash. Each edit is one short JSON line,
+["i", row, col, text] or ["d", row, col, end_row, end_col], and a background thread appends
+whatever has built up every interval seconds, so autosaving costs a tiny sequential write
+rather than a rewrite of the whole file.
+
+The first line records the size and modification time of the file the edits apply to,
+and a journal that does not match is set aside rather than replayed.
+"""
+
+import json
+import os
+import threading
+
+INTERVAL = 2.0
+VERSION = 1
+
+def journal_path(filename:str) -> str:
+    directory, name = os.path.split(os.path.realpath(filename))
+    return os.path.join(directory, f".{name}.nick-journal")
+
+def file_header(filename:str) -> str:
+    stat = os.stat(filename)
+    return json.dumps({"nick_journal": VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+
+def read_journal(filename:str) -> list[list]:
+    """The edits journaled for filename, or [] if there are none that apply to it as it is
+    now. A journal for another version of the file is renamed with a .stale suffix."""
+    path = journal_path(filename)
+    try:
+        with open(path, encoding="UTF-8", errors="surrogateescape") as f:
+            lines = f.read().split("\n")
+    except FileNotFoundError:
+        return []
+    if lines[0] != file_header(filename):
+        os.replace(path, path + ".stale")
+        return []
+    ops = []
+    for line in lines[1:]:
+        try:
+            ops.append(json.loads(line))
+        except ValueError:
+            break # the last line may have been cut short by the crash
+    return ops
+
+class EditJournal:
+    def __init__(self, filename:str, interval:float=INTERVAL):
+        self.filename = filename
+        self.path = journal_path(filename)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pending:list[str] = []
+        self.since_save:list[str] = []
+        self.saved_through = 0
+        self.fd:int = None
+        self.closed = threading.Event()
+        self.thread:threading.Thread = None
+
+    def start(self, ops:list[list]=()) -> None:
+        """Starts a fresh journal holding ops, and the thread that flushes it."""
+        self.since_save = [json.dumps(op) for op in ops]
+        self.rewrite(file_header(self.filename), self.since_save)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def record(self, op:list) -> None:
+        line = json.dumps(op)
+        with self.lock:
+            self.pending.append(line)
+            self.since_save.append(line)
+
+    def has_unsaved(self) -> bool:
+        with self.lock:
+            return bool(self.since_save)
+
+    def saved_count(self) -> int:
+        """A mark to pass to saved() once the edits recorded so far are on disk."""
+        with self.lock:
+            return self.saved_through+len(self.since_save)
+
+    def saved(self, count:int) -> None:
+        """Starts the journal over from the saved file, keeping only the edits recorded
+        after saved_count() returned count."""
+        with self.lock:
+            self.since_save = self.since_save[count-self.saved_through:]
+            self.saved_through = count
+            self.pending = []
+            self.rewrite(file_header(self.filename), self.since_save)
+
+    def rewrite(self, header:str, lines:list[str]) -> None:
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="UTF-8", errors="surrogateescape") as f:
+            f.write("".join(line + "\n" for line in [header, *lines]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+
+    def flush(self) -> None:
+        with self.lock:
+            lines, self.pending = self.pending, []
+            if lines and self.fd is not None:
+                os.write(self.fd, "".join(line + "\n" for line in lines).encode("UTF-8", "surrogateescape"))
+                os.fsync(self.fd)
+
+    def run(self) -> None:
+        while not self.closed.wait(self.interval):
+            self.flush()
+
+    def close(self, remove:bool=False) -> None:
+        """Stops the flushing thread, and removes the journal if the edits need not be kept."""
+        self.closed.set()
+        if self.thread:
+            self.thread.join()
+        self.flush()
+        with self.lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+            if remove and os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from model import WindowedLines
+from task_runner import TaskRunner
+from edit_journal import journal_path, read_journal
+
+def text(model:WindowedLines) -> str:
+    return "\n".join(model.buffer.iter_lines())
+
+class EditJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "journaled.txt")
+        with open(self.filename, "w") as f:
+            f.write("one\ntwo\nthree\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def crash(self, model:WindowedLines) -> None:
+        """Flushes the journal and abandons the model, as a crash after an autosave would."""
+        model.journal.flush()
+
+    def test_recover_after_crash(self):
+        model = WindowedLines(filename=self.filename, autosave=True)
+        model.read_file()
+        model.insert_text("zero\n")
+        model.down()
+        model.set_mark()
+        model.down()
+        model.delete()
+        model.insert("X")
+        model.undo()
+        expected = text(model)
+        self.crash(model)
+        assert len(read_journal(self.filename)) > 0
+
+        recovered = WindowedLines(filename=self.filename, autosave=True)
+        recovered.read_file()
+        assert text(recovered) == expected
+        assert recovered.message.startswith("Recovered")
+        assert (recovered.cursor_row, recovered.cursor_position) == (model.cursor_row, model.cursor_position)
+        recovered.insert("!")
+        self.crash(recovered)
+        again = WindowedLines(filename=self.filename, autosave=True)
+        again.read_file()
+        assert text(again) == text(recovered)
+
+    def test_save_truncates_journal(self):
+        tasks = TaskRunner()
+        model = WindowedLines(filename=self.filename, autosave=True, tasks=tasks)
+        model.read_file()
+        model.insert_text("saved ")
+        model.putch(19)
+        model.insert_text("unsaved ")
+        tasks.wait()
+        self.crash(model)
+        assert read_journal(self.filename) == [["i", 0, 6, "unsaved "]]
+        recovered = WindowedLines(filename=self.filename, autosave=True)
+        recovered.read_file()
+        assert recovered.get_curr_line() == "saved unsaved one"
+
+    def test_stale_journal_and_clean_exit(self):
+        model = WindowedLines(filename=self.filename, autosave=True)
+        model.read_file()
+        model.insert_text("lost ")
+        self.crash(model)
+        with open(self.filename, "a") as f:
+            f.write("changed elsewhere\n")
+        os.utime(self.filename, ns=(1, 1))
+        reopened = WindowedLines(filename=self.filename, autosave=True)
+        reopened.read_file()
+        assert reopened.get_curr_line() == "one" and reopened.message is None
+        assert os.path.exists(journal_path(self.filename) + ".stale")
+        reopened.close_journal(remove=True)
+        assert not os.path.exists(journal_path(self.filename))
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
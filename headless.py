@@ -0,0 +1,154 @@
+"""
+A curses-free window, and a driver that replays key streams through the model and
+view without a terminal, for the benchmarks and tests.
+"""
+
+import curses
+import json
+import random
+import time
+from model import WindowedLines, is_text_key
+from view import View
+
+class HeadlessWindow:
+    """Records what the view draws instead of drawing it, and returns queued keys from getch."""
+    def __init__(self, rows:int, cols:int, keys:list[int]=None):
+        self.rows = rows
+        self.cols = cols
+        self.lines = [""]*rows
+        self.y = self.x = 0
+        self.keys = list(keys or [])[::-1]
+        self.no_delay = False
+        self.delay = -1
+        self.highlights:set[tuple[int, int, int]] = set()
+        self.styles:set[tuple[int, int, int, int]] = set()
+
+    def getmaxyx(self) -> tuple[int, int]:
+        return self.rows, self.cols
+
+    def resize(self, rows:int, cols:int):
+        self.lines = (self.lines+[""]*rows)[:rows]
+        self.rows, self.cols = rows, cols
+
+    def subwin(self, y:int, x:int):
+        return HeadlessWindow(self.rows-y, self.cols-x)
+
+    def keypad(self, flag:bool):
+        pass
+
+    def nodelay(self, flag:bool):
+        self.no_delay = flag
+
+    def timeout(self, delay:int):
+        self.delay = delay
+
+    def getch(self) -> int:
+        if self.keys:
+            return self.keys.pop()
+        if self.no_delay or self.delay >= 0:
+            return -1
+        return 3 # CTRL+C, so a replay always ends
+
+    def move(self, y:int, x:int):
+        self.y, self.x = y, x
+
+    def addstr(self, text:str):
+        line = self.lines[self.y]
+        self.lines[self.y] = line[:self.x] + text + line[self.x+len(text):]
+        self.highlights = {(y, x, n) for y, x, n in self.highlights if y != self.y or x+n <= self.x or x >= self.x+len(text)}
+        self.styles = {(y, x, n, attr) for y, x, n, attr in self.styles if y != self.y or x+n <= self.x or x >= self.x+len(text)}
+        self.x += len(text)
+
+    def chgat(self, y:int, x:int, n:int, attr:int):
+        if attr == curses.A_REVERSE:
+            self.highlights.add((y, x, n))
+        else:
+            self.styles.add((y, x, n, attr))
+
+    def clrtoeol(self):
+        self.lines[self.y] = self.lines[self.y][:self.x]
+
+    def erase(self):
+        self.lines = [""]*self.rows
+        self.highlights = set()
+        self.styles = set()
+
+    def noutrefresh(self):
+        pass
+
+    def refresh(self):
+        pass
+
+def key_category(key:int) -> str:
+    if key in (curses.KEY_UP, curses.KEY_DOWN):
+        return "up_down"
+    if key in (curses.KEY_LEFT, curses.KEY_RIGHT):
+        return "left_right"
+    if key == curses.KEY_BACKSPACE:
+        return "delete"
+    if is_text_key(key) or key == curses.KEY_ENTER:
+        return "insert"
+    return "other"
+
+def batch_category(batch:list[int]) -> str:
+    """The category shared by every key in a batch, or "mixed"."""
+    categories = {key_category(key) for key in batch}
+    return categories.pop() if len(categories) == 1 else "mixed"
+
+def synthetic_text(lines:int, line_length:int, seed:int=0) -> bytes:
+    """Lines of random lowercase words, each line_length characters long."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(1, 9))) for _ in range(1000)]
+    out = []
+    for _ in range(lines):
+        line = " ".join(rng.choice(words) for _ in range(line_length//4+1))
+        out.append(line[:line_length])
+    return ("\n".join(out) + "\n").encode("UTF-8")
+
+def synthetic_keys(count:int, seed:int=0) -> list[int]:
+    """A mix of typing, backspacing, new lines and cursor movement."""
+    rng = random.Random(seed)
+    choices = [curses.KEY_UP, curses.KEY_DOWN, curses.KEY_LEFT, curses.KEY_RIGHT, curses.KEY_BACKSPACE, 10]
+    keys = []
+    while len(keys) < count:
+        roll = rng.random()
+        if roll < 0.6:
+            keys.extend(ord(c) for c in rng.choice(["the ", "quick ", "brown ", "fox "]))
+        else:
+            keys.extend([rng.choice(choices)]*rng.randint(1, 5))
+    return keys[:count]
+
+def load_keys(path:str) -> list[list[int]]:
+    """Reads keys recorded with nick --record-keys: one JSON list of keys per line, each a
+    batch the controller read at once."""
+    batches = []
+    with open(path, encoding="UTF-8") as f:
+        for line in f:
+            if line.strip():
+                batches.append(json.loads(line))
+    return batches
+
+class HeadlessDriver:
+    def __init__(self, model:WindowedLines, rows:int=None, cols:int=None):
+        rows = rows if rows is not None else model.window_size[0]
+        cols = cols if cols is not None else model.window_size[1]+1
+        self.model = model
+        self.window = HeadlessWindow(rows, cols)
+        self.view = View(window=self.window, doupdate=lambda: None)
+
+    def replay(self, batches:list[list[int]], on_batch=None) -> None:
+        """Feeds each batch of keys to the model as the controller does, updating the view after
+        each. on_batch, if given, is called with each batch and the seconds spent in putch_keys
+        and in the view update."""
+        self.view.update(model=self.model)
+        for batch in batches:
+            if not self.model.is_running():
+                break
+            start = time.perf_counter()
+            self.model.putch_keys(batch)
+            self.model.poll_search()
+            handled = time.perf_counter()
+            self.view.update(model=self.model)
+            rendered = time.perf_counter()
+            if on_batch:
+                on_batch(batch, handled-start, rendered-handled)
@@ -0,0 +1,160 @@
+"""
+Syntax highlighting. A lexer turns one line into (start, end, kind) tokens, given the state
+the line starts in, and returns the state the next line starts in: the quotes of a
+triple-quoted string left open, or None. A Highlighter keeps the start state of each line
+lexed so far, so any line can be lexed on its own. Most lines start in None, so only the
+others are stored. After an edit only the edited line is
+relexed, then each line below it while its start state keeps changing, which for most
+edits is none of them. Lines are lexed when they are drawn, so the lines below the window
+wait until they are scrolled to.
+"""
+
+import builtins
+import keyword
+import os
+import re
+from heapq import heapify, heappop, heappush
+from line_cache import LineCache
+
+SYNC_LINES = 10000 # how far above a line lexing starts when nothing above it is known
+
+PYTHON_TOKENS = re.compile(r"""
+    (?P<comment>\#.*)
+  | (?P<string>[rRbBuUfF]{0,2}(?:(?P<triple>\"\"\"|''')|"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?))
+  | (?P<decorator>^\s*@[\w.]+)
+  | (?P<number>\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*(?:\.[\d_]*)?(?:[eE][+-]?\d+)?[jJ]?)\b)
+  | (?P<name>[^\W\d]\w*)
+""", re.VERBOSE)
+
+CONFIG_TOKENS = re.compile(r"""
+    (?P<comment>^\s*[\#;].*|(?<=\s)\#.*)
+  | (?P<section>^\s*\[[^\]]*\]+)
+  | (?P<key>^\s*[^=:\s\[\#;][^=:]*?(?=\s*[=:]))
+  | (?P<string>(?P<triple>\"\"\"|''')|"(?:[^"\\]|\\.)*"?|'[^']*')
+  | (?P<number>\b(?:\d[\d_.:eE+-]*|true|false)\b)
+""", re.VERBOSE)
+
+TRIPLE_ENDS = {quote: re.compile(r"(?:\\.|[^\\])*?" + quote) for quote in ('"""', "'''")}
+
+class RegexLexer:
+    """Lexes with a pattern whose group names are the token kinds. A "triple" group opens a
+    string that may run over several lines, and a "name" group is a keyword, a builtin or
+    left plain."""
+    def __init__(self, tokens:re.Pattern, keywords=(), builtins=()):
+        self.tokens = tokens
+        self.keywords = frozenset(keywords)
+        self.builtins = frozenset(builtins)
+
+    def lex(self, line:str, state:str=None) -> tuple[list[tuple[int, int, str]], str]:
+        tokens = []
+        pos = 0
+        if state:
+            end = TRIPLE_ENDS[state].match(line)
+            if end is None:
+                return [(0, len(line), "string")], state
+            tokens.append((0, end.end(), "string"))
+            pos = end.end()
+        while True:
+            match = self.tokens.search(line, pos)
+            if match is None:
+                return tokens, None
+            start, pos = match.span()
+            kind = match.lastgroup
+            if match.group("triple"):
+                end = TRIPLE_ENDS[match.group("triple")].match(line, pos)
+                if end is None:
+                    tokens.append((start, len(line), "string"))
+                    return tokens, match.group("triple")
+                pos = end.end()
+            elif kind == "name":
+                kind = "keyword" if match.group() in self.keywords else "builtin" if match.group() in self.builtins else None
+            if kind:
+                tokens.append((start, pos, kind))
+
+PYTHON = RegexLexer(PYTHON_TOKENS, keyword.kwlist, dir(builtins))
+CONFIG = RegexLexer(CONFIG_TOKENS)
+
+LEXERS = {
+    ".py": PYTHON, ".pyi": PYTHON, ".pyw": PYTHON,
+    ".ini": CONFIG, ".cfg": CONFIG, ".conf": CONFIG, ".toml": CONFIG, ".properties": CONFIG,
+}
+
+def lexer_for(filename:str) -> RegexLexer:
+    """The lexer for a file's extension, or None if it is not highlighted."""
+    return LEXERS.get(os.path.splitext(filename or "")[1].lower())
+
+class Highlighter:
+    def __init__(self, buffer, lexer:RegexLexer):
+        self.buffer = buffer
+        self.lexer = lexer
+        self.known = 1 # the start state of every line above this row is known
+        self.states:dict[int, str] = {} # the start state of each known line that starts in one
+        self.stale:list[int] = [] # a heap of edited rows that may now end in a different state
+        self.tokens = LineCache()
+
+    def clear(self) -> None:
+        self.known = 1
+        self.states.clear()
+        self.stale = []
+        self.tokens.clear()
+
+    def set_state(self, row:int, state:str) -> None:
+        if state is None:
+            self.states.pop(row, None)
+        else:
+            self.states[row] = state
+
+    def invalidate(self, row:int) -> None:
+        """Notes an edit within the line at row."""
+        self.tokens.invalidate(row)
+        if row+1 < self.known:
+            heappush(self.stale, row)
+
+    def invalidate_from(self, row:int) -> None:
+        """Notes that the lines from row down changed or moved, e.g. lines were inserted or deleted."""
+        self.tokens.invalidate_from(row)
+        self.known = min(self.known, row+1)
+        for known in [known for known in self.states if known > row]:
+            del self.states[known]
+        self.stale = [stale for stale in self.stale if stale < row]
+        heapify(self.stale)
+
+    def lex(self, row:int) -> str:
+        """Lexes the line at row, caching its tokens, and returns the state the next line starts in."""
+        tokens, state = self.lexer.lex(self.buffer.get_line(row), self.states.get(row))
+        self.tokens.put(row, tokens)
+        return state
+
+    def settle(self, last:int) -> list[int]:
+        """Relexes the edited lines down to last, and the line after each while the state it
+        starts in changes. Returns the rows whose start state changed, which must be redrawn."""
+        changed = []
+        while self.stale and self.stale[0] <= last:
+            row = heappop(self.stale)
+            while self.stale and self.stale[0] == row:
+                heappop(self.stale)
+            if row+1 >= self.known:
+                continue
+            state = self.lex(row)
+            if state != self.states.get(row+1):
+                self.set_state(row+1, state)
+                self.tokens.invalidate(row+1)
+                changed.append(row+1)
+                heappush(self.stale, row+1)
+        return changed
+
+    def line_tokens(self, row:int) -> list[tuple[int, int, str]]:
+        """The (start, end, kind) tokens of the line at row."""
+        tokens = self.tokens.get(row)
+        if tokens is None:
+            self.settle(row)
+            if row-self.known >= SYNC_LINES:
+                self.known = row-SYNC_LINES+1 # the lines skipped are taken to start in None
+            while self.known <= row:
+                self.set_state(self.known, self.lex(self.known-1))
+                self.known += 1
+            tokens = self.tokens.get(row)
+            if tokens is None:
+                self.lex(row)
+                tokens = self.tokens.get(row)
+        return tokens
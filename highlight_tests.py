@@ -0,0 +1,87 @@
+import curses
+import unittest
+from model import WindowedLines
+from headless import HeadlessDriver
+from highlight import Highlighter, PYTHON, CONFIG, lexer_for
+
+class CountingLexer:
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.lexed:list[str] = []
+
+    def lex(self, line:str, state:str=None):
+        self.lexed.append(line)
+        return self.lexer.lex(line, state)
+
+class EndlessBuffer:
+    def get_line(self, row:int) -> str:
+        return "x = 1"
+
+class HighlightTest(unittest.TestCase):
+    def test_python_lexer(self):
+        assert PYTHON.lex("def f(x): # hi") == ([(0, 3, "keyword"), (10, 14, "comment")], None)
+        assert PYTHON.lex("print(len('x#'), 0x1F)") == ([(0, 5, "builtin"), (6, 9, "builtin"), (10, 14, "string"), (17, 21, "number")], None)
+        assert PYTHON.lex('s = r"a\\"b"') == ([(4, 11, "string")], None)
+        assert PYTHON.lex('x = """doc') == ([(4, 10, "string")], '"""')
+        assert PYTHON.lex('more', '"""') == ([(0, 4, "string")], '"""')
+        assert PYTHON.lex('end""" if x', '"""') == ([(0, 6, "string"), (7, 9, "keyword")], None)
+        assert PYTHON.lex("@property") == ([(0, 9, "decorator")], None)
+
+    def test_config_lexer(self):
+        assert CONFIG.lex("[tool.nick]") == ([(0, 11, "section")], None)
+        assert CONFIG.lex('name = "nick" # editor') == ([(0, 4, "key"), (7, 13, "string"), (14, 22, "comment")], None)
+        assert CONFIG.lex("; note") == ([(0, 6, "comment")], None)
+        assert CONFIG.lex("size: 12") == ([(0, 4, "key"), (6, 8, "number")], None)
+        assert lexer_for("setup.CFG") is CONFIG and lexer_for("nick.py") is PYTHON and lexer_for("notes.txt") is None
+
+    def test_relexes_until_state_converges(self):
+        model = WindowedLines(filename="", window_size=(5, 20))
+        model.insert_text("a = 1\nb = 2\nc = 3\nd = 4\ne = 5")
+        lexer = CountingLexer(PYTHON)
+        highlighter = Highlighter(model.buffer, lexer)
+        assert highlighter.line_tokens(4) == [(4, 5, "number")]
+        assert len(lexer.lexed) == 5
+        lexer.lexed = []
+        model.buffer.set_line(1, "b = 22")
+        highlighter.invalidate(1)
+        assert highlighter.settle(4) == [] and lexer.lexed == ["b = 22"]
+        assert highlighter.line_tokens(1) == [(4, 6, "number")] and lexer.lexed == ["b = 22"]
+        model.buffer.set_line(1, '"""b = 22')
+        highlighter.invalidate(1)
+        assert highlighter.settle(4) == [2, 3, 4]
+        assert highlighter.line_tokens(3) == [(0, 5, "string")]
+        assert highlighter.line_tokens(1) == [(0, 9, "string")]
+        highlighter.invalidate_from(2)
+        assert highlighter.known == 3 and highlighter.states == {2: '"""'}
+        assert highlighter.line_tokens(4) == [(0, 5, "string")]
+
+    def test_far_jump_stores_no_skipped_states(self):
+        highlighter = Highlighter(EndlessBuffer(), PYTHON)
+        assert highlighter.line_tokens(5_000_000) == [(4, 5, "number")]
+        assert highlighter.known == 5_000_001 and highlighter.states == {}
+
+    def test_view_styles(self):
+        model = WindowedLines(filename="example.py", window_size=(4, 20))
+        model.insert_text("x = 1\ny = 2\nz = 3")
+        driver = HeadlessDriver(model, 4, 21)
+        driver.view.update(model=model)
+        assert driver.window.styles == {(row, 4, 1, curses.A_NORMAL) for row in range(3)}
+        model.putch(curses.KEY_HOME)
+        model.insert_text("#")
+        driver.view.update(model=model)
+        assert driver.view.last_rows_redrawn == 1
+        assert (0, 0, 6, curses.A_DIM) in driver.window.styles
+        model.insert_text("'''")
+        driver.view.update(model=model)
+        assert driver.view.last_rows_redrawn == 1
+        model.putch(curses.KEY_HOME)
+        model.right()
+        model.delete()
+        driver.view.update(model=model)
+        assert driver.view.last_rows_redrawn == 3
+        assert driver.window.styles == {(0, 0, 8, curses.A_NORMAL), (1, 0, 5, curses.A_NORMAL), (2, 0, 5, curses.A_NORMAL)}
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -2,18 +2,50 @@ from phonemes import Phoneme, PHONEME_DICT
 from phoneme_interpreter_interface import PhonemeInterpreterInterface
 
 class InputPhoneme:
+    """The phonemes typed for the word being entered. The words, completions and panel text
+    for them are cached against versions that change only when phonemes, chars or word_idx
+    do, so redrawing the panel after keys that change none of them costs no lookups.
+    hits and misses count how often the cache was used for profiling."""
     def __init__(self, interpreter:PhonemeInterpreterInterface):
         self.phoneme_interpreter = interpreter
         self.phonemes:list[Phoneme] = []
         self.chars:list[str] = []
         self.word_lst:list[str] = []
+        self.completion_lst:list[str] = []
+        self.suggestion_lst:list[str] = []
         self.word_idx = 0
+        self.lookup = interpreter.lookup()
+        self.phonemes_version = 0 # bumped when phonemes change
+        self.version = 0 # bumped when phonemes, chars or word_idx change
+        self.words_version = -1
+        self.completions_version = -1
+        self.suggestions_version = -1
+        self.panel_version = -1
+        self.panel_text = ""
+        self.hits = 0
+        self.misses = 0
+
+    def changed(self, phonemes:bool=False) -> None:
+        self.version += 1
+        if phonemes:
+            self.phonemes_version += 1
+
+    def cached(self, version:int, cached_version:int) -> bool:
+        if version == cached_version:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def cache_stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
 
     def lower_and_join_chars(self) -> str:
         return ''.join([c.lower() for c in self.chars])
 
     def update_word_idx(self, inc):
-        self.word_idx = (self.word_idx + inc) % len(self.word_lst)
+        self.word_idx = (self.word_idx + inc) % len(self.update_words())
+        self.changed()
 
     def cycle_word_lst(self, clockwise:bool):
         if clockwise:
@@ -21,9 +53,14 @@ class InputPhoneme:
         else:
             self.update_word_idx(-1)
 
+    def update_words(self) -> list[str]:
+        if not self.cached(self.phonemes_version, self.words_version):
+            self.word_lst = self.lookup.words()
+            self.words_version = self.phonemes_version
+        return self.word_lst
+
     def update_word(self) -> str:
-        self.word_lst = self.phoneme_interpreter.interpret(self.phonemes)
-        if self.word_lst:
+        if self.update_words():
             word = self.word_lst[self.word_idx]
             if self.phonemes[0].capitalized:
                 word = word.capitalize()
@@ -34,23 +71,48 @@ class InputPhoneme:
         if not char.isalpha():
             raise ValueError("Non-alphabetical characters cannot generate a phoneme.")
         self.chars.append(char)
-        if self.lower_and_join_chars() in PHONEME_DICT:
-            self.phonemes.append(Phoneme(phoneme=PHONEME_DICT[self.lower_and_join_chars()], capitalized=self.chars[0].isupper()))
+        code = self.lower_and_join_chars()
+        if code in PHONEME_DICT:
+            phoneme = Phoneme(phoneme=PHONEME_DICT[code], capitalized=self.chars[0].isupper())
+            self.phonemes.append(phoneme)
+            self.lookup.append(phoneme)
             self.chars = []
+            self.changed(phonemes=True)
             return self.update_word()
         elif len(self.chars) > 2:
             raise ValueError("There cannot be more than 2 values in chars.")
+        self.changed()
 
     def get_panel_text(self) -> str:
-        curr_phonemes = ''.join([phoneme.phoneme.name for phoneme in self.phonemes])
-        curr_chars = ''.join(self.chars)
-        curr_word = self.update_word()
-        return curr_phonemes + curr_chars + "\n" + curr_word
-    
+        if not self.cached(self.version, self.panel_version):
+            curr_phonemes = ''.join([phoneme.phoneme.name for phoneme in self.phonemes])
+            curr_chars = ''.join(self.chars)
+            curr_word = self.update_word()
+            self.panel_text = curr_phonemes + curr_chars + "\n" + curr_word + "\n" + ' '.join(self.update_suggestions() + self.update_completions())
+            self.panel_version = self.version
+        return self.panel_text
+
+    def update_completions(self) -> list[str]:
+        """Longer words starting with the phonemes typed so far, best first."""
+        if not self.cached(self.phonemes_version, self.completions_version):
+            self.completion_lst = self.lookup.completions() if self.phonemes else []
+            self.completions_version = self.phonemes_version
+        return self.completion_lst
+
+    def update_suggestions(self) -> list[str]:
+        """Near misses for phonemes that spell no word, such as one mistyped phoneme."""
+        if not self.cached(self.phonemes_version, self.suggestions_version):
+            self.suggestion_lst = self.lookup.fuzzy() if self.phonemes and not self.update_words() else []
+            self.suggestions_version = self.phonemes_version
+        return self.suggestion_lst
+
     def complete(self) -> str:
         out = self.update_word()
         self.phonemes = []
         self.chars = []
+        self.word_idx = 0
+        self.lookup = self.phoneme_interpreter.lookup()
+        self.changed(phonemes=True)
         return out
 
     def is_chars_empty(self) -> bool:
@@ -60,4 +122,4 @@ class InputPhoneme:
         return not self.phonemes
     
     def is_word_lst_empty(self) -> bool:
-        return not self.word_lst
\ No newline at end of file
+        return not self.update_words()
\ No newline at end of file
@@ -2,6 +2,22 @@ import unittest
 from phonemes import PhonemeEnums
 from input_phoneme import InputPhoneme
 from dict_phoneme_interpreter import DictPhonemeInterpreter
+from test_phoneme_interpreter import TestPhonemeInterpreter
+
+class CountingInterpreter(TestPhonemeInterpreter):
+    def __init__(self):
+        self.lookups = 0
+
+    def interpret(self, phonemes):
+        self.lookups += 1
+        return super().interpret(phonemes)
+
+class MisspeltInterpreter(TestPhonemeInterpreter):
+    def interpret(self, phonemes):
+        return []
+
+    def fuzzy(self, phonemes, max_distance=1):
+        return ["near", "miss"]
 
 class InputPhonemeTest(unittest.TestCase):
     # hh -> h phoneme
@@ -50,6 +66,43 @@ class InputPhonemeTest(unittest.TestCase):
         input_phoneme.cycle_word_lst(False)
         assert input_phoneme.update_word() == "hey"
 
+    def test_completions(self):
+        input_phoneme = InputPhoneme(interpreter=DictPhonemeInterpreter())
+        assert not input_phoneme.update_completions()
+        input_phoneme.update_phonemes('h')
+        input_phoneme.update_phonemes('h')
+        assert not input_phoneme.update_word()
+        assert "hey" in input_phoneme.update_completions()
+        input_phoneme.complete()
+        assert not input_phoneme.update_completions()
+
+    def test_panel_cache(self):
+        interpreter = CountingInterpreter()
+        input_phoneme = InputPhoneme(interpreter=interpreter)
+        input_phoneme.update_phonemes('h')
+        assert input_phoneme.get_panel_text() == "h\n\n"
+        input_phoneme.update_phonemes('h')
+        lookups = interpreter.lookups
+        text = input_phoneme.get_panel_text()
+        assert text.startswith("h\nfee\n")
+        assert input_phoneme.get_panel_text() is text and interpreter.lookups == lookups
+        hits = input_phoneme.hits
+        input_phoneme.cycle_word_lst(True)
+        assert input_phoneme.get_panel_text().startswith("h\nfie\n")
+        assert interpreter.lookups == lookups and input_phoneme.hits > hits
+        assert input_phoneme.complete() == "fie"
+        assert input_phoneme.is_word_lst_empty() and input_phoneme.word_idx == 0
+        assert input_phoneme.get_panel_text() == "\n\n"
+        assert input_phoneme.cache_stats() == {"hits": input_phoneme.hits, "misses": input_phoneme.misses}
+
+    def test_suggestions_for_misspelt_phonemes(self):
+        input_phoneme = InputPhoneme(interpreter=MisspeltInterpreter())
+        input_phoneme.update_phonemes('f')
+        assert input_phoneme.get_panel_text() == "f\n\nnear miss"
+        input_phoneme = InputPhoneme(interpreter=TestPhonemeInterpreter())
+        input_phoneme.update_phonemes('f')
+        assert not input_phoneme.update_suggestions()
+
 
 if __name__ == '__main__':
     unittest.main()
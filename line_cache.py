@@ -0,0 +1,45 @@
+"""
+A cache of values worked out from buffer lines, such as their display widths, wrapped
+rows or tokens, keyed by row. An entry is dropped when its line is edited, every entry
+from a row down when lines are inserted or deleted above them, and the whole cache once
+it holds MAX_CACHED_LINES lines, so scrolling through a long file cannot grow it without
+bound.
+"""
+
+MAX_CACHED_LINES = 4096
+
+class LineCache:
+    def __init__(self, max_lines:int=MAX_CACHED_LINES):
+        self.max_lines = max_lines
+        self.lines:dict = {}
+
+    def __contains__(self, row:int) -> bool:
+        return row in self.lines
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def get(self, row:int, default=None):
+        return self.lines.get(row, default)
+
+    def put(self, row:int, value):
+        """Caches value for row, first emptying the cache if it is full, and returns value."""
+        if len(self.lines) >= self.max_lines and row not in self.lines:
+            self.lines.clear()
+        self.lines[row] = value
+        return value
+
+    def clear(self) -> None:
+        self.lines.clear()
+
+    def invalidate(self, row:int) -> None:
+        """Drops the line at row, which was edited."""
+        self.lines.pop(row, None)
+
+    def invalidate_from(self, row:int) -> None:
+        """Drops the lines from row down, whose rows shift when lines are inserted or deleted."""
+        for cached in [cached for cached in self.lines if cached >= row]:
+            del self.lines[cached]
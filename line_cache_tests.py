@@ -0,0 +1,30 @@
+import unittest
+from line_cache import LineCache
+
+class LineCacheTest(unittest.TestCase):
+    def test_invalidation(self):
+        cache = LineCache()
+        for row in range(5):
+            assert cache.put(row, row*10) == row*10
+        cache.put(1, None)
+        assert 1 in cache and cache.get(1, "missing") is None
+        cache.invalidate(2)
+        assert sorted(cache) == [0, 1, 3, 4]
+        cache.invalidate_from(3)
+        assert sorted(cache) == [0, 1]
+        cache.clear()
+        assert not cache
+
+    def test_full_cache_is_emptied(self):
+        cache = LineCache(max_lines=3)
+        for row in range(3):
+            cache.put(row, row)
+        cache.put(2, "again")
+        assert len(cache) == 3
+        cache.put(7, 7)
+        assert list(cache) == [7]
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -0,0 +1,75 @@
+"""
+A Fenwick (binary indexed) tree of counts, used to index the lines and bytes held by each
+piece of the piece table. Prefix sums, point updates and finding the entry that holds a
+given line all take logarithmic time.
+"""
+
+class FenwickTree:
+    def __init__(self, values:list[int]=()):
+        """Builds the tree from values in linear time."""
+        self.tree = [0]
+        self.tree.extend(values)
+        size = len(self.tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self) -> int:
+        return len(self.tree)-1
+
+    def append(self, value:int) -> None:
+        i = len(self.tree)
+        self.tree.append(value + self.prefix(i-1) - self.prefix(i - (i & -i)))
+
+    def extend(self, values:list[int]) -> None:
+        """Appends values in linear time. The new nodes are built as the constructor builds
+        the tree, then the few whose ranges reach back before the new values have the old
+        values they cover added in."""
+        start = len(self.tree)
+        old_total = self.prefix(start-1)
+        self.tree.extend(values)
+        size = len(self.tree)
+        for i in range(start, size):
+            parent = i + (i & -i)
+            if parent < size:
+                self.tree[parent] += self.tree[i]
+        for i in range(start, size):
+            low = i - (i & -i)
+            if low < start-1:
+                self.tree[i] += old_total - self.prefix(low)
+
+    def truncate(self, size:int) -> None:
+        """Drops the values from index size on. The nodes left cover only earlier values."""
+        del self.tree[size+1:]
+
+    def add(self, i:int, delta:int) -> None:
+        """Adds delta to the value at index i."""
+        i += 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i:int) -> int:
+        """The sum of the values before index i."""
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def total(self) -> int:
+        return self.prefix(len(self.tree)-1)
+
+    def find(self, target:int) -> tuple[int, int]:
+        """Returns the index i whose value covers target, counting from zero across all the
+        values, and target's offset within it. i is len(self) if target is past the end."""
+        i = 0
+        step = 1 << (len(self.tree)-1).bit_length() >> 1
+        while step:
+            j = i+step
+            if j < len(self.tree) and self.tree[j] <= target:
+                target -= self.tree[j]
+                i = j
+            step >>= 1
+        return i, target
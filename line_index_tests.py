@@ -0,0 +1,48 @@
+import unittest
+from line_index import FenwickTree
+
+class FenwickTreeTest(unittest.TestCase):
+    def test_prefix_and_add(self):
+        values = [3, 0, 5, 1, 4, 0, 2]
+        tree = FenwickTree(values)
+        assert [tree.prefix(i) for i in range(len(values)+1)] == [sum(values[:i]) for i in range(len(values)+1)]
+        tree.add(2, -4)
+        values[2] -= 4
+        assert tree.total() == sum(values)
+        assert tree.prefix(3) == 4
+
+    def test_append(self):
+        tree = FenwickTree()
+        for value in range(1, 20):
+            tree.append(value)
+            assert tree.total() == value*(value+1)//2
+        assert len(tree) == 19
+        assert tree.prefix(10) == 55
+
+    def test_extend(self):
+        for split in range(20):
+            tree = FenwickTree(range(1, split+1))
+            tree.extend(range(split+1, 20))
+            assert tree.tree == FenwickTree(range(1, 20)).tree
+
+    def test_truncate(self):
+        tree = FenwickTree(range(1, 20))
+        tree.truncate(7)
+        assert len(tree) == 7 and tree.total() == 28
+        tree.extend([0, 5])
+        assert tree.tree == FenwickTree([1, 2, 3, 4, 5, 6, 7, 0, 5]).tree
+
+    def test_find(self):
+        values = [3, 0, 5, 1, 4]
+        tree = FenwickTree(values)
+        found = [tree.find(target) for target in range(sum(values)+1)]
+        assert found[:3] == [(0, 0), (0, 1), (0, 2)]
+        assert found[3] == (2, 0)
+        assert found[8] == (3, 0)
+        assert found[9] == (4, 0)
+        assert found[13] == (5, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
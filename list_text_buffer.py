@@ -0,0 +1,60 @@
+"""
+The simplest text buffer: a list of decoded lines.
+"""
+
+from typing import BinaryIO, Iterator
+from text_buffer_interface import TextBufferInterface, ENCODING, ERRORS, LINE_OVERHEAD
+
+class ListTextBuffer(TextBufferInterface):
+    def __init__(self):
+        self.lines:list[str] = [""]
+        self.newline = "\n"
+        self.trailing_newline = False
+
+    def load(self, data:bytes) -> None:
+        text = bytes(data).decode(ENCODING, ERRORS)
+        self.newline = "\r\n" if "\r\n" in text[:text.find("\n")+1] else "\n"
+        self.trailing_newline = text.endswith("\n")
+        lines = text.split("\n")
+        if self.trailing_newline:
+            lines.pop()
+        self.lines = [l[:-1] if l.endswith("\r") else l for l in lines]
+
+    def line_count(self) -> int:
+        return len(self.lines)
+
+    def get_line(self, row:int) -> str:
+        return self.lines[row]
+
+    def set_line(self, row:int, text:str) -> None:
+        self.lines[row] = text
+
+    def insert_lines(self, row:int, lines:list[str]) -> None:
+        self.lines[row:row] = lines
+
+    def delete_lines(self, start:int, stop:int) -> None:
+        del self.lines[start:stop]
+        if not self.lines:
+            self.lines.append("")
+
+    def line_offset(self, row:int) -> int:
+        newline = len(self.newline.encode(ENCODING))
+        return sum(len(line.encode(ENCODING, ERRORS))+newline for line in self.lines[:row])
+
+    def iter_lines(self, start:int=0, stop:int=None) -> Iterator[str]:
+        return iter(self.lines[start:stop])
+
+    def memory_size(self) -> int:
+        return sum(map(len, self.lines)) + LINE_OVERHEAD*len(self.lines)
+
+    def snapshot(self) -> TextBufferInterface:
+        snapshot = ListTextBuffer()
+        snapshot.lines = list(self.lines)
+        snapshot.newline = self.newline
+        snapshot.trailing_newline = self.trailing_newline
+        return snapshot
+
+    def write(self, f:BinaryIO) -> None:
+        f.write(self.newline.join(self.lines).encode(ENCODING, ERRORS))
+        if self.trailing_newline:
+            f.write(self.newline.encode(ENCODING))
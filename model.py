@@ -1,164 +1,665 @@
 """
-The data structure is a list of previous lines and next lines.
+The data structure is a text buffer of lines and a cursor row and column within it.
 """
 
 import curses
+import mmap
+import os
+import threading
+import region
 from input_phoneme import InputPhoneme
-from dict_phoneme_interpreter import DictPhonemeInterpreter
+from phoneme_interpreter_interface import PhonemeInterpreterInterface
+from text_buffer_interface import TextBufferInterface
+from piece_table_buffer import PieceTableBuffer
+from save_engine import save_file
+from search import Search
+from edit_journal import EditJournal, read_journal
+from task_runner import TaskRunner
+from undo_history import UndoHistory, Edit, text_end
+from wrap_layout import WrapLayout
+from display_width import DisplayWidths, TAB_SIZE
+from highlight import Highlighter, lexer_for
+
+MMAP_THRESHOLD = 1 << 24
+
+PASTE_START = [27, 91, 50, 48, 48, 126] # ESC[200~
+PASTE_END = [27, 91, 50, 48, 49, 126] # ESC[201~
+
+def find_keys(keys:list[int], sequence:list[int], start:int=0) -> int:
+    """The index of sequence in keys at or after start, or -1."""
+    for i in range(start, len(keys)-len(sequence)+1):
+        if keys[i] == sequence[0] and keys[i:i+len(sequence)] == sequence:
+            return i
+    return -1
+
+def ends_in_prefix(keys:list[int], sequence:list[int]) -> bool:
+    """Whether keys end with the start of sequence, but not all of it."""
+    return any(keys[-n:] == sequence[:n] for n in range(1, min(len(sequence), len(keys)+1)))
+
+def is_text_key(key:int) -> bool:
+    return key == 10 or key == 9 or 32 <= key < 127
 
 class WindowedLines:
-    """Stores the current line, previous lines, next lines, and the cursor position."""
-    def __init__(self, filename, window_size=(10,16), cursor_position=0) -> None:
+    """Stores the lines of text in a buffer, the cursor position, and the window onto them."""
+    def __init__(self, filename, window_size=(10,16), cursor_position=0, buffer:TextBufferInterface=None,
+                 interpreter:PhonemeInterpreterInterface=None, tasks:TaskRunner=None, autosave:bool=False,
+                 interpreter_factory=None, tab_size:int=TAB_SIZE, insert_tabs:bool=False) -> None:
         self.filename = filename
 
-        self.curr_line = []
+        self.buffer = buffer if buffer is not None else PieceTableBuffer()
+        self.source_file = None
+        self.cursor_row = 0
         self.cursor_position = cursor_position
-        self.saved_cursor_x_position = cursor_position
-        self.prev_lines= []
-        self.next_lines = []
+        self.saved_cursor_x_position = cursor_position # the screen column up and down aim for
 
         self.window_size = window_size
         self.top_window_row = 0
-        self.top_window_col = 0
+        self.top_window_col = 0 # a screen column, which widths maps to and from offsets
+        self.widths = DisplayWidths(self.buffer, tab_size)
+        self.insert_tabs = insert_tabs
+        lexer = lexer_for(filename)
+        self.highlighter = Highlighter(self.buffer, lexer) if lexer else None
+        self.wrap = False
+        self.layout:WrapLayout = None
+        self.top_window_sub = 0 # the first visual row of top_window_row shown when wrapping
+        self.wrap_goal:tuple = None # ((row, col), x) after moving between visual rows
+        self.visible:tuple = None
 
-        self.mark = None
+        self.mark:tuple[int, int] = None # (row, col) of the other end of the region
+        self.history = UndoHistory()
+        self.goto_input:str = None
+        self.message:str = None
+
+        self.tasks = tasks
+        self.saving = 0
+        self.autosave = autosave
+        self.journal:EditJournal = None
+
+        self.search:Search = None
+        self.search_input:str = None
+        self.search_regex = False
+        self.search_backward = False
+        self.search_origin:tuple[int, int] = None
+        self.pending_jump:bool = None # None, or whether a match at the cursor counts
+        self.search_highlights:tuple = None
+
+        self.damaged_rows:set[int] = set()
+        self.damaged_from:int = None
+        self.rendered_window:tuple = None
 
         self.phoneme_mode = False
-        self.input_phoneme = InputPhoneme(interpreter=DictPhonemeInterpreter())
+        self.interpreter = interpreter
+        self.interpreter_factory = interpreter_factory
+        self.input_phoneme:InputPhoneme = None
+        self.input_phoneme_lock = threading.Lock()
         self.running = True
 
     def __repr__(self) -> str:
         return f"WindowedLines({self.curr_line=}, {self.cursor_position=})"
 
+    @property
+    def curr_line(self) -> list[str]:
+        """The current line as a list of characters."""
+        return list(self.get_curr_line())
+
+    @property
+    def prev_lines(self) -> list[list[str]]:
+        """The lines above the cursor as lists of characters, nearest last."""
+        return [list(line) for line in self.buffer.iter_lines(0, self.cursor_row)]
+
+    @property
+    def next_lines(self) -> list[list[str]]:
+        """The lines below the cursor as lists of characters, nearest last."""
+        return [list(line) for line in self.buffer.iter_lines(self.cursor_row+1)][::-1]
+
+    def get_curr_line(self) -> str:
+        return self.buffer.get_line(self.cursor_row)
+
     def get_phoneme_mode(self) -> bool:
         return self.phoneme_mode
     
     def toggle_phoneme_mode(self):
         self.phoneme_mode = not self.phoneme_mode
+        if self.phoneme_mode:
+            self.get_input_phoneme()
+        self.damage_all()
+
+    def panel_visible(self) -> bool:
+        return (self.phoneme_mode or self.goto_input is not None or self.search_input is not None
+                or self.message is not None)
+
+    def get_input_phoneme(self) -> InputPhoneme:
+        """Creates the phoneme input, and the dictionary interpreter (from interpreter_factory,
+        if given, so several buffers can share one) unless one was given,
+        the first time phoneme mode is used so plain editing never loads the dictionary."""
+        with self.input_phoneme_lock:
+            if self.input_phoneme is None:
+                if self.interpreter is None and self.interpreter_factory:
+                    self.interpreter = self.interpreter_factory()
+                elif self.interpreter is None:
+                    from dict_phoneme_interpreter import DictPhonemeInterpreter
+                    self.interpreter = DictPhonemeInterpreter()
+                self.input_phoneme = InputPhoneme(interpreter=self.interpreter)
+            return self.input_phoneme
+
+    def preload_input_phoneme(self) -> None:
+        """Loads the phoneme input and its dictionary now."""
+        self.get_input_phoneme().phoneme_interpreter.preload()
+
+    def preload_input_phoneme_in_background(self) -> threading.Thread:
+        """Preloads on a thread. A failure, such as a missing dictionary, is shown as a
+        message rather than printed over the screen."""
+        def preload():
+            try:
+                self.preload_input_phoneme()
+            except Exception as error:
+                self.message = f"Phoneme dictionary unavailable: {error}"
+                self.damage_all()
+        thread = threading.Thread(target=preload, daemon=True)
+        thread.start()
+        return thread
+
+    def damage_row(self, row:int) -> None:
+        """Records that a buffer row changed and must be redrawn."""
+        self.damaged_rows.add(row)
+        self.widths.invalidate(row)
+        if self.highlighter:
+            self.highlighter.invalidate(row)
+        if self.layout:
+            self.layout.invalidate(row)
+            self.visible = None
+
+    def damage_from(self, row:int) -> None:
+        """Records that every buffer row from row down changed, e.g. because lines shifted."""
+        if self.damaged_from is None or row < self.damaged_from:
+            self.damaged_from = row
+        self.widths.invalidate_from(row)
+        if self.highlighter:
+            self.highlighter.invalidate_from(row)
+        if self.layout:
+            self.layout.invalidate_from(row)
+            self.visible = None
+
+    def damage_all(self) -> None:
+        self.rendered_window = None
+
+    def take_damage(self) -> list[int]:
+        """Returns the window rows changed since the last call and clears the damage."""
+        if self.highlighter:
+            self.damaged_rows.update(self.highlighter.settle(self.top_window_row+self.window_size[0]))
+        window = (self.top_window_row, self.top_window_col, self.window_size)
+        if self.wrap:
+            rows, window = self.take_wrapped_damage(window)
+        elif window != self.rendered_window:
+            rows = list(range(self.window_size[0]))
+        else:
+            top, height = self.top_window_row, self.window_size[0]
+            damaged = {row-top for row in self.damaged_rows if top <= row < top+height}
+            if self.damaged_from is not None:
+                damaged.update(range(max(self.damaged_from-top, 0), height))
+            rows = sorted(damaged)
+        self.rendered_window = window
+        self.damaged_rows = set()
+        self.damaged_from = None
+        return rows
 
     def update_window_cols(self) -> None:
-        """Update the window's first column relative to the cursor."""
-        if self.cursor_position > self.window_size[1]+self.top_window_col:
-            self.top_window_col += self.cursor_position-(self.window_size[1]+self.top_window_col)
-        elif self.cursor_position < self.top_window_col:
-            self.top_window_col -= self.top_window_col-self.cursor_position
-        while self.top_window_col > 0 and self.window_size[1] > self.cursor_position-self.top_window_col:
-            self.top_window_col-=1
+        """Update the window's first column relative to the cursor, which is kept in the
+        last column once the line scrolls."""
+        if self.wrap:
+            self.top_window_col = 0
+            return
+        self.top_window_col = max(self.widths.column(self.cursor_row, self.cursor_position)-self.window_size[1], 0)
+
+    def reveal_cursor(self) -> None:
+        """Scrolls the window straight to the cursor after it may have jumped any distance."""
+        if self.wrap:
+            self.scroll_to_cursor()
+            return
+        if self.cursor_row < self.top_window_row:
+            self.top_window_row = self.cursor_row
+        elif self.cursor_row >= self.top_window_row+self.window_size[0]:
+            self.top_window_row = self.cursor_row-self.window_size[0]+1
+        self.update_window_cols()
+        self.update_window_rows()
 
     def update_window_rows(self) -> None:
         """Update the window's first row relative to row-changing operations."""
-
-        if self.top_window_row >= len(self.prev_lines):
-            self.top_window_row = len(self.prev_lines)
-        elif self.window_size[0] < len(self.prev_lines[self.top_window_row:])+len(self.next_lines[-(self.window_size[0]-len(self.prev_lines[self.top_window_row:])-1):])+1:
+        if self.wrap:
+            self.scroll_to_cursor()
+            return
+        rows_above = self.cursor_row-self.top_window_row
+        if self.top_window_row >= self.cursor_row:
+            self.top_window_row = self.cursor_row
+        elif rows_above >= self.window_size[0] or (rows_above == self.window_size[0]-1 and self.buffer.has_line(self.cursor_row+1)):
             self.top_window_row+=1
-        
+
+    def save_cursor_column(self) -> None:
+        """Makes the cursor's screen column the one moving up and down keeps to."""
+        self.saved_cursor_x_position = self.widths.column(self.cursor_row, self.cursor_position)
+
+    def tab_text(self) -> str:
+        """What TAB inserts: a tab character, drawn up to the next tab stop, or tab_size spaces."""
+        return "\t" if self.insert_tabs else " " * self.widths.tab_size
+
+    def toggle_wrap(self) -> None:
+        """Switches between soft-wrapping long lines and scrolling them sideways."""
+        self.wrap = not self.wrap
+        self.layout = WrapLayout(self.buffer, self.window_size[1], self.widths) if self.wrap else None
+        self.top_window_sub = 0
+        self.visible = None
+        self.reveal_cursor()
+        self.damage_all()
+
+    def resize(self, window_size:tuple[int, int]) -> None:
+        self.window_size = window_size
+        if self.layout:
+            self.layout.resize(window_size[1])
+            self.visible = None
+        self.reveal_cursor()
+        self.damage_all()
+
+    def cursor_sub(self) -> tuple[int, int]:
+        """The cursor's position in the wrap layout."""
+        return self.cursor_row, self.layout.sub_row(self.cursor_row, self.cursor_position)
+
+    def scroll_to_cursor(self) -> None:
+        """Scrolls the wrapped window the least distance that shows the cursor's visual row."""
+        self.top_window_col = 0
+        self.top_window_sub = min(self.top_window_sub, len(self.layout.starts(self.top_window_row))-1)
+        top, cursor, height = (self.top_window_row, self.top_window_sub), self.cursor_sub(), self.window_size[0]
+        if cursor < top:
+            self.top_window_row, self.top_window_sub = cursor
+        elif self.layout.distance(top, cursor, height) >= height:
+            self.top_window_row, self.top_window_sub = self.layout.step(*cursor, 1-height)
+
+    def move_visual(self, count:int) -> None:
+        """Moves the cursor count visual rows down, or up if count is negative, keeping the
+        column on screen it had when a run of such moves began."""
+        row, sub = self.cursor_sub()
+        start, end = self.layout.span(row, sub)
+        x = self.widths.column(row, self.cursor_position)-self.widths.column(row, start)
+        if self.wrap_goal and self.wrap_goal[0] == (self.cursor_row, self.cursor_position):
+            x = self.wrap_goal[1]
+        new_row, new_sub = self.layout.step(row, sub, count)
+        if (new_row, new_sub) == (row, sub):
+            self.cursor_position = 0 if count < 0 else len(self.get_curr_line())
+        else:
+            start, end = self.layout.span(new_row, new_sub)
+            last = new_sub == len(self.layout.starts(new_row))-1
+            self.cursor_row = new_row
+            col = self.widths.offset(new_row, self.widths.column(new_row, start)+x)
+            self.cursor_position = max(min(col, end if last else end-1), start)
+        self.wrap_goal = ((self.cursor_row, self.cursor_position), x)
+        self.scroll_to_cursor()
+
+    def visible_rows(self) -> list[tuple[int, int, int]]:
+        """(row, start, end) for each visual row shown in the wrapped window."""
+        key = (self.top_window_row, self.top_window_sub, self.window_size)
+        if self.visible is None or self.visible[0] != key:
+            self.visible = (key, self.layout.visual_rows(self.top_window_row, self.top_window_sub, self.window_size[0]))
+        return self.visible[1]
+
+    def take_wrapped_damage(self, window:tuple) -> tuple[list[int], tuple]:
+        """The window rows to redraw when wrapping, those showing a damaged line or a
+        different part of the buffer than when last drawn, and the window drawn."""
+        rows = self.visible_rows()
+        window = (*window, self.top_window_sub, rows)
+        if self.rendered_window is None or len(self.rendered_window) != len(window) or window[:4] != self.rendered_window[:4]:
+            return list(range(self.window_size[0])), window
+        drawn = self.rendered_window[4]
+        return [i for i in range(self.window_size[0])
+                if (i < len(rows)) != (i < len(drawn)) or i < len(rows) and (
+                    rows[i] != drawn[i] or rows[i][0] in self.damaged_rows
+                    or self.damaged_from is not None and rows[i][0] >= self.damaged_from)], window
+
+    def cursor_window_position(self) -> tuple[int, int]:
+        """The window row and column the cursor is drawn at."""
+        if self.wrap:
+            row, sub = self.cursor_sub()
+            y = self.layout.distance((self.top_window_row, self.top_window_sub), (row, sub), self.window_size[0])
+            return y, self.widths.column(row, self.cursor_position)-self.widths.column(row, self.layout.starts(row)[sub])
+        return self.cursor_row-self.top_window_row, self.widths.column(self.cursor_row, self.cursor_position)-self.top_window_col
 
     def print_window(self) -> str:
         """Makes a string of the current window"""
-        out=""
-        prev_lines_window = self.prev_lines[self.top_window_row:]
-        curr_line_and_cursor = [self.curr_line]
-        next_lines_window = self.next_lines[-(self.window_size[0]-len(prev_lines_window)-1):][::-1]
-
-        for line in prev_lines_window + curr_line_and_cursor + next_lines_window:
-            windowed_line=''.join(line[self.top_window_col:])
-            if len(windowed_line) > self.window_size[1]:
-                windowed_line = windowed_line[:self.window_size[1]]
-            else:
-                while len(windowed_line) < self.window_size[1]:
-                    windowed_line+=" "
-            out+=(windowed_line+"\n")
-        return out[:-1]
+        if self.wrap:
+            return "\n".join(self.window_row(i) for i in range(len(self.visible_rows())))
+        rows = 0
+        while rows < self.window_size[0] and self.buffer.has_line(self.top_window_row+rows):
+            rows += 1
+        return "\n".join(self.window_row(i) for i in range(rows))
+
+    def window_row(self, window_row:int) -> str:
+        """Makes a string of one row of the current window, empty past the end of the buffer."""
+        if self.wrap:
+            rows = self.visible_rows()
+            if window_row >= len(rows):
+                return ""
+            row, start, end = rows[window_row]
+            return self.widths.render(row, self.widths.column(row, start), self.window_size[1], start, end)
+        row = self.top_window_row+window_row
+        if not self.buffer.has_line(row):
+            return ""
+        return self.widths.render(row, self.top_window_col, self.window_size[1])
     
     def set_mark(self) -> None:
-        self.mark = [len(self.prev_lines), self.cursor_position, self.curr_line]
+        self.history.seal()
+        self.mark = (self.cursor_row, self.cursor_position)
 
     def clear_mark(self) -> None:
+        self.history.seal()
         self.mark = None
 
-    def delete_region(self) -> None:
-        if self.mark[0] > len(self.prev_lines):
-            keep_right = self.mark[2][self.mark[1]:]
-            while self.mark[0] > len(self.prev_lines):
-                self.next_lines.pop()
-                self.mark[0] -= 1
-            self.curr_line = self.curr_line[:self.cursor_position] + keep_right
-
-        if self.mark[0] < len(self.prev_lines):
-            keep_left = self.mark[2][:self.mark[1]]
-            while self.mark[0] < len(self.prev_lines):
-                self.prev_lines.pop()
-            self.curr_line = keep_left + self.curr_line[self.cursor_position:]
-
+    def insert_text_at(self, row:int, col:int, text:str) -> tuple[int, int]:
+        """Inserts text, which may hold newlines, at row and col and returns the position after it."""
+        if self.journal:
+            self.journal.record(["i", row, col, text])
+        line = self.buffer.get_line(row)
+        lines = text.split("\n")
+        if len(lines) == 1:
+            self.buffer.set_line(row, line[:col] + text + line[col:])
+            self.damage_row(row)
         else:
-            if self.mark[1] > self.cursor_position:
-                self.curr_line = self.curr_line[:self.cursor_position] + self.curr_line[self.mark[1]:]
-            else:
-                self.curr_line = self.curr_line[:self.mark[1]] + self.curr_line[self.cursor_position:]
-        self.cursor_position = min(self.cursor_position, self.mark[1])
+            self.buffer.set_line(row, line[:col] + lines[0])
+            lines[-1] += line[col:]
+            self.buffer.insert_lines(row+1, lines[1:])
+            self.damage_from(row)
+        return text_end(row, col, text)
+
+    def text_between(self, start:tuple[int, int], end:tuple[int, int]) -> str:
+        if start[0] == end[0]:
+            return self.buffer.get_line(start[0])[start[1]:end[1]]
+        return "\n".join([self.buffer.get_line(start[0])[start[1]:], *self.buffer.iter_lines(start[0]+1, end[0]),
+                          self.buffer.get_line(end[0])[:end[1]]])
+
+    def delete_text_at(self, start:tuple[int, int], end:tuple[int, int]) -> str:
+        """Deletes the text from start up to end and returns it."""
+        if self.journal:
+            self.journal.record(["d", *start, *end])
+        first_line = self.buffer.get_line(start[0])
+        if start[0] == end[0]:
+            self.buffer.set_line(start[0], first_line[:start[1]] + first_line[end[1]:])
+            self.damage_row(start[0])
+            return first_line[start[1]:end[1]]
+        last_line = self.buffer.get_line(end[0])
+        removed = self.text_between(start, end)
+        self.buffer.delete_lines(start[0]+1, end[0]+1)
+        self.buffer.set_line(start[0], first_line[:start[1]] + last_line[end[1]:])
+        self.damage_from(start[0])
+        return removed
+
+    def replace_text_at(self, row:int, col:int, removed:str, inserted:str) -> tuple[int, int]:
+        """Replaces removed, which starts at row and col, with inserted and records it for undo."""
+        if self.search:
+            self.end_search()
+        self.history.record(Edit(row, col, removed, inserted, (self.cursor_row, self.cursor_position)))
+        if removed:
+            self.delete_text_at((row, col), text_end(row, col, removed))
+        if inserted:
+            return self.insert_text_at(row, col, inserted)
+        return row, col
+
+    def delete_region(self) -> None:
+        """Deletes the text between the mark and the cursor, leaving the cursor at the start of the region."""
+        start, end = sorted([self.mark, (self.cursor_row, self.cursor_position)])
+        removed = self.delete_text_at(start, end)
+        self.history.record(Edit(*start, removed, "", (self.cursor_row, self.cursor_position)))
+        self.cursor_row, self.cursor_position = start
         self.mark = None
+        self.save_cursor_column()
+        self.update_window_cols()
+        self.update_window_rows()
 
 
     def left(self) -> None:
         """Moves the cursor left by shifting the cursor position left."""
+        self.history.seal()
         if self.cursor_position > 0:
             self.cursor_position -= 1
-        self.saved_cursor_x_position = self.cursor_position
+        self.save_cursor_column()
         self.update_window_cols()
 
     def right(self) -> None:
         """Moves the cursor right by shifting the cursor position right."""
-        if self.cursor_position < len(self.curr_line):
+        self.history.seal()
+        if self.cursor_position < len(self.get_curr_line()):
             self.cursor_position += 1
-        self.saved_cursor_x_position = self.cursor_position
+        self.save_cursor_column()
         self.update_window_cols()
 
     def up(self) -> None:
-        """Moves the cursor up by retrieving the next line from next_lines."""
-        if self.prev_lines:
-            self.next_lines.append(self.curr_line)
-            self.curr_line = self.prev_lines.pop()
-            self.cursor_position = min(len(self.curr_line), self.saved_cursor_x_position)
+        """Moves the cursor up to the previous line of the buffer."""
+        self.history.seal()
+        if self.wrap:
+            self.move_visual(-1)
+            return
+        if self.cursor_row > 0:
+            self.cursor_row -= 1
+            self.cursor_position = self.widths.offset(self.cursor_row, self.saved_cursor_x_position)
         else:
             self.cursor_position = 0
         
         self.update_window_cols()
         self.update_window_rows()
 
+    def move_to_row(self, row:int) -> None:
+        """Moves the cursor to row, clamped to the buffer, keeping its column where it can."""
+        self.history.seal()
+        row = max(row, 0)
+        if not self.buffer.has_line(row):
+            row = self.buffer.line_count()-1
+        self.cursor_row = row
+        self.cursor_position = self.widths.offset(row, self.saved_cursor_x_position)
+
+    def goto_line(self, row:int) -> None:
+        """Jumps to the start of row, scrolling straight to it."""
+        self.saved_cursor_x_position = 0
+        self.move_to_row(row)
+        self.reveal_cursor()
+
+    def page_up(self) -> None:
+        height = self.window_size[0]
+        self.top_window_row = max(self.top_window_row-height, 0)
+        self.move_to_row(self.cursor_row-height)
+        self.reveal_cursor()
+
+    def page_down(self) -> None:
+        height = self.window_size[0]
+        self.move_to_row(self.cursor_row+height)
+        if self.buffer.has_line(self.top_window_row+height):
+            self.top_window_row += height
+        self.reveal_cursor()
+
+    def start_of_buffer(self) -> None:
+        self.goto_line(0)
+
+    def end_of_buffer(self) -> None:
+        self.move_to_row(self.buffer.line_count()-1)
+        self.cursor_position = len(self.get_curr_line())
+        self.save_cursor_column()
+        self.reveal_cursor()
+
+    def goto_key(self, key_input:int) -> None:
+        """Handles a key while the go-to-line prompt is open: digits build the line number,
+        ENTER jumps to it, and any other key closes the prompt."""
+        if ord("0") <= key_input <= ord("9"):
+            self.goto_input += chr(key_input)
+            return
+        if key_input == curses.KEY_BACKSPACE:
+            self.goto_input = self.goto_input[:-1]
+            return
+        if key_input in (10, curses.KEY_ENTER) and self.goto_input:
+            self.goto_line(int(self.goto_input)-1)
+        self.goto_input = None
+        self.damage_all()
+
+    def start_search(self, backward:bool=False) -> None:
+        """Opens the search prompt. The cursor jumps to the first match as the term is typed."""
+        self.search_input = ""
+        self.search_backward = backward
+        self.search_origin = (self.cursor_row, self.cursor_position)
+        self.damage_all()
+
+    def restart_search(self) -> None:
+        """Cancels the running search and starts scanning for the current term from the top."""
+        if self.search:
+            self.search.cancel()
+        self.search = None
+        self.move_to(*self.search_origin)
+        if self.search_input:
+            self.search = Search(self.buffer, self.search_input, self.search_regex)
+            self.search.start()
+            self.pending_jump = True
+        self.damage_all()
+
+    def end_search(self) -> None:
+        if self.search:
+            self.search.cancel()
+        self.search = None
+        self.search_input = None
+        self.pending_jump = None
+        self.search_highlights = None
+        self.damage_all()
+
+    def move_to(self, row:int, col:int) -> None:
+        self.history.seal()
+        self.cursor_row, self.cursor_position = row, col
+        self.save_cursor_column()
+        self.reveal_cursor()
+
+    def jump_to_match(self, backward:bool, inclusive:bool=False) -> bool:
+        """Moves the cursor to the next or previous match, returning False if it is not found yet."""
+        if backward:
+            i = self.search.previous_match(self.cursor_row, self.cursor_position)
+        else:
+            i = self.search.next_match(self.cursor_row, self.cursor_position, inclusive)
+        if i is None:
+            return False
+        self.move_to(*self.search.position(i))
+        return True
+
+    def is_searching(self) -> bool:
+        return self.search is not None and not self.search.done
+
+    def poll_search(self) -> None:
+        """Takes in the running search's progress: makes the pending jump once the match is
+        found, and redraws the window when the matches in it change."""
+        if self.search is None:
+            return
+        if self.pending_jump is not None:
+            if self.jump_to_match(self.search_backward, self.pending_jump) or self.search.done:
+                self.pending_jump = None
+        top = self.top_window_row
+        highlights = (top, self.search.count, self.search.done)
+        if highlights != self.search_highlights:
+            self.search_highlights = highlights
+            self.damage_all()
+
+    def search_key(self, key_input:int) -> bool:
+        """Handles a key while the search prompt is open. Typing edits the term, TAB toggles
+        regex search, CTRL+F and CTRL+R move to the next and previous match, ENTER keeps
+        the cursor where it is and ESC returns it. Any other key closes the prompt and
+        returns False to be handled as usual."""
+        if key_input == curses.KEY_BACKSPACE:
+            self.search_input = self.search_input[:-1]
+            self.restart_search()
+        elif key_input == 9: # TAB
+            self.search_regex = not self.search_regex
+            self.restart_search()
+        elif 32 <= key_input < 127:
+            self.search_input += chr(key_input)
+            self.restart_search()
+        elif key_input in (6, 18): # CTRL+F, CTRL+R
+            self.search_backward = key_input == 18
+            if self.search and not self.jump_to_match(self.search_backward):
+                self.pending_jump = False
+        elif key_input in (10, curses.KEY_ENTER):
+            self.end_search()
+        elif key_input == 27: # ESC
+            origin = self.search_origin
+            self.end_search()
+            self.move_to(*origin)
+        else:
+            self.end_search()
+            return False
+        return True
+
+    def window_span(self, window_row:int) -> tuple[int, int, int]:
+        """The buffer row a window row shows, and the first column and number of columns of
+        it shown, or None past the end of the buffer."""
+        if self.wrap:
+            rows = self.visible_rows()
+            if window_row >= len(rows):
+                return None
+            row, start, end = rows[window_row]
+            left = self.widths.column(row, start)
+            return row, left, self.widths.column(row, end)-left
+        row = self.top_window_row+window_row
+        return (row, self.top_window_col, self.window_size[1]) if self.buffer.has_line(row) else None
+
+    def window_columns(self, window_row:int, spans) -> list[tuple]:
+        """The window column and width, followed by any other fields, of each (start, end, ...)
+        span of offsets that spans returns for the line a window row shows, leaving out those
+        off the window."""
+        shown = self.window_span(window_row)
+        if shown is None:
+            return []
+        row, left, width = shown
+        columns = []
+        for start, end, *fields in spans(row):
+            start = max(self.widths.column(row, start), left)
+            end = min(self.widths.column(row, end), left+width)
+            if start < end:
+                columns.append((start-left, end-start, *fields))
+        return columns
+
+    def window_highlights(self, window_row:int) -> list[tuple[int, int]]:
+        """The window column and width of each search match to highlight on a window row."""
+        if self.search is None:
+            return []
+        return self.window_columns(window_row, lambda row: [(col, col+length) for col, length in self.search.matches_on(row)])
+
+    def window_styles(self, window_row:int) -> list[tuple[int, int, str]]:
+        """The window column, width and kind of each syntax token on a window row."""
+        if self.highlighter is None:
+            return []
+        return self.window_columns(window_row, self.highlighter.line_tokens)
+
     def down(self) -> None:
-        """Moves the cursor down by retrieving the previous lines from prev_lines."""
-        if self.next_lines:
-            self.prev_lines.append(self.curr_line)
-            self.curr_line = self.next_lines.pop()
-            self.cursor_position = min(len(self.curr_line), self.saved_cursor_x_position)
+        """Moves the cursor down to the next line of the buffer."""
+        self.history.seal()
+        if self.wrap:
+            self.move_visual(1)
+            return
+        if self.buffer.has_line(self.cursor_row+1):
+            self.cursor_row += 1
+            self.cursor_position = self.widths.offset(self.cursor_row, self.saved_cursor_x_position)
         else:
-            self.cursor_position = len(self.curr_line)
+            self.cursor_position = len(self.get_curr_line())
         self.update_window_cols()
         self.update_window_rows()
 
     def insert(self, char='') -> None:
         """Inserts char to the current line of text. If the char is \n, it 
-        will store everything behind the cursor in prev_lines."""
+        will split the current line at the cursor."""
         if self.mark:
             self.delete_region()
 
-        if char == '\n':
-            self.prev_lines.append(self.curr_line[:self.cursor_position])
-            self.curr_line = self.curr_line[self.cursor_position:]
-            self.cursor_position = 0
-        else:
-            if len(self.curr_line) <= self.cursor_position:
-                self.curr_line.append(char)
-            else:
-                self.curr_line = self.curr_line[:self.cursor_position] + [char] + self.curr_line[self.cursor_position:]
-                self.curr_line[self.cursor_position] = char
-
-            self.cursor_position += 1
-        self.saved_cursor_x_position = self.cursor_position
+        self.cursor_row, self.cursor_position = self.replace_text_at(self.cursor_row, self.cursor_position, "", char)
+        self.save_cursor_column()
         self.update_window_cols()
         self.update_window_rows()
 
+    def insert_text(self, text:str) -> None:
+        """Inserts text, which may span many lines, as a single edit."""
+        if self.mark:
+            self.delete_region()
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        self.cursor_row, self.cursor_position = self.replace_text_at(self.cursor_row, self.cursor_position, "", text)
+        self.save_cursor_column()
+        self.reveal_cursor()
+
     def delete(self) -> None:
         """Deletes char from current line of text. If it is at the end of the line and there 
         is a previous line, it will merge the two lines."""
@@ -167,55 +668,172 @@ class WindowedLines:
             return
         
         if self.cursor_position == 0:
-            if self.prev_lines:
-                prev_line = self.prev_lines.pop()
-                self.curr_line = prev_line + self.curr_line
-                self.cursor_position = len(prev_line)
+            if self.cursor_row > 0:
+                prev_line_end = len(self.buffer.get_line(self.cursor_row-1))
+                self.cursor_row, self.cursor_position = self.replace_text_at(self.cursor_row-1, prev_line_end, "\n", "")
         else:
-            self.curr_line = self.curr_line[:self.cursor_position-1] + self.curr_line[self.cursor_position:]
-            self.cursor_position -= 1
-        self.saved_cursor_x_position = self.cursor_position
+            removed = self.get_curr_line()[self.cursor_position-1]
+            self.cursor_row, self.cursor_position = self.replace_text_at(self.cursor_row, self.cursor_position-1, removed, "")
+        self.save_cursor_column()
         self.update_window_cols()
         self.update_window_rows()
 
+    def undo(self) -> None:
+        """Reverts the last edit, putting the cursor back where it was before the edit."""
+        edit = self.history.pop_undo()
+        if edit is None:
+            return
+        if edit.inserted:
+            self.delete_text_at((edit.row, edit.col), text_end(edit.row, edit.col, edit.inserted))
+        if edit.removed:
+            self.insert_text_at(edit.row, edit.col, edit.removed)
+        self.cursor_row, self.cursor_position = edit.cursor
+        self.after_history_jump()
+
+    def redo(self) -> None:
+        """Reapplies the last undone edit, leaving the cursor after its inserted text."""
+        edit = self.history.pop_redo()
+        if edit is None:
+            return
+        if edit.removed:
+            self.delete_text_at((edit.row, edit.col), text_end(edit.row, edit.col, edit.removed))
+        self.cursor_row, self.cursor_position = edit.row, edit.col
+        if edit.inserted:
+            self.cursor_row, self.cursor_position = self.insert_text_at(edit.row, edit.col, edit.inserted)
+        self.after_history_jump()
+
+    def after_history_jump(self) -> None:
+        self.mark = None
+        self.save_cursor_column()
+        self.reveal_cursor()
+
     def write_file(self) -> None:
-        f = open(self.filename ,"w", encoding="UTF-8")
-        for line in self.prev_lines:
-            f.write(''.join(line)+'\n')
-        f.write(''.join(self.curr_line))
-        if self.next_lines:
-            f.write('\n')
-        for line in self.next_lines[::-1]:
-            f.write(''.join(line)+'\n')
-        f.close()
+        """Atomically saves the buffer, copying unedited regions straight from the mapped original."""
+        source_fd = self.source_file.fileno() if self.source_file else None
+        saved = self.journal.saved_count() if self.journal else None
+        save_file(self.filename, self.buffer, source_fd=source_fd)
+        if self.journal:
+            self.journal.saved(saved)
+
+    def save_in_background(self) -> None:
+        """Saves a snapshot of the buffer with the task runner, so editing goes on meanwhile."""
+        source_fd = self.source_file.fileno() if self.source_file else None
+        filename, snapshot = self.filename, self.buffer.snapshot()
+        saved = self.journal.saved_count() if self.journal else None
+        self.saving += 1
+        self.tasks.submit(lambda: save_file(filename, snapshot, source_fd=source_fd),
+                          lambda writer, error: self.finish_save(error, saved, filename))
+
+    def finish_save(self, error:Exception, saved:int=None, filename:str=None) -> None:
+        """Reports a save of filename, the name the buffer had when the save started."""
+        self.saving -= 1
+        filename = self.filename if filename is None else filename
+        self.message = f"Save failed: {error}" if error else f"Saved {filename}"
+        if self.journal and not error:
+            self.journal.saved(saved)
+        self.damage_all()
+
+    def recover(self) -> list[list]:
+        """Replays the journaled edits left by a session that did not exit cleanly and
+        returns those that applied."""
+        applied = []
+        for op in read_journal(self.filename):
+            try:
+                if op[0] == "i":
+                    self.cursor_row, self.cursor_position = self.insert_text_at(op[1], op[2], op[3])
+                else:
+                    self.delete_text_at((op[1], op[2]), (op[3], op[4]))
+                    self.cursor_row, self.cursor_position = op[1], op[2]
+            except (IndexError, KeyError, TypeError):
+                break
+            applied.append(op)
+        if applied:
+            self.message = f"Recovered {len(applied)} unsaved edits"
+            self.save_cursor_column()
+            self.reveal_cursor()
+        return applied
+
+    def close_journal(self, remove:bool=False) -> None:
+        if self.journal:
+            self.journal.close(remove=remove)
+            self.journal = None
+
+    def close(self) -> None:
+        """Releases the file once any save in progress has finished: unmaps the buffer's
+        original and closes the file kept open for saves."""
+        if self.tasks:
+            self.tasks.wait()
+        self.buffer.close()
+        if self.source_file:
+            self.source_file.close()
+            self.source_file = None
 
     def read_file(self) -> None:
+        """Loads the file into the buffer, memory-mapping it if it is large. A mapped file is
+        kept open so that saves can copy from it after it has been replaced on disk."""
         if not self.filename:
             return
+        if self.tasks:
+            self.tasks.wait()
+        if self.source_file:
+            self.source_file.close()
+            self.source_file = None
         try:
-            f = open(self.filename ,"r", encoding="UTF-8")
-            lines = f.readlines()
-            lines = [l.translate({ord('\n'): None}) for l in lines]
+            f = open(self.filename, "rb")
+            if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.source_file = f
+            else:
+                data = f.read()
+                f.close()
         except FileNotFoundError:
-            f = open(self.filename, "x", encoding="UTF-8")
-            lines = []
-        f.close()
-        if lines:
-            self.curr_line, self.next_lines = list(lines[0]), [list(l) for l in lines[1:]][::-1]
-        else:
-            self.curr_line, self.next_lines = [], []
-        self.prev_lines = []
+            open(self.filename, "x", encoding="UTF-8").close()
+            data = b""
+        self.buffer.load(data)
+        self.widths.clear()
+        if self.highlighter:
+            self.highlighter.clear()
+        if self.layout:
+            self.layout.clear()
+            self.visible = None
+        self.top_window_sub = 0
+        self.history.clear()
+        self.end_search()
+        self.damage_all()
+
+        self.cursor_row = self.cursor_position = self.top_window_col = self.top_window_row = 0
+        if self.autosave:
+            self.close_journal()
+            recovered = self.recover()
+            self.journal = EditJournal(self.filename)
+            self.journal.start(recovered)
 
-        self.cursor_position = self.top_window_col = self.top_window_row = 0
+    def index_in_background(self) -> None:
+        self.buffer.index_in_background()
 
     def get_panel_text(self) -> str:
-        return self.input_phoneme.get_panel_text()
+        if self.goto_input is not None:
+            return f"Go to line: {self.goto_input}"
+        if self.search_input is not None:
+            prompt = "Regex search" if self.search_regex else "Search"
+            prompt += " backward" if self.search_backward else ""
+            return f"{prompt}: {self.search_input}\n" + (self.search.status() if self.search else "")
+        if self.message is not None:
+            return self.message
+        return self.get_input_phoneme().get_panel_text()
     
     def is_running(self) -> bool:
         return self.running
     
     def putch(self, key_input):
-        if key_input == curses.KEY_LEFT:
+        if self.message is not None:
+            self.message = None
+            self.damage_all()
+        if self.goto_input is not None:
+            self.goto_key(key_input)
+        elif self.search_input is not None and self.search_key(key_input):
+            pass
+        elif key_input == curses.KEY_LEFT:
             self.left()
         elif key_input == curses.KEY_RIGHT:
             self.right()
@@ -236,16 +854,50 @@ class WindowedLines:
                 self.input_phoneme.cycle_word_lst(False)
             else:
                 self.down()
+        elif key_input == curses.KEY_PPAGE:
+            self.page_up()
+        elif key_input == curses.KEY_NPAGE:
+            self.page_down()
+        elif key_input == curses.KEY_HOME:
+            self.start_of_buffer()
+        elif key_input == curses.KEY_END:
+            self.end_of_buffer()
         elif key_input == curses.KEY_F2:
             if not self.mark:
                 self.set_mark()
             else:
                 self.clear_mark()
+        elif key_input == 9 and self.mark: # TAB
+            region.indent(self)
         elif key_input == 9: # TAB
-            for _ in range(4):
-                self.insert(' ')
+            self.insert_text(self.tab_text())
+        elif key_input == curses.KEY_BTAB:
+            if self.mark:
+                region.dedent(self)
+        elif key_input == 21: # CTRL+U
+            if self.mark:
+                region.upper(self)
+        elif key_input == 12: # CTRL+L
+            if self.mark:
+                region.lower(self)
         elif key_input == 19: # CTRL+S
-            self.write_file()
+            if self.tasks:
+                self.save_in_background()
+            else:
+                self.write_file()
+        elif key_input == 26: # CTRL+Z
+            self.undo()
+        elif key_input == 25: # CTRL+Y
+            self.redo()
+        elif key_input == 7: # CTRL+G
+            self.goto_input = ""
+            self.damage_all()
+        elif key_input == 6: # CTRL+F
+            self.start_search()
+        elif key_input == 18: # CTRL+R
+            self.start_search(backward=True)
+        elif key_input == 20: # CTRL+T
+            self.toggle_wrap()
         elif key_input == 16: # CTRL+P
             self.toggle_phoneme_mode()
         elif key_input == 3: # CTRL+C
@@ -261,3 +913,26 @@ class WindowedLines:
                 self.input_phoneme.update_phonemes(chr(key_input))
         else:
             self.insert(chr(key_input))
+
+    def putch_keys(self, keys:list[int]) -> None:
+        """Handles a batch of pending keys. Runs of typed text and bracketed pastes are
+        each inserted with one insert_text instead of one insert per key."""
+        text = []
+        i = 0
+        while i < len(keys) and self.running:
+            if keys[i:i+len(PASTE_START)] == PASTE_START:
+                end = find_keys(keys, PASTE_END, i+len(PASTE_START))
+                end = len(keys) if end == -1 else end
+                text.append(bytes(key for key in keys[i+len(PASTE_START):end] if key < 256).decode("UTF-8", "replace"))
+                i = end+len(PASTE_END)
+            elif is_text_key(keys[i]) and not self.panel_visible() and not (keys[i] == 9 and self.mark):
+                text.append(self.tab_text() if keys[i] == 9 else chr(keys[i]))
+                i += 1
+            else:
+                if text:
+                    self.insert_text(''.join(text))
+                    text = []
+                self.putch(keys[i])
+                i += 1
+        if text:
+            self.insert_text(''.join(text))
@@ -1,8 +1,10 @@
 """Testing"""
 import unittest
 import os
+import curses
 
 from model import WindowedLines
+from test_phoneme_interpreter import TestPhonemeInterpreter
 
 model = WindowedLines(filename="tst.txt")
 class ModelTest(unittest.TestCase):
@@ -120,13 +122,22 @@ class ModelTest(unittest.TestCase):
         
         os.remove("tst.txt")
 
+    def test_print_window_is_lazy(self):
+        model = WindowedLines(filename="", window_size=(3, 20))
+        model.buffer.index_chunk_size = 64
+        model.buffer.load(b"".join(b"line %d\n" % i for i in range(1000)))
+        assert [row.rstrip() for row in model.print_window().split("\n")] == ["line 0", "line 1", "line 2"]
+        assert not model.buffer.indexed
+        model.top_window_row = 998
+        assert [row.rstrip() for row in model.print_window().split("\n")] == ["line 998", "line 999"]
+
     def test_mark(self):
         new_model=WindowedLines(filename="tst.txt")
         for char in "Hello\nthere,\nWorld!":
             new_model.insert(char)
         assert new_model.mark is None
         new_model.set_mark()
-        assert new_model.mark == [2, 6, new_model.curr_line]
+        assert new_model.mark == (2, 6)
 
         for _ in range(6):
             new_model.left()
@@ -171,6 +182,69 @@ class ModelTest(unittest.TestCase):
         new_model.up()
         assert new_model.saved_cursor_x_position != long
 
+    def test_lazy_input_phoneme(self):
+        interpreter = TestPhonemeInterpreter()
+        new_model=WindowedLines(filename="", interpreter=interpreter)
+        assert new_model.input_phoneme is None
+        new_model.toggle_phoneme_mode()
+        assert new_model.input_phoneme.phoneme_interpreter is interpreter
+        new_model.toggle_phoneme_mode()
+        new_model.preload_input_phoneme_in_background().join()
+        assert new_model.get_input_phoneme() is new_model.input_phoneme
+
+    def test_preload_failure_is_a_message(self):
+        def missing():
+            raise FileNotFoundError("phoneme_dictionary.bin")
+        new_model=WindowedLines(filename="", interpreter_factory=missing)
+        new_model.preload_input_phoneme_in_background().join()
+        assert new_model.message == "Phoneme dictionary unavailable: phoneme_dictionary.bin"
+
+    def test_insert_text(self):
+        new_model=WindowedLines(filename="", window_size=(3,5))
+        new_model.insert_text("ab")
+        new_model.left()
+        new_model.insert_text("1\n2\r\n3")
+        assert list(new_model.buffer.iter_lines()) == ["a1", "2", "3b"]
+        assert (new_model.cursor_row, new_model.cursor_position) == (2, 1)
+        new_model.insert_text("\n"*10)
+        assert new_model.cursor_row == 12 and new_model.top_window_row == 10
+        new_model.undo()
+        assert list(new_model.buffer.iter_lines()) == ["a1", "2", "3b"]
+
+    def test_putch_keys(self):
+        new_model=WindowedLines(filename="")
+        paste = [27, 91, 50, 48, 48, 126] + list("x\ty\n".encode()) + [27, 91, 50, 48, 49, 126]
+        new_model.putch_keys([ord('a'), 9, ord('b'), curses.KEY_LEFT, ord('c')] + paste + [10])
+        assert list(new_model.buffer.iter_lines()) == ["a    cx\ty", "", "b"]
+        assert len(new_model.history.undo_stack) == 2
+        new_model.putch_keys([3, ord('z')])
+        assert not new_model.is_running()
+        assert list(new_model.buffer.iter_lines()) == ["a    cx\ty", "", "b"]
+
+    def test_jumps(self):
+        new_model=WindowedLines(filename="", window_size=(4, 10))
+        new_model.insert_text("\n".join("line %d" % i for i in range(100)))
+        new_model.start_of_buffer()
+        assert (new_model.cursor_row, new_model.cursor_position, new_model.top_window_row) == (0, 0, 0)
+        new_model.goto_line(50)
+        assert new_model.cursor_row == 50 and 47 <= new_model.top_window_row <= 50
+        new_model.page_down()
+        assert new_model.cursor_row == 54 and new_model.top_window_row <= 54 < new_model.top_window_row+4
+        new_model.page_up()
+        new_model.page_up()
+        assert new_model.cursor_row == 46
+        new_model.end_of_buffer()
+        assert (new_model.cursor_row, new_model.cursor_position) == (99, 7)
+        assert new_model.print_window().split("\n")[-1].rstrip() == "line 99"
+        new_model.page_down()
+        assert new_model.cursor_row == 99
+        new_model.goto_line(1000)
+        assert new_model.cursor_row == 99 and new_model.cursor_position == 0
+        new_model.putch_keys([7, ord('1'), ord('2'), 10])
+        assert new_model.cursor_row == 11 and new_model.goto_input is None
+        new_model.putch_keys([7, ord('5'), curses.KEY_LEFT, ord('x')])
+        assert new_model.cursor_row == 11 and new_model.get_curr_line() == "xline 11"
+
 
 if __name__ == '__main__':
     unittest.main()
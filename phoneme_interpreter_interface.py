@@ -2,9 +2,51 @@
 PhonemeInterpreterInterface is an interface where given a sequence of phonemes entered by the user,
 implementations suggest a list of possible words that those phonemes could represent.
 The order is potentially meaningful.
+A sequence is passed either as a list of Phoneme or as the byte string of their codes,
+which phoneme_key turns either into; lookups pass byte strings.
 '''
 from phonemes import Phoneme
 
+class PhonemeLookup:
+    """A lookup that phonemes are appended to one at a time as the user types them.
+    Interpreters can return a subclass that narrows its search on each append."""
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.phonemes:list[Phoneme] = []
+        self.codes = bytearray()
+
+    def append(self, phoneme:Phoneme) -> None:
+        self.phonemes.append(phoneme)
+        self.codes.append(phoneme.code)
+
+    def key(self) -> bytes:
+        """The byte string of the phonemes so far, made only when a lookup runs."""
+        return bytes(self.codes)
+
+    def words(self) -> list[str]:
+        return self.interpreter.interpret(self.key())
+
+    def completions(self) -> list[str]:
+        return self.interpreter.complete(self.key())
+
+    def fuzzy(self) -> list[str]:
+        return self.interpreter.fuzzy(self.key())
+
 class PhonemeInterpreterInterface:
-    def interpret(self, phonemes:list[Phoneme]) -> list[str]:
+    def interpret(self, phonemes:bytes | list[Phoneme]) -> list[str]:
+        return None
+
+    def complete(self, phonemes:bytes | list[Phoneme]) -> list[str]:
+        """Words whose phonemes start with (but are longer than) phonemes, best first."""
+        return []
+
+    def fuzzy(self, phonemes:bytes | list[Phoneme], max_distance:int=1) -> list[str]:
+        """Words whose phonemes are within max_distance phoneme edits of phonemes, nearest first."""
+        return []
+
+    def lookup(self) -> PhonemeLookup:
+        return PhonemeLookup(self)
+
+    def preload(self) -> None:
+        """Loads anything the interpreter would otherwise load on its first lookup."""
         return None
@@ -1,13 +1,12 @@
+import threading
+import time
 import unittest
-import pickle
+import dict_phoneme_interpreter
 from phonemes import Phoneme, PhonemeEnums
 from phoneme_interpreter_interface import PhonemeInterpreterInterface
 from test_phoneme_interpreter import TestPhonemeInterpreter
 from dict_phoneme_interpreter import DictPhonemeInterpreter
 
-with open('saved_dictionary.pkl', 'rb') as f:
-    word_dict = pickle.load(f)
-
 class InterpretersTest(unittest.TestCase):
     """Test each implemented interpreter"""
     def test_interpret(self):
@@ -26,6 +25,26 @@ class InterpretersTest(unittest.TestCase):
         for interpreter in interpreters:
             assert not interpreter.interpret([])
 
+    def test_trie_built_once(self):
+        built = []
+        class SlowTrie(dict_phoneme_interpreter.PhonemeTrie):
+            def __init__(self, *args, **kwargs):
+                built.append(1)
+                time.sleep(0.05)
+                super().__init__(*args, **kwargs)
+        interpreter = DictPhonemeInterpreter()
+        interpreter.get_dictionary()
+        original, dict_phoneme_interpreter.PhonemeTrie = dict_phoneme_interpreter.PhonemeTrie, SlowTrie
+        try:
+            threads = [threading.Thread(target=interpreter.get_trie) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            dict_phoneme_interpreter.PhonemeTrie = original
+        assert built == [1]
+
 
 if __name__ == '__main__':
     unittest.main()
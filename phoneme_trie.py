@@ -0,0 +1,114 @@
+"""
+A trie over a sorted sequence of phoneme sequences. Each sequence is a byte string of
+PhonemeEnums values, so the sequences sharing a prefix form a contiguous range and a
+node is just that range. Children are found by bisecting the range the first time they
+are visited and are cached after that, so descending by one phoneme is a dict lookup.
+"""
+
+import heapq
+from bisect import bisect_left
+
+class TrieNode:
+    __slots__ = ("prefix", "lo", "hi", "children", "child_list", "completions")
+
+    def __init__(self, prefix:bytes, lo:int, hi:int):
+        self.prefix = prefix
+        self.lo = lo
+        self.hi = hi
+        self.children:dict[int, TrieNode] = {}
+        self.child_list:list[TrieNode] = None
+        self.completions:list[str] = None
+
+class PhonemeTrie:
+    def __init__(self, keys, values, frequencies:dict[str, int]=None, top_k:int=10):
+        """keys is a sorted sequence of phoneme byte strings and values[i] the words for keys[i].
+        frequencies, if given, ranks the words it counts ahead of the rest. The binary
+        dictionary stores none, so the editor ranks by the other keys alone."""
+        self.keys = keys
+        self.values = values
+        self.frequencies = frequencies if frequencies is not None else {}
+        self.top_k = top_k
+        self.root = TrieNode(b"", 0, len(keys))
+
+    def child(self, node:TrieNode, phoneme:int) -> TrieNode:
+        """The node for node's prefix followed by phoneme, or None if no sequence starts with it."""
+        if phoneme in node.children:
+            return node.children[phoneme]
+        prefix = node.prefix + bytes((phoneme,))
+        lo = bisect_left(self.keys, prefix, node.lo, node.hi)
+        hi = bisect_left(self.keys, node.prefix + bytes((phoneme+1,)), lo, node.hi)
+        child = TrieNode(prefix, lo, hi) if lo < hi else None
+        node.children[phoneme] = child
+        return child
+
+    def child_nodes(self, node:TrieNode) -> list[TrieNode]:
+        """Every child of node, found by stepping over the range one child's range at a time."""
+        if node.child_list is None:
+            depth = len(node.prefix)
+            i = node.lo+1 if self.is_exact(node) else node.lo
+            node.child_list = []
+            while i < node.hi:
+                child = self.child(node, self.keys[i][depth])
+                node.child_list.append(child)
+                i = child.hi
+        return node.child_list
+
+    def find(self, sequence:bytes) -> TrieNode:
+        node = self.root
+        for phoneme in sequence:
+            node = self.child(node, phoneme)
+            if node is None:
+                return None
+        return node
+
+    def is_exact(self, node:TrieNode) -> bool:
+        return node.lo < node.hi and len(self.keys[node.lo]) == len(node.prefix)
+
+    def words(self, node:TrieNode) -> list[str]:
+        """The words whose phonemes are exactly the node's prefix."""
+        return list(self.values[node.lo]) if self.is_exact(node) else []
+
+    def completions(self, node:TrieNode) -> list[str]:
+        """Up to top_k words whose phonemes strictly extend the node's prefix: words with a
+        given frequency first, most frequent first, then by how few phonemes they add."""
+        if node.completions is None:
+            start = node.lo+1 if self.is_exact(node) else node.lo
+            ranked = heapq.nsmallest(self.top_k, (
+                (-self.frequencies.get(word, 0), len(self.keys[i]), i, word)
+                for i in range(start, node.hi) for word in self.values[i]
+            ))
+            node.completions = list(dict.fromkeys(word for *_, word in ranked))
+        return node.completions
+
+    def fuzzy(self, sequence:bytes, max_distance:int=1) -> list[str]:
+        """Up to top_k words whose phonemes are within max_distance insertions, deletions or
+        substitutions of sequence, ranked by distance and then by any given frequency. The search
+        descends the trie along sequence and only branches out over a node's children where
+        it spends an edit, so with a small max_distance it visits few nodes however large
+        the dictionary is."""
+        found:dict[int, int] = {}
+        visited:dict[tuple[bytes, int], int] = {}
+        stack = [(self.root, 0, 0)]
+        while stack:
+            node, j, edits = stack.pop()
+            if visited.get((node.prefix, j), max_distance+1) <= edits:
+                continue
+            visited[(node.prefix, j)] = edits
+            if j == len(sequence) and self.is_exact(node):
+                found[node.lo] = min(edits, found.get(node.lo, edits))
+            if j < len(sequence):
+                child = self.child(node, sequence[j])
+                if child:
+                    stack.append((child, j+1, edits))
+            if edits < max_distance:
+                if j < len(sequence):
+                    stack.append((node, j+1, edits+1))
+                for child in self.child_nodes(node):
+                    stack.append((child, j, edits+1))
+                    if j < len(sequence) and child.prefix[-1] != sequence[j]:
+                        stack.append((child, j+1, edits+1))
+        ranked = heapq.nsmallest(self.top_k, (
+            (distance, -self.frequencies.get(word, 0), i, word)
+            for i, distance in found.items() for word in self.values[i]
+        ))
+        return list(dict.fromkeys(word for *_, word in ranked))
@@ -0,0 +1,55 @@
+import unittest
+from phonemes import PhonemeEnums as P
+from phoneme_trie import PhonemeTrie
+
+def seq(*phonemes) -> bytes:
+    return bytes(p.value for p in phonemes)
+
+ENTRIES = sorted([
+    (seq(P.h, P.aɪ), ["hi", "high"]),
+    (seq(P.h, P.aɪ, P.d), ["hide"]),
+    (seq(P.h, P.aɪ, P.k, P.ɪ, P.ŋ), ["hiking"]),
+    (seq(P.h, P.aɪ, P.t), ["height"]),
+    (seq(P.h, P.oʊ, P.m), ["home"]),
+    (seq(P.b, P.aʊ, P.t), ["bout"]),
+])
+
+class PhonemeTrieTest(unittest.TestCase):
+    def trie(self, **kwargs) -> PhonemeTrie:
+        return PhonemeTrie([key for key, _ in ENTRIES], [words for _, words in ENTRIES], **kwargs)
+
+    def test_descent(self):
+        trie = self.trie()
+        node = trie.child(trie.root, P.h.value)
+        assert trie.words(node) == []
+        assert trie.child(trie.root, P.h.value) is node
+        node = trie.child(node, P.aɪ.value)
+        assert trie.words(node) == ["hi", "high"]
+        assert trie.child(node, P.z.value) is None
+        assert trie.find(seq(P.h, P.aɪ, P.d)).prefix == seq(P.h, P.aɪ, P.d)
+        assert trie.find(seq(P.k)) is None
+
+    def test_completions_ranked(self):
+        trie = self.trie(top_k=3)
+        assert trie.completions(trie.find(seq(P.h))) == ["hi", "high", "home"]
+        assert trie.completions(trie.find(seq(P.h, P.aɪ))) == ["height", "hide", "hiking"]
+        trie = self.trie(top_k=2, frequencies={"hiking": 5, "home": 3})
+        assert trie.completions(trie.find(seq(P.h))) == ["hiking", "home"]
+
+    def test_fuzzy(self):
+        trie = self.trie()
+        assert [child.prefix for child in trie.child_nodes(trie.root)] == [seq(P.h), seq(P.b)]
+        assert trie.fuzzy(seq(P.h, P.i)) == ["hi", "high"]
+        assert trie.fuzzy(seq(P.h, P.aɪ, P.d)) == ["hide", "hi", "high", "height"]
+        assert trie.fuzzy(seq(P.aɪ, P.t)) == ["height"]
+        assert trie.fuzzy(seq(P.h, P.aɪ, P.k, P.ɪ)) == ["hiking"]
+        assert trie.fuzzy(seq(P.b, P.oʊ, P.m)) == ["home"]
+        assert trie.fuzzy(seq(P.b, P.ɪ, P.m)) == []
+        assert trie.fuzzy(seq(P.b, P.ɪ, P.m), max_distance=2) == ["home", "bout"]
+        trie = self.trie(frequencies={"height": 9})
+        assert trie.fuzzy(seq(P.h, P.aɪ, P.d)) == ["hide", "height", "hi", "high"]
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -107,7 +107,20 @@ PHONEME_DICT = {
     "ab": PhonemeEnums.ə,
 }
 
+PHONEME_CODES = {chars: phoneme.value for chars, phoneme in PHONEME_DICT.items()}
+
 class Phoneme:
+    """One typed phoneme. code is its PhonemeEnums value, the byte that stands for it in
+    phoneme sequences and dictionary keys."""
+    __slots__ = ("phoneme", "capitalized", "code")
+
     def __init__(self, phoneme:PhonemeEnums, capitalized:bool=False):
         self.phoneme = phoneme
-        self.capitalized = capitalized
\ No newline at end of file
+        self.capitalized = capitalized
+        self.code = phoneme.value
+
+def phoneme_key(phonemes:bytes | list[Phoneme]) -> bytes:
+    """The byte string for a sequence of phonemes, which may already be one."""
+    if isinstance(phonemes, bytes):
+        return phonemes
+    return bytes([phoneme.code for phoneme in phonemes])
@@ -0,0 +1,396 @@
+"""
+A line-oriented piece table. The original file is kept as undecoded bytes (or an mmap)
+plus an array of line offsets, and edited lines are appended to an add buffer of strings.
+The document is the sequence of pieces, each a run of lines from one of the two sources.
+
+The line offsets are built lazily, a chunk at a time, as far as the rows that are asked
+for, so opening a huge file only touches the lines that are displayed or edited. The last
+piece (the tail) grows as more of the original is indexed.
+
+Fenwick trees over the pieces' line and byte counts find the piece holding a row, and
+the byte offset at which a row will be written, in logarithmic time. An edit that changes
+the list of pieces marks the trees stale from the first piece it changed, and only the
+nodes from there on are rebuilt, when the trees are next used. Editing a line already in
+the add buffer updates the byte tree in place.
+"""
+
+import mmap
+import threading
+from array import array
+from itertools import accumulate, islice, repeat
+from operator import add
+from typing import BinaryIO, Iterator
+from line_index import FenwickTree
+from text_buffer_interface import TextBufferInterface, ENCODING, ERRORS, BLOCK_LINES, LINE_OVERHEAD
+
+INDEX_CHUNK = 1 << 20
+BLOCK_BYTES = 1 << 20
+
+ORIGINAL = 0
+ADD = 1
+
+class Piece:
+    """A run of length lines starting at line start of source."""
+    __slots__ = ("source", "start", "length")
+
+    def __init__(self, source:int, start:int, length:int):
+        self.source = source
+        self.start = start
+        self.length = length
+
+    def __repr__(self) -> str:
+        return f"Piece({self.source=}, {self.start=}, {self.length=})"
+
+class PieceTableBuffer(TextBufferInterface):
+    def __init__(self):
+        self.original:bytes = b""
+        self.offsets = array('q', [0])
+        self.add:list[str] = [""]
+        self.add_bytes = FenwickTree([0])
+        self.pieces:list[Piece] = [Piece(ADD, 0, 1)]
+        self.line_index = FenwickTree()
+        self.byte_index = FenwickTree()
+        self.line_stale:int = 0 # the first piece the line index is out of date for, or None
+        self.byte_stale:int = 0
+        self.reindexed = 0 # pieces whose index entries have been rebuilt, for tests
+        self.newline = "\n"
+        self.trailing_newline = False
+
+        self.scanned = 0
+        self.indexed = True
+        self.tail:Piece = None
+        self.index_chunk_size = INDEX_CHUNK
+        self.index_lock = threading.Lock()
+        self.index_thread:threading.Thread = None
+
+    def load(self, data:bytes) -> None:
+        """Loads bytes or an mmap. Only the first chunk is indexed until more rows are needed."""
+        with self.index_lock:
+            if isinstance(self.original, mmap.mmap) and self.original is not data:
+                self.original.close()
+            self.original = data
+            self.offsets = array('q', [0])
+            self.scanned = 0
+            self.indexed = not len(data)
+        self.add = []
+        self.add_bytes = FenwickTree()
+        if self.indexed:
+            self.tail = None
+            self.pieces = [Piece(ADD, self.append_add([""]), 1)]
+        else:
+            self.tail = Piece(ORIGINAL, 0, 0)
+            self.pieces = [self.tail]
+        self.invalidate_index()
+        self.ensure_line(0)
+        self.newline = "\r\n" if len(self.offsets) > 1 and data[self.offsets[1]-2:self.offsets[1]] == b"\r\n" else "\n"
+        self.trailing_newline = data[-1:] == b"\n"
+
+    def index_chunk(self) -> None:
+        """Finds the line starts in the next chunk of the original. Called with index_lock held."""
+        start = self.scanned
+        chunk = self.original[start:start+self.index_chunk_size]
+        line_lengths = map(add, map(len, chunk.split(b"\n")[:-1]), repeat(1))
+        self.offsets.extend(islice(accumulate(line_lengths, initial=start), 1, None))
+        self.scanned = start+len(chunk)
+        if self.scanned >= len(self.original):
+            if self.offsets[-1] != len(self.original):
+                self.offsets.append(len(self.original))
+            self.indexed = True
+
+    def index_remaining(self, original:bytes) -> None:
+        """Indexes the rest of original one chunk at a time, stopping if another file is loaded."""
+        while True:
+            with self.index_lock:
+                if self.original is not original or self.indexed:
+                    return
+                self.index_chunk()
+
+    def close(self) -> None:
+        """Unmaps the original by loading an empty buffer, which stops any background indexing."""
+        self.load(b"")
+
+    def index_in_background(self) -> None:
+        if not self.indexed:
+            self.index_thread = threading.Thread(target=self.index_remaining, args=(self.original,), daemon=True)
+            self.index_thread.start()
+
+    def append_add(self, lines:list[str]) -> int:
+        """Appends lines to the add buffer and returns the index of the first."""
+        start = len(self.add)
+        self.add.extend(lines)
+        self.add_bytes.extend([len(line.encode(ENCODING, ERRORS)) for line in lines])
+        return start
+
+    def invalidate_index(self, i:int=0) -> None:
+        """Called whenever the list of pieces changes from piece i on."""
+        self.invalidate_bytes(i)
+        if self.line_stale is None or i < self.line_stale:
+            self.line_stale = i
+
+    def invalidate_bytes(self, i:int) -> None:
+        """Called when the bytes of piece i change but its length in lines does not."""
+        if self.byte_stale is None or i < self.byte_stale:
+            self.byte_stale = i
+
+    def get_line_index(self) -> FenwickTree:
+        if self.line_stale is not None:
+            self.line_index.truncate(self.line_stale)
+            self.line_index.extend([piece.length for piece in self.pieces[self.line_stale:]])
+            self.reindexed += len(self.pieces)-self.line_stale
+            self.line_stale = None
+        return self.line_index
+
+    def piece_bytes(self, piece:Piece, length:int) -> int:
+        """The bytes written for the first length lines of piece, each followed by a newline.
+        Original lines are copied with their own terminators, so only the last is replaced."""
+        if not length:
+            return 0
+        if piece.source == ADD:
+            return self.add_bytes.prefix(piece.start+length)-self.add_bytes.prefix(piece.start) + length*len(self.newline)
+        return self.original_line_end(piece.start+length-1)-self.offsets[piece.start] + len(self.newline)
+
+    def get_byte_index(self) -> FenwickTree:
+        if self.byte_stale is not None:
+            self.byte_index.truncate(self.byte_stale)
+            self.byte_index.extend([self.piece_bytes(piece, piece.length) for piece in self.pieces[self.byte_stale:]])
+            self.reindexed += len(self.pieces)-self.byte_stale
+            self.byte_stale = None
+        return self.byte_index
+
+    def sync_tail(self) -> None:
+        """Grows the tail piece to cover every original line indexed so far."""
+        if self.tail is None:
+            return
+        indexed = self.indexed # read first, so the length below covers every line if it is set
+        length = len(self.offsets)-1-self.tail.start
+        if length != self.tail.length:
+            self.tail.length = length
+            self.invalidate_index(len(self.pieces)-1)
+        if indexed:
+            self.tail = None
+            self.pieces = [piece for piece in self.pieces if piece.length]
+            if not self.pieces:
+                self.pieces.append(Piece(ADD, self.append_add([""]), 1))
+            self.invalidate_index()
+
+    def known_line_count(self) -> int:
+        self.sync_tail()
+        return self.get_line_index().total()
+
+    def ensure_line(self, row:int) -> None:
+        """Indexes the original until row is known to exist or not."""
+        while not self.indexed and self.known_line_count() <= row:
+            with self.index_lock:
+                if not self.indexed:
+                    self.index_chunk()
+        self.sync_tail()
+
+    def original_line_end(self, line:int) -> int:
+        """The offset just past the content of an original line, excluding its terminator."""
+        start, end = self.offsets[line], self.offsets[line+1]
+        if end > start and self.original[end-1:end] == b"\n":
+            end -= 1
+            if end > start and self.original[end-1:end] == b"\r":
+                end -= 1
+        return end
+
+    def original_run_end(self, piece:Piece) -> int:
+        """The offset just past the content of an original piece. The tail runs to the end
+        of the file, however much of it has been indexed."""
+        if piece is not self.tail:
+            return self.original_line_end(piece.start+piece.length-1)
+        end = len(self.original)
+        if self.original[end-1:end] == b"\n":
+            end -= 1
+            if self.original[end-1:end] == b"\r":
+                end -= 1
+        return end
+
+    def original_line(self, line:int) -> str:
+        return bytes(self.original[self.offsets[line]:self.original_line_end(line)]).decode(ENCODING, ERRORS)
+
+    def locate(self, row:int) -> tuple[int, int]:
+        """Returns the index of the piece holding row and the row's offset within it."""
+        if row < 0:
+            raise IndexError("row out of range")
+        i, offset = self.get_line_index().find(row)
+        if i >= len(self.pieces):
+            raise IndexError("row out of range")
+        return i, offset
+
+    def split(self, row:int) -> int:
+        """Ensures a piece starts at row and returns its index (len(pieces) at the end)."""
+        if row == self.known_line_count():
+            return len(self.pieces)
+        i, offset = self.locate(row)
+        if offset:
+            piece = self.pieces[i]
+            right = Piece(piece.source, piece.start+offset, piece.length-offset)
+            self.pieces.insert(i+1, right)
+            piece.length = offset
+            self.invalidate_index(i)
+            if piece is self.tail:
+                self.tail = right
+            i += 1
+        return i
+
+    def merge(self, i:int) -> None:
+        """Merges piece i into piece i-1 when they are contiguous runs of the same source."""
+        if 0 < i < len(self.pieces):
+            left, right = self.pieces[i-1], self.pieces[i]
+            if left.source == right.source and left.start+left.length == right.start:
+                left.length += right.length
+                del self.pieces[i]
+                self.invalidate_index(i-1)
+                if right is self.tail:
+                    self.tail = left
+
+    def line_count(self) -> int:
+        with self.index_lock:
+            while not self.indexed:
+                self.index_chunk()
+        return self.known_line_count()
+
+    def has_line(self, row:int) -> bool:
+        self.ensure_line(row)
+        return 0 <= row < self.known_line_count()
+
+    def get_line(self, row:int) -> str:
+        if row < 0:
+            raise IndexError("row out of range")
+        self.ensure_line(row)
+        i, offset = self.locate(row)
+        piece = self.pieces[i]
+        if piece.source == ADD:
+            return self.add[piece.start+offset]
+        return self.original_line(piece.start+offset)
+
+    def set_line(self, row:int, text:str) -> None:
+        self.ensure_line(row+1)
+        i, offset = self.locate(row)
+        piece = self.pieces[i]
+        if piece.source == ADD:
+            line = piece.start+offset
+            delta = len(text.encode(ENCODING, ERRORS))-len(self.add[line].encode(ENCODING, ERRORS))
+            self.add_bytes.add(line, delta)
+            self.byte_index.add(i, delta) # nodes past a stale point are rebuilt anyway
+            self.add[line] = text
+            return
+        i = self.split(row)
+        self.split(row+1)
+        self.pieces[i] = Piece(ADD, self.append_add([text]), 1)
+        self.invalidate_bytes(i)
+        self.merge(i+1)
+        self.merge(i)
+
+    def insert_lines(self, row:int, lines:list[str]) -> None:
+        if not lines:
+            return
+        self.ensure_line(row)
+        i = self.split(row)
+        self.pieces.insert(i, Piece(ADD, self.append_add(lines), len(lines)))
+        self.invalidate_index(i)
+        self.merge(i)
+
+    def delete_lines(self, start:int, stop:int) -> None:
+        self.ensure_line(stop)
+        stop = min(stop, self.known_line_count())
+        if start >= stop:
+            return
+        i = self.split(start)
+        j = self.split(stop)
+        del self.pieces[i:j]
+        if not self.pieces:
+            self.pieces.append(Piece(ADD, self.append_add([""]), 1))
+        self.invalidate_index(i)
+        self.merge(i)
+
+    def line_offset(self, row:int) -> int:
+        self.ensure_line(row)
+        if row == self.known_line_count():
+            return self.get_byte_index().total()
+        i, offset = self.locate(row)
+        return self.get_byte_index().prefix(i) + self.piece_bytes(self.pieces[i], offset)
+
+    def iter_lines(self, start:int=0, stop:int=None) -> Iterator[str]:
+        if stop is None:
+            stop = self.line_count()
+        else:
+            self.ensure_line(stop-1)
+            stop = min(stop, self.known_line_count())
+        if start >= stop:
+            return
+        i, offset = self.locate(start)
+        remaining = stop-start
+        for piece in self.pieces[i:]:
+            for line in range(piece.start+offset, piece.start+min(piece.length, offset+remaining)):
+                yield self.add[line] if piece.source == ADD else self.original_line(line)
+            remaining -= piece.length-offset
+            offset = 0
+            if remaining <= 0:
+                return
+
+    def iter_blocks(self) -> Iterator[tuple[int, str]]:
+        """Original runs are decoded straight from the bytes about a megabyte at a time,
+        without splitting them into lines, and the tail is scanned to the end of the file
+        whether or not it has been indexed yet."""
+        original = self.original
+        pieces = [(piece.source, piece.start, piece.length, self.original_run_end(piece) if piece.source == ORIGINAL else 0)
+                  for piece in self.pieces]
+        def blocks():
+            row = 0
+            for source, start, length, end in pieces:
+                if self.original is not original:
+                    return
+                if source == ADD:
+                    for block in range(start, start+length, BLOCK_LINES):
+                        yield row+block-start, "\n".join(self.add[block:min(block+BLOCK_LINES, start+length)])
+                    row += length
+                    continue
+                position = self.offsets[start]
+                while position <= end and self.original is original:
+                    cut = original.find(b"\n", min(position+BLOCK_BYTES, end), end)
+                    cut = end if cut == -1 else cut
+                    text = bytes(original[position:cut]).decode(ENCODING, ERRORS)
+                    if self.newline == "\r\n":
+                        text = text.replace("\r\n", "\n")
+                    yield row, text
+                    row += text.count("\n")+1
+                    position = cut+1
+        return blocks()
+
+    def memory_size(self) -> int:
+        size = self.offsets.itemsize*len(self.offsets) + self.add_bytes.total() + LINE_OVERHEAD*len(self.add)
+        if not isinstance(self.original, mmap.mmap):
+            size += len(self.original)
+        return size
+
+    def snapshot(self) -> TextBufferInterface:
+        snapshot = PieceTableBuffer()
+        snapshot.original = self.original
+        snapshot.offsets = self.offsets
+        snapshot.add = list(self.add)
+        snapshot.pieces = [Piece(piece.source, piece.start, piece.length) for piece in self.pieces]
+        if self.tail is not None:
+            snapshot.tail = snapshot.pieces[-1]
+        snapshot.scanned = len(self.original) # the snapshot never indexes the shared offsets
+        snapshot.newline = self.newline
+        snapshot.trailing_newline = self.trailing_newline
+        return snapshot
+
+    def write(self, f:BinaryIO) -> None:
+        """Writes without waiting for the rest of the original to be indexed."""
+        newline = self.newline.encode(ENCODING)
+        for i, piece in enumerate(self.pieces):
+            if i:
+                f.write(newline)
+            if piece.source == ORIGINAL:
+                start, stop = self.offsets[piece.start], self.original_run_end(piece)
+                if hasattr(f, "copy_range"):
+                    f.copy_range(self.original, start, stop)
+                else:
+                    f.write(memoryview(self.original)[start:stop])
+            else:
+                f.write(newline.join(line.encode(ENCODING, ERRORS) for line in self.add[piece.start:piece.start+piece.length]))
+        if self.trailing_newline:
+            f.write(newline)
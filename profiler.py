@@ -0,0 +1,149 @@
+"""
+Opt-in timing of the editor's hot paths. install() wraps the methods listed in HOT_PATHS
+so each call is timed as a span. Every span's duration is counted in a histogram of
+power-of-two nanosecond buckets, and the most recent spans are kept in a fixed-size ring
+buffer. Until install() is called nothing is wrapped, so a run without profiling pays
+nothing.
+
+dump() writes the histograms as JSON. dump_trace() writes the spans in the ring buffer in
+Chrome's trace event format, for chrome://tracing or Perfetto.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from controller import Controller
+from headless import key_category
+from input_phoneme import InputPhoneme
+from model import WindowedLines
+from view import View
+
+RING_SIZE = 65536
+BUCKETS = 64
+
+def putch_span(model, key_input) -> str:
+    return "putch." + key_category(key_input)
+
+# (class, method, span name or a function of the call's arguments that returns one)
+HOT_PATHS = [
+    (Controller, "step", "controller.step"),
+    (WindowedLines, "putch", putch_span),
+    (WindowedLines, "putch_keys", "putch_keys"),
+    (View, "update", "view.update"),
+    (WindowedLines, "print_window", "print_window"),
+    (WindowedLines, "read_file", "read_file"),
+    (WindowedLines, "write_file", "write_file"),
+    (InputPhoneme, "update_words", "phoneme.words"),
+    (InputPhoneme, "update_completions", "phoneme.completions"),
+    (InputPhoneme, "update_suggestions", "phoneme.suggestions"),
+]
+
+class Histogram:
+    """Durations in nanoseconds, counted in buckets by bit length, so bucket i holds
+    durations from 2**(i-1) up to 2**i."""
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0]*BUCKETS
+
+    def add(self, duration:int) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.buckets[min(duration.bit_length(), BUCKETS-1)] += 1
+
+    def percentile(self, fraction:float) -> int:
+        """The upper bound in nanoseconds of the bucket holding the given fraction of spans."""
+        target = fraction*self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(1 << i, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_us": round(self.total/self.count/1000, 2) if self.count else 0,
+            "p50_us": round(self.percentile(0.5)/1000, 2),
+            "p90_us": round(self.percentile(0.9)/1000, 2),
+            "p99_us": round(self.percentile(0.99)/1000, 2),
+            "max_us": round(self.max/1000, 2),
+            "buckets_ns": {1 << i: count for i, count in enumerate(self.buckets) if count},
+        }
+
+class Profiler:
+    def __init__(self, ring_size:int=RING_SIZE, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.histograms:dict[str, Histogram] = {}
+        self.ring:list[tuple] = [None]*ring_size
+        self.recorded = 0
+        self.installed:list[tuple] = []
+        self.origin = clock()
+
+    def record(self, name:str, start:int, end:int) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(end-start)
+        self.ring[self.recorded % len(self.ring)] = (name, start, end, threading.get_ident())
+        self.recorded += 1
+
+    def spans(self) -> list[tuple]:
+        """The spans in the ring buffer, oldest first, as (name, start, end, thread)."""
+        if self.recorded <= len(self.ring):
+            return self.ring[:self.recorded]
+        i = self.recorded % len(self.ring)
+        return self.ring[i:] + self.ring[:i]
+
+    def timed(self, function, span):
+        """function wrapped to record a span named span, or named by calling span with
+        function's arguments."""
+        clock, record = self.clock, self.record
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(span(*args, **kwargs) if callable(span) else span, start, clock())
+        return wrapper
+
+    def install(self, hot_paths:list[tuple]=None) -> None:
+        for owner, method, span in HOT_PATHS if hot_paths is None else hot_paths:
+            function = owner.__dict__[method]
+            self.installed.append((owner, method, function))
+            setattr(owner, method, self.timed(function, span))
+
+    def uninstall(self) -> None:
+        """Restores the methods install() wrapped."""
+        while self.installed:
+            owner, method, function = self.installed.pop()
+            setattr(owner, method, function)
+
+    def summary(self) -> dict:
+        return {
+            "spans": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+            "recorded": self.recorded,
+        }
+
+    def dump(self, filename:str) -> None:
+        with open(filename, "w", encoding="UTF-8") as f:
+            json.dump(self.summary(), f, indent=2)
+            f.write("\n")
+
+    def trace_events(self) -> list[dict]:
+        pid = os.getpid()
+        return [{"name": name, "ph": "X", "ts": (start-self.origin)/1000, "dur": (end-start)/1000, "pid": pid, "tid": thread}
+                for name, start, end, thread in self.spans()]
+
+    def dump_trace(self, filename:str) -> None:
+        with open(filename, "w", encoding="UTF-8") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
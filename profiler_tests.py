@@ -0,0 +1,82 @@
+import curses
+import json
+import os
+import tempfile
+import unittest
+from model import WindowedLines
+from controller import Controller, PROFILE_KEY
+from headless import HeadlessDriver
+from profiler import Profiler, Histogram
+
+class ProfilerTest(unittest.TestCase):
+    def test_install_times_hot_paths(self):
+        putch = WindowedLines.putch
+        profiler = Profiler()
+        profiler.install()
+        try:
+            assert WindowedLines.putch is not putch
+            model = WindowedLines(filename="", window_size=(3, 10))
+            driver = HeadlessDriver(model, 4, 11)
+            for key in [ord("a"), ord("b"), curses.KEY_LEFT, curses.KEY_BACKSPACE]:
+                model.putch(key)
+            driver.view.update(model=model)
+        finally:
+            profiler.uninstall()
+        assert WindowedLines.putch is putch and not profiler.installed
+        assert model.get_curr_line() == "b"
+        counts = {name: summary["count"] for name, summary in profiler.summary()["spans"].items()}
+        assert counts["putch.insert"] == 2 and counts["putch.left_right"] == 1 and counts["putch.delete"] == 1
+        assert counts["view.update"] == 1
+        model.putch(ord("c"))
+        assert profiler.summary()["spans"]["putch.insert"]["count"] == 2
+
+    def test_ring_buffer_keeps_latest_spans(self):
+        ticks = iter(range(100))
+        profiler = Profiler(ring_size=3, clock=lambda: next(ticks))
+        for i in range(5):
+            profiler.record(f"span{i}", i*10, i*10+i)
+        assert [span[:3] for span in profiler.spans()] == [("span2", 20, 22), ("span3", 30, 33), ("span4", 40, 44)]
+        assert profiler.recorded == 5 and len(profiler.histograms) == 5
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for duration in [1000]*90 + [5000]*9 + [70000]:
+            histogram.add(duration)
+        summary = histogram.summary()
+        assert summary["count"] == 100 and summary["max_us"] == 70
+        assert summary["p50_us"] == 1.02 and summary["p90_us"] == 1.02 and summary["p99_us"] == 8.19
+        assert summary["buckets_ns"] == {1024: 90, 8192: 9, 131072: 1}
+
+    def test_dumps(self):
+        profiler = Profiler(clock=iter(range(0, 10**9, 1000)).__next__)
+        timed = profiler.timed(lambda x: x*2, "double")
+        assert timed(21) == 42
+        with tempfile.TemporaryDirectory() as directory:
+            profile, trace = os.path.join(directory, "profile.json"), os.path.join(directory, "trace.json")
+            profiler.dump(profile)
+            profiler.dump_trace(trace)
+            with open(profile, encoding="UTF-8") as f:
+                assert json.load(f)["spans"]["double"]["count"] == 1
+            with open(trace, encoding="UTF-8") as f:
+                events = json.load(f)["traceEvents"]
+        assert len(events) == 1 and events[0]["name"] == "double" and events[0]["ph"] == "X"
+        assert events[0]["ts"] == 1 and events[0]["dur"] == 1
+
+    def test_profile_key(self):
+        model = WindowedLines(filename="", window_size=(3, 10))
+        driver = HeadlessDriver(model, 4, 11)
+        driver.window.keys = [3, PROFILE_KEY, ord("a")] # popped from the end
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"\0")
+        dumps = []
+        controller = Controller(model=model, view=driver.view, window=driver.window, input_fd=read_fd,
+                                dump_profile=lambda: dumps.append(1) or "Profile written")
+        controller.loop()
+        os.close(read_fd)
+        os.close(write_fd)
+        assert dumps == [1] and model.get_curr_line() == "a"
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -0,0 +1,81 @@
+import curses
+import unittest
+from model import WindowedLines
+import region
+
+def model_with(text:str) -> WindowedLines:
+    model = WindowedLines(filename="", window_size=(4, 20))
+    model.insert_text(text)
+    model.start_of_buffer()
+    return model
+
+def text(model:WindowedLines) -> str:
+    return "\n".join(model.buffer.iter_lines())
+
+class RegionTest(unittest.TestCase):
+    def test_indent_and_dedent(self):
+        model = model_with("one\n\n  two\nthree")
+        model.putch(curses.KEY_F2)
+        model.down()
+        model.down()
+        model.down()
+        model.putch(9)
+        assert text(model) == "    one\n\n      two\nthree"
+        assert model.mark == (0, 0) and (model.cursor_row, model.cursor_position) == (2, 9)
+        model.putch_keys([9])
+        assert text(model) == "        one\n\n          two\nthree"
+        model.putch(curses.KEY_BTAB)
+        model.putch(curses.KEY_BTAB)
+        model.putch(curses.KEY_BTAB)
+        assert text(model) == "one\n\ntwo\nthree"
+        assert not region.dedent(model)
+        model.undo()
+        assert text(model) == "one\n\n  two\nthree"
+
+    def test_indent_follows_tab_settings(self):
+        model = WindowedLines(filename="", window_size=(4, 20), tab_size=2, insert_tabs=True)
+        model.insert_text("one\n  two")
+        model.start_of_buffer()
+        model.set_mark()
+        model.down()
+        model.right()
+        model.putch(9)
+        assert text(model) == "\tone\n\t  two"
+        model.putch(curses.KEY_BTAB)
+        model.putch(curses.KEY_BTAB)
+        assert text(model) == "one\ntwo"
+        model.insert_tabs = False
+        model.putch(9)
+        assert text(model) == "  one\n  two"
+
+    def test_case_and_replace(self):
+        model = model_with("Hello world\nfoo bar")
+        model.right()
+        model.set_mark()
+        model.down()
+        model.putch(21)
+        assert text(model) == "HELLO WORLD\nFoo bar"
+        model.putch(12)
+        assert text(model) == "Hello world\nfoo bar"
+        assert region.replace(model, "o", "0")
+        assert text(model) == "Hell0 w0rld\nfoo bar"
+        assert region.replace(model, r"(\w)0", r"\1o", regex=True)
+        assert text(model) == "Hello world\nfoo bar"
+        model.undo()
+        model.undo()
+        assert text(model) == "Hello world\nfoo bar"
+        self.assertRaises(ValueError, region.replace, model, "", "x")
+        assert text(model) == "Hello world\nfoo bar"
+
+    def test_large_region_is_one_edit(self):
+        model = model_with("\n".join(f"line {i}" for i in range(50000)))
+        model.set_mark()
+        model.end_of_buffer()
+        region.indent(model)
+        assert model.buffer.get_line(49999) == "    line 49999"
+        assert len(model.history.undo_stack) == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -0,0 +1,112 @@
+"""
+Saves a text buffer by streaming it into a temporary file next to the target and
+renaming it over the target, so a crash mid-save leaves the old file intact.
+Runs of untouched original lines are copied by the kernel from the original file.
+"""
+
+import os
+import stat
+import tempfile
+from text_buffer_interface import TextBufferInterface
+
+BUFFER_SIZE = 1 << 20
+
+class SaveWriter:
+    """A buffered writer over a file descriptor that can copy byte ranges of the original file."""
+    def __init__(self, fd:int, source_fd:int=None, buffer_size:int=BUFFER_SIZE):
+        self.fd = fd
+        self.source_fd = source_fd
+        self.buffer_size = buffer_size
+        self.pending = bytearray()
+        self.use_copy_file_range = hasattr(os, "copy_file_range")
+        self.bytes_copied = 0
+        self.bytes_written = 0
+
+    def write(self, data:bytes) -> None:
+        if len(data) >= self.buffer_size:
+            self.flush()
+            self.write_all(data)
+        else:
+            self.pending += data
+            if len(self.pending) >= self.buffer_size:
+                self.flush()
+
+    def write_all(self, data:bytes) -> None:
+        with memoryview(data) as view:
+            offset = 0
+            while offset < len(view):
+                written = os.write(self.fd, view[offset:])
+                offset += written
+                self.bytes_written += written
+
+    def flush(self) -> None:
+        if self.pending:
+            self.write_all(self.pending)
+            self.pending.clear()
+
+    def kernel_copy(self, offset:int, count:int) -> int:
+        """Copies up to count bytes at offset of the source file, returning how many were copied."""
+        if self.use_copy_file_range:
+            try:
+                return os.copy_file_range(self.source_fd, self.fd, count, offset)
+            except OSError:
+                self.use_copy_file_range = False
+        try:
+            return os.sendfile(self.fd, self.source_fd, offset, count)
+        except OSError:
+            return 0
+
+    def copy_range(self, original:bytes, start:int, stop:int) -> None:
+        """Copies original[start:stop], which mirrors the source file, without passing it through Python."""
+        if self.source_fd is None:
+            self.write(memoryview(original)[start:stop])
+            return
+        self.flush()
+        while start < stop:
+            copied = self.kernel_copy(start, stop-start)
+            if not copied:
+                self.write(memoryview(original)[start:stop])
+                return
+            start += copied
+            self.bytes_copied += copied
+
+def file_mode(path:str) -> int:
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def fsync_directory(directory:str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def save_file(filename:str, buffer:TextBufferInterface, source_fd:int=None) -> SaveWriter:
+    """Atomically replaces filename (or the file it links to) with the contents of buffer.
+    source_fd is an open descriptor of the file the buffer's original bytes were mapped from."""
+    path = os.path.realpath(filename)
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".nick-save", dir=directory)
+    try:
+        writer = SaveWriter(fd, source_fd)
+        buffer.write(writer)
+        writer.flush()
+        os.fchmod(fd, file_mode(path))
+        os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        os.unlink(temp_path)
+        raise
+    os.close(fd)
+    os.replace(temp_path, path)
+    fsync_directory(directory)
+    return writer
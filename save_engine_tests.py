@@ -0,0 +1,79 @@
+import unittest
+import mmap
+import os
+import stat
+import tempfile
+from piece_table_buffer import PieceTableBuffer
+from list_text_buffer import ListTextBuffer
+from save_engine import save_file
+import model as model_module
+from model import WindowedLines
+
+class SaveEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "file.txt")
+        self.data = b"".join(b"line %d\n" % i for i in range(10000))
+        with open(self.filename, "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self) -> bytes:
+        with open(self.filename, "rb") as f:
+            return f.read()
+
+    def test_copies_unedited_ranges(self):
+        with open(self.filename, "rb") as source:
+            buffer = PieceTableBuffer()
+            buffer.load(mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ))
+            buffer.set_line(5000, "edited")
+            writer = save_file(self.filename, buffer, source_fd=source.fileno())
+        assert self.read() == self.data.replace(b"line 5000\n", b"edited\n")
+        assert writer.bytes_copied + writer.bytes_written == len(self.read())
+        assert writer.bytes_copied > writer.bytes_written
+        assert os.listdir(self.directory.name) == ["file.txt"]
+
+    def test_keeps_mode_and_symlink(self):
+        os.chmod(self.filename, 0o640)
+        link = os.path.join(self.directory.name, "link.txt")
+        os.symlink(self.filename, link)
+        buffer = ListTextBuffer()
+        buffer.load(b"new\n")
+        save_file(link, buffer)
+        assert os.path.islink(link)
+        assert self.read() == b"new\n"
+        assert stat.S_IMODE(os.stat(self.filename).st_mode) == 0o640
+
+    def test_failed_save_keeps_file(self):
+        class FailingBuffer(ListTextBuffer):
+            def write(self, f):
+                f.write(b"partial")
+                raise OSError("disk full")
+        self.assertRaises(OSError, save_file, self.filename, FailingBuffer())
+        assert self.read() == self.data
+        assert os.listdir(self.directory.name) == ["file.txt"]
+
+    def test_model_saves_mapped_file_twice(self):
+        threshold = model_module.MMAP_THRESHOLD
+        model_module.MMAP_THRESHOLD = 0
+        try:
+            model = WindowedLines(filename=self.filename)
+            model.read_file()
+            assert model.source_file is not None
+            model.insert("a")
+            model.write_file()
+            model.down()
+            model.left()
+            model.insert("b")
+            model.write_file()
+            model.source_file.close()
+        finally:
+            model_module.MMAP_THRESHOLD = threshold
+        assert self.read() == b"aline 0\nbline 1\n" + self.data[len(b"line 0\nline 1\n"):]
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
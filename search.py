@@ -0,0 +1,105 @@
+"""
+Plain and regex search. A Search scans the buffer a block of lines at a time in a worker
+thread, recording every match in order, so the editor can keep taking keys, show the
+count so far and jump to matches as they are found. Starting a new search cancels the
+last one.
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from text_buffer_interface import TextBufferInterface
+
+class Search:
+    def __init__(self, buffer:TextBufferInterface, term:str, regex:bool=False):
+        self.term = term
+        self.regex = regex
+        self.error:str = None
+        try:
+            self.pattern = re.compile(term if regex else re.escape(term), re.MULTILINE)
+        except re.error as e:
+            self.pattern = None
+            self.error = str(e)
+        self.rows = array('q')
+        self.cols = array('q')
+        self.lengths = array('q')
+        self.count = 0
+        self.scanned_row = 0
+        self.done = self.pattern is None
+        self.cancelled = threading.Event()
+        self.blocks = buffer.iter_blocks() if self.pattern else None
+        self.thread:threading.Thread = None
+
+    def start(self) -> None:
+        if not self.done:
+            self.thread = threading.Thread(target=self.scan, daemon=True)
+            self.thread.start()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+    def scan(self) -> None:
+        for row, text in self.blocks:
+            if self.cancelled.is_set():
+                return
+            position = 0
+            for match in self.pattern.finditer(text):
+                start, end = match.span()
+                if start == end:
+                    continue
+                row += text.count("\n", position, start)
+                position = start
+                line_start = text.rfind("\n", 0, start)+1
+                self.rows.append(row)
+                self.cols.append(start-line_start)
+                self.lengths.append(end-start)
+                self.count += 1
+            self.scanned_row = row+text.count("\n", position)+1
+        self.done = True
+
+    def matches_on(self, row:int) -> list[tuple[int, int]]:
+        """The column and length of each match starting on row."""
+        count = self.count
+        i = bisect_left(self.rows, row, 0, count)
+        matches = []
+        while i < count and self.rows[i] == row:
+            matches.append((self.cols[i], self.lengths[i]))
+            i += 1
+        return matches
+
+    def position(self, i:int) -> tuple[int, int]:
+        return self.rows[i], self.cols[i]
+
+    def next_match(self, row:int, col:int, inclusive:bool=False) -> int:
+        """The index of the first match after row and col (or at them, if inclusive), wrapping
+        to the first match once the scan is done. None if there is none, or none found yet."""
+        count = self.count
+        i = bisect_left(self.rows, row, 0, count)
+        while i < count and self.rows[i] == row and (self.cols[i] < col or (self.cols[i] == col and not inclusive)):
+            i += 1
+        if i < count:
+            return i
+        if self.done and count:
+            return 0
+        return None
+
+    def previous_match(self, row:int, col:int) -> int:
+        """The index of the last match before row and col, wrapping to the last match once the
+        scan is done. None if there is none, or the scan has not yet passed row."""
+        if not self.done and self.scanned_row <= row:
+            return None
+        count = self.count
+        i = bisect_left(self.rows, row, 0, count)
+        while i < count and self.rows[i] == row and self.cols[i] < col:
+            i += 1
+        if i > 0:
+            return i-1
+        if self.done and count:
+            return count-1
+        return None
+
+    def status(self) -> str:
+        if self.error:
+            return f"Invalid pattern: {self.error}"
+        return f"{self.count} matches" + ("" if self.done else f" so far (line {self.scanned_row+1})")
@@ -0,0 +1,98 @@
+import curses
+import unittest
+from list_text_buffer import ListTextBuffer
+from piece_table_buffer import PieceTableBuffer
+from model import WindowedLines
+from headless import HeadlessDriver
+from controller import Controller
+from search import Search
+
+def finished(search:Search) -> Search:
+    search.start()
+    if search.thread:
+        search.thread.join()
+    return search
+
+class SearchTest(unittest.TestCase):
+    def test_matches(self):
+        data = b"one fish\r\ntwo fish\r\nred\r\n\r\nblue fish fish\r\n"
+        for buffer in [ListTextBuffer(), PieceTableBuffer()]:
+            buffer.load(data)
+            search = finished(Search(buffer, "fish"))
+            assert search.done and search.count == 4
+            assert [search.position(i) for i in range(4)] == [(0, 4), (1, 4), (4, 5), (4, 10)]
+            assert search.matches_on(4) == [(5, 4), (10, 4)]
+            assert finished(Search(buffer, "^(r|b)[a-z]+$", regex=True)).count == 1
+
+    def test_edited_lazy_buffer(self):
+        buffer = PieceTableBuffer()
+        buffer.index_chunk_size = 64
+        buffer.load(b"".join(b"line %d\n" % i for i in range(1000)))
+        buffer.set_line(3, "line 3 has needle")
+        buffer.insert_lines(5, ["needle", "x"])
+        assert not buffer.indexed
+        search = finished(Search(buffer, "needle|line 999", regex=True))
+        assert [search.position(i) for i in range(search.count)] == [(3, 11), (5, 0), (1001, 0)]
+        assert buffer.get_line(1001) == "line 999"
+
+    def test_next_and_previous(self):
+        buffer = ListTextBuffer()
+        buffer.load(b"ab ab\nxx\nab\n")
+        search = finished(Search(buffer, "ab"))
+        assert search.next_match(0, 0, inclusive=True) == 0
+        assert search.next_match(0, 0) == 1
+        assert search.next_match(2, 0) == 0
+        assert search.previous_match(0, 3) == 0
+        assert search.previous_match(0, 0) == 2
+
+    def test_invalid_and_cancelled(self):
+        buffer = ListTextBuffer()
+        search = finished(Search(buffer, "(", regex=True))
+        assert search.done and search.count == 0 and "Invalid" in search.status()
+        buffer.load(b"a\n" * 10000)
+        search = Search(buffer, "a")
+        search.cancel()
+        finished(search)
+        assert not search.done and search.count < 10000
+
+    def test_model_search(self):
+        model = WindowedLines(filename="", window_size=(3, 10))
+        model.insert_text("\n".join(["alpha", "beta", "gamma", "delta", "alphabet"]))
+        model.start_of_buffer()
+        driver = HeadlessDriver(model, 4, 11)
+        def type_keys(keys):
+            for key in keys:
+                driver.replay([[key]])
+                if model.search and model.search.thread:
+                    model.search.thread.join()
+                model.poll_search()
+                driver.view.update(model=model)
+        type_keys([6, ord("a"), ord("l"), ord("p")])
+        assert (model.cursor_row, model.cursor_position) == (0, 0)
+        assert model.get_panel_text() == "Search: alp\n2 matches"
+        assert (0, 0, 3) in driver.window.highlights
+        type_keys([6])
+        assert (model.cursor_row, model.cursor_position) == (4, 0)
+        type_keys([18])
+        assert model.cursor_row == 0
+        type_keys([27])
+        assert model.search is None and not driver.window.highlights
+        type_keys([6, 9, ord("t"), ord("a"), ord("$"), 10])
+        assert (model.cursor_row, model.cursor_position) == (1, 2)
+        type_keys([18, ord("b"), ord("e"), curses.KEY_LEFT])
+        assert model.search_input is None
+        assert (model.cursor_row, model.cursor_position) == (1, 0)
+
+    def test_controller_polls_while_searching(self):
+        model = WindowedLines(filename="", window_size=(3, 10))
+        driver = HeadlessDriver(model, 4, 11)
+        controller = Controller(model=model, view=driver.view, window=driver.window)
+        model.search = Search(model.buffer, "x")
+        assert controller.read_keys() == []
+        model.search = None
+        assert controller.read_keys() == [3]
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -0,0 +1,175 @@
+"""
+Several open buffers in one process. The buffers share one phoneme interpreter, so the
+dictionary is loaded once, and one task runner. Closed buffers are kept in a cache,
+least recently closed evicted first once their estimated memory passes a cap, so that
+reopening a file is instant as long as it has not changed on disk.
+"""
+
+import curses
+import os
+import threading
+from collections import OrderedDict
+from model import WindowedLines, PASTE_START, PASTE_END, find_keys
+from display_width import TAB_SIZE
+from task_runner import TaskRunner
+
+CACHE_BYTES = 256 << 20
+
+class Session:
+    def __init__(self, window_size=(10,16), tasks:TaskRunner=None, autosave:bool=False,
+                 cache_bytes:int=CACHE_BYTES, interpreter=None, tab_size:int=TAB_SIZE, insert_tabs:bool=False):
+        self.window_size = window_size
+        self.tab_size = tab_size
+        self.insert_tabs = insert_tabs
+        self.tasks = tasks
+        self.autosave = autosave
+        self.cache_bytes = cache_bytes
+        self.models:list[WindowedLines] = []
+        self.current = 0
+        self.closed:OrderedDict[str, tuple[WindowedLines, tuple]] = OrderedDict()
+        self.interpreter = interpreter
+        self.interpreter_lock = threading.Lock()
+        self.open_input:str = None
+
+    @property
+    def model(self) -> WindowedLines:
+        return self.models[self.current]
+
+    def get_interpreter(self):
+        """The interpreter every buffer shares, created when phoneme mode is first used."""
+        with self.interpreter_lock:
+            if self.interpreter is None:
+                from dict_phoneme_interpreter import DictPhonemeInterpreter
+                self.interpreter = DictPhonemeInterpreter()
+            return self.interpreter
+
+    def key(self, filename:str) -> str:
+        return os.path.realpath(filename)
+
+    def file_state(self, filename:str) -> tuple:
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def open(self, filename:str) -> WindowedLines:
+        """Switches to filename, taking it from the open buffers or the cache of closed ones
+        if it is there, and reading it otherwise."""
+        key = self.key(filename)
+        for i, model in enumerate(self.models):
+            if self.key(model.filename) == key:
+                return self.switch_to(i)
+        model = None
+        if key in self.closed:
+            model, state = self.closed.pop(key)
+            if state != self.file_state(filename):
+                self.discard(model)
+                model = None
+        if model is None:
+            model = WindowedLines(filename=filename, window_size=self.window_size, tasks=self.tasks,
+                                  autosave=self.autosave, interpreter_factory=self.get_interpreter,
+                                  tab_size=self.tab_size, insert_tabs=self.insert_tabs)
+            model.read_file()
+            model.index_in_background()
+        self.models.append(model)
+        return self.switch_to(len(self.models)-1)
+
+    def switch_to(self, i:int) -> WindowedLines:
+        self.current = i
+        self.model.damage_all()
+        return self.model
+
+    def switch(self, step:int) -> WindowedLines:
+        return self.switch_to((self.current+step) % len(self.models))
+
+    def close_current(self) -> None:
+        """Closes the current buffer into the cache. The last open buffer stays open."""
+        if len(self.models) == 1:
+            self.model.message = "Cannot close the last buffer"
+            self.model.damage_all()
+            return
+        model = self.models.pop(self.current)
+        self.closed[self.key(model.filename)] = (model, self.file_state(model.filename))
+        self.evict()
+        self.switch_to(min(self.current, len(self.models)-1))
+
+    def cache_size(self) -> int:
+        return sum(model.buffer.memory_size() + model.history.size for model, state in self.closed.values())
+
+    def evict(self) -> None:
+        while self.closed and self.cache_size() > self.cache_bytes:
+            model, state = self.closed.popitem(last=False)[1]
+            self.discard(model)
+
+    def discard(self, model:WindowedLines) -> None:
+        """Drops a cached buffer, keeping its journal only if it holds unsaved edits, and
+        unmaps its file."""
+        model.close_journal(remove=not (model.journal and model.journal.has_unsaved()))
+        model.close()
+
+    def shutdown(self) -> None:
+        """Closes every buffer's journal on a clean exit."""
+        for model in self.models + [model for model, state in self.closed.values()]:
+            model.close_journal(remove=True)
+
+    def open_key(self, key:int) -> None:
+        """Handles a key while the open-file prompt is shown in the current buffer's panel."""
+        if key in (10, curses.KEY_ENTER):
+            filename, self.open_input = self.open_input, None
+            self.model.message = None
+            if filename:
+                try:
+                    self.open(filename)
+                except OSError as e:
+                    self.model.message = f"Cannot open {filename}: {e.strerror}"
+            self.model.damage_all()
+            return
+        if key == 27: # ESC
+            self.open_input = None
+        elif key == curses.KEY_BACKSPACE:
+            self.open_input = self.open_input[:-1]
+        elif 32 <= key < 127:
+            self.open_input += chr(key)
+        self.model.message = None if self.open_input is None else f"Open file: {self.open_input}"
+        self.model.damage_all()
+
+    def command(self, key:int) -> None:
+        if key == 15: # CTRL+O
+            self.open_input = ""
+            self.model.message = "Open file: "
+            self.model.damage_all()
+        elif key == 14: # CTRL+N
+            self.switch(1)
+        elif key == 2: # CTRL+B
+            self.switch(-1)
+        elif key == 23: # CTRL+W
+            self.close_current()
+
+    def putch_keys(self, keys:list[int]) -> None:
+        """Hands runs of keys to the current buffer, handling the session's commands, and the
+        keys typed into the open-file prompt, itself."""
+        run = []
+        i = 0
+        while i < len(keys) and self.model.is_running():
+            if keys[i:i+len(PASTE_START)] == PASTE_START and self.open_input is None:
+                end = find_keys(keys, PASTE_END, i)
+                end = len(keys) if end == -1 else end+len(PASTE_END)
+                run.extend(keys[i:end])
+                i = end
+                continue
+            if self.open_input is not None or keys[i] in (2, 14, 15, 23):
+                if run:
+                    self.model.putch_keys(run)
+                    run = []
+                    if not self.model.is_running():
+                        return
+                if self.open_input is not None:
+                    self.open_key(keys[i])
+                else:
+                    self.command(keys[i])
+            else:
+                run.append(keys[i])
+            i += 1
+        if run:
+            self.model.putch_keys(run)
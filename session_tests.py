@@ -0,0 +1,90 @@
+import mmap
+import os
+import tempfile
+import unittest
+import model as model_module
+from session import Session
+from test_phoneme_interpreter import TestPhonemeInterpreter
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.files = []
+        for name in ["a.txt", "b.txt", "c.txt"]:
+            path = os.path.join(self.directory.name, name)
+            with open(path, "w") as f:
+                f.write(name + "\n")
+            self.files.append(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_switching_and_shared_interpreter(self):
+        session = Session(interpreter=TestPhonemeInterpreter())
+        for path in self.files:
+            session.open(path)
+        assert session.model.get_curr_line() == "c.txt"
+        session.putch_keys([14, ord("!"), 2, 2, ord("?")])
+        assert session.models[0].get_curr_line() == "!a.txt"
+        assert session.models[1].get_curr_line() == "?b.txt"
+        assert session.open(self.files[0]) is session.models[0]
+        session.models[0].toggle_phoneme_mode()
+        session.models[2].toggle_phoneme_mode()
+        assert session.models[0].interpreter is session.models[2].interpreter is session.interpreter
+
+    def test_closed_buffer_cache(self):
+        session = Session()
+        first = session.open(self.files[0])
+        first.insert_text("edited ")
+        session.open(self.files[1])
+        session.switch_to(0)
+        session.putch_keys([23])
+        assert len(session.models) == 1 and session.model.filename == self.files[1]
+        assert session.open(self.files[0]) is first
+        assert first.get_curr_line() == "edited a.txt"
+
+        session.putch_keys([23])
+        with open(self.files[0], "w") as f:
+            f.write("changed on disk\n")
+        os.utime(self.files[0], ns=(1, 1))
+        reopened = session.open(self.files[0])
+        assert reopened is not first and reopened.get_curr_line() == "changed on disk"
+
+        session.putch_keys([23, 23])
+        assert len(session.models) == 1 and session.model.message == "Cannot close the last buffer"
+
+    def test_cache_eviction(self):
+        session = Session(cache_bytes=0)
+        session.open(self.files[0])
+        session.open(self.files[1])
+        session.putch_keys([23])
+        assert not session.closed
+
+    def test_eviction_unmaps_file(self):
+        threshold = model_module.MMAP_THRESHOLD
+        model_module.MMAP_THRESHOLD = 0
+        try:
+            session = Session(cache_bytes=0)
+            model = session.open(self.files[0])
+            original = model.buffer.original
+            assert isinstance(original, mmap.mmap)
+            session.open(self.files[1])
+            session.open(self.files[0])
+            session.putch_keys([23])
+            assert not session.closed and original.closed and model.source_file is None
+        finally:
+            model_module.MMAP_THRESHOLD = threshold
+
+    def test_open_prompt(self):
+        session = Session()
+        session.open(self.files[0])
+        session.putch_keys([15] + [ord(c) for c in self.files[2]] + [10, ord("x")])
+        assert session.model.filename == self.files[2]
+        assert session.model.get_curr_line() == "xc.txt"
+        session.putch_keys([15] + [ord(c) for c in self.directory.name] + [10])
+        assert session.model.message.startswith("Cannot open")
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -0,0 +1,58 @@
+"""
+Runs slow operations, such as saving, one at a time in a worker thread so they stay off
+the input path. Each finished task is reported back through a pipe the controller's
+selector watches, and its callback runs on the controller's thread.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+
+class TaskRunner:
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        self.queue = queue.Queue()
+        self.finished = deque()
+        self.thread:threading.Thread = None
+
+    def fileno(self) -> int:
+        return self.read_fd
+
+    def submit(self, function, callback=None) -> None:
+        """Queues function to run in the worker. callback, if given, is later called with the
+        result and the exception raised (or None) from finish_ready."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.work, daemon=True)
+            self.thread.start()
+        self.queue.put((function, callback))
+
+    def work(self) -> None:
+        while True:
+            function, callback = self.queue.get()
+            result, error = None, None
+            try:
+                result = function()
+            except Exception as e:
+                error = e
+            self.finished.append((callback, result, error))
+            os.write(self.write_fd, b"\0")
+            self.queue.task_done()
+
+    def finish_ready(self) -> None:
+        """Calls the callbacks of the tasks that have finished."""
+        try:
+            while os.read(self.read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        while self.finished:
+            callback, result, error = self.finished.popleft()
+            if callback:
+                callback(result, error)
+
+    def wait(self) -> None:
+        """Blocks until every queued task has run, then calls their callbacks."""
+        self.queue.join()
+        self.finish_ready()
@@ -0,0 +1,78 @@
+'''
+TextBufferInterface is an interface for the line storage behind WindowedLines.
+Rows are zero-indexed and lines are stored as strings without their line terminators.
+A buffer always holds at least one (possibly empty) line.
+'''
+from itertools import islice
+from typing import BinaryIO, Iterator
+
+ENCODING = "UTF-8"
+ERRORS = "surrogateescape"
+BLOCK_LINES = 4096
+LINE_OVERHEAD = 56
+
+class TextBufferInterface:
+    newline = "\n"
+    trailing_newline = False
+
+    def load(self, data:bytes) -> None:
+        return None
+
+    def line_count(self) -> int:
+        return None
+
+    def has_line(self, row:int) -> bool:
+        return 0 <= row < self.line_count()
+
+    def get_line(self, row:int) -> str:
+        return None
+
+    def set_line(self, row:int, text:str) -> None:
+        return None
+
+    def insert_lines(self, row:int, lines:list[str]) -> None:
+        return None
+
+    def delete_lines(self, start:int, stop:int) -> None:
+        return None
+
+    def line_offset(self, row:int) -> int:
+        """The byte offset at which row starts when the buffer is written."""
+        return None
+
+    def iter_lines(self, start:int=0, stop:int=None) -> Iterator[str]:
+        return None
+
+    def iter_blocks(self) -> Iterator[tuple[int, str]]:
+        """Yields (row, text) pairs covering the buffer in order, where text is a run of
+        lines starting at row joined with newlines. The lines to scan are fixed when this
+        is called, so the blocks can be consumed in another thread while editing goes on."""
+        lines = iter(list(self.iter_lines()))
+        def blocks():
+            row = 0
+            while block := list(islice(lines, BLOCK_LINES)):
+                yield row, "\n".join(block)
+                row += len(block)
+        return blocks()
+
+    def write(self, f:BinaryIO) -> None:
+        """Writes the encoded lines to f. If f has a copy_range(original, start, stop) method,
+        as save_engine.SaveWriter does, unchanged bytes of the original may be passed to it."""
+        return None
+
+    def memory_size(self) -> int:
+        """Roughly how many bytes the buffer holds in memory, not counting mapped files."""
+        return None
+
+    def snapshot(self):
+        """A copy of the buffer, sharing what it can, that another thread can write (with
+        write) while this one goes on being edited."""
+        return None
+
+    def index_in_background(self) -> None:
+        """Buffers that load lazily may finish loading in a background thread."""
+        return None
+
+    def close(self) -> None:
+        """Releases any file the buffer maps. The buffer is empty afterwards."""
+        return None
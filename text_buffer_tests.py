@@ -0,0 +1,176 @@
+import unittest
+import io
+from text_buffer_interface import TextBufferInterface
+from list_text_buffer import ListTextBuffer
+from piece_table_buffer import PieceTableBuffer
+from model import WindowedLines
+
+def written(buffer:TextBufferInterface) -> bytes:
+    out = io.BytesIO()
+    buffer.write(out)
+    return out.getvalue()
+
+class RacingBuffer(PieceTableBuffer):
+    """Finishes indexing the first time indexed is read once racing is set, as the
+    background thread might between any two reads of sync_tail."""
+    racing = False
+
+    @property
+    def indexed(self) -> bool:
+        if self.racing:
+            self.racing = False
+            while not self._indexed:
+                self.index_chunk()
+        return self._indexed
+
+    @indexed.setter
+    def indexed(self, indexed:bool) -> None:
+        self._indexed = indexed
+
+class TextBufferTest(unittest.TestCase):
+    """Test each implemented text buffer"""
+    def buffers(self) -> list[TextBufferInterface]:
+        return [ListTextBuffer(), PieceTableBuffer()]
+
+    def test_empty(self):
+        for buffer in self.buffers():
+            assert buffer.line_count() == 1
+            assert buffer.get_line(0) == ""
+            buffer.load(b"")
+            assert list(buffer.iter_lines()) == [""]
+            assert written(buffer) == b""
+
+    def test_load_write_round_trip(self):
+        for data in [b"a\nb\n", b"a\nb", b"a\n\n", b"\n", b"a\r\nb\r\n", "héllo\n".encode()]:
+            for buffer in self.buffers():
+                buffer.load(data)
+                assert written(buffer) == data, (buffer, data, written(buffer))
+        for buffer in self.buffers():
+            buffer.load(b"a\r\nb\r\n")
+            assert list(buffer.iter_lines()) == ["a", "b"]
+
+    def test_edits(self):
+        for buffer in self.buffers():
+            buffer.load(b"zero\none\ntwo\nthree\nfour\n")
+            buffer.set_line(2, "TWO")
+            buffer.insert_lines(1, ["x", "y"])
+            assert list(buffer.iter_lines()) == ["zero", "x", "y", "one", "TWO", "three", "four"]
+            buffer.delete_lines(3, 6)
+            assert list(buffer.iter_lines()) == ["zero", "x", "y", "four"]
+            assert list(buffer.iter_lines(1, 3)) == ["x", "y"]
+            buffer.insert_lines(4, ["end"])
+            buffer.delete_lines(0, 1)
+            assert written(buffer) == b"x\ny\nfour\nend\n"
+            assert buffer.has_line(3) and not buffer.has_line(4)
+            buffer.delete_lines(0, 4)
+            assert buffer.line_count() == 1 and buffer.get_line(0) == ""
+
+    def test_pieces_merge(self):
+        buffer = PieceTableBuffer()
+        buffer.load(b"a\nb\nc\n")
+        for row in range(3):
+            buffer.set_line(row, buffer.get_line(row).upper())
+        assert len(buffer.pieces) == 1
+        assert written(buffer) == b"A\nB\nC\n"
+
+    def test_lazy_indexing(self):
+        data = b"".join(b"line %d\n" % i for i in range(1000))
+        buffer = PieceTableBuffer()
+        buffer.index_chunk_size = 64
+        buffer.load(data)
+        assert buffer.get_line(3) == "line 3"
+        assert not buffer.indexed and len(buffer.offsets) < 20
+        buffer.set_line(5, "five")
+        buffer.insert_lines(6, ["new"])
+        buffer.delete_lines(0, 1)
+        assert not buffer.indexed
+        assert buffer.line_count() == 1000
+        assert written(buffer) == data.replace(b"line 0\n", b"").replace(b"line 5\n", b"five\nnew\n")
+
+    def test_background_indexing(self):
+        buffer = PieceTableBuffer()
+        buffer.index_chunk_size = 64
+        buffer.load(b"x\n" * 500)
+        buffer.set_line(1, "y")
+        buffer.index_in_background()
+        buffer.index_thread.join()
+        assert buffer.indexed
+        assert buffer.line_count() == 500 and buffer.get_line(499) == "x"
+
+    def test_line_offset(self):
+        for buffer in self.buffers():
+            buffer.load("zero\r\nún\r\ntwo\r\nthree\r\n".encode())
+            buffer.set_line(1, "one")
+            buffer.insert_lines(3, ["é", ""])
+            data = written(buffer)
+            starts = [0] + [i+2 for i in range(len(data)) if data[i:i+2] == b"\r\n"]
+            assert [buffer.line_offset(row) for row in range(buffer.line_count()+1)] == starts, buffer
+
+    def test_tail_synced_while_indexing_finishes(self):
+        buffer = RacingBuffer()
+        buffer.index_chunk_size = 64
+        buffer.load(b"x\n" * 500)
+        buffer.racing = True
+        buffer.sync_tail()
+        buffer.sync_tail()
+        assert buffer.tail is None and buffer.line_count() == 500
+        assert written(buffer) == b"x\n" * 500
+
+    def test_locate_many_pieces(self):
+        buffer = PieceTableBuffer()
+        buffer.index_chunk_size = 64
+        buffer.load(b"".join(b"%d\n" % i for i in range(1000)))
+        for row in range(0, 1000, 7):
+            buffer.set_line(row, "edited %d" % row)
+        assert len(buffer.pieces) > 100
+        for row in range(1000):
+            assert buffer.get_line(row) == ("edited %d" % row if row % 7 == 0 else str(row))
+        assert buffer.line_offset(1000) == len(written(buffer))
+
+    def test_structural_edits_reindex_suffix(self):
+        buffer = PieceTableBuffer()
+        buffer.load(b"".join(b"%d\n" % i for i in range(1000)))
+        for row in range(0, 1000, 7):
+            buffer.set_line(row, "edited %d" % row)
+        lines = list(buffer.iter_lines())
+        buffer.line_offset(0)
+        pieces, buffer.reindexed = len(buffer.pieces), 0
+        edits = [
+            lambda: buffer.insert_lines(990, ["new"]),
+            lambda: buffer.delete_lines(980, 982),
+            lambda: buffer.set_line(996, "set"),
+            lambda: buffer.set_line(990, "new line"),
+            lambda: buffer.insert_lines(999, ["end"]),
+        ]
+        for edit in edits:
+            edit()
+            buffer.get_line(990)
+            buffer.line_offset(990)
+        lines[990:990] = ["new"]
+        del lines[980:982]
+        lines[996] = "set"
+        lines[990] = "new line"
+        lines[999:999] = ["end"]
+        assert list(buffer.iter_lines()) == lines
+        assert buffer.line_offset(buffer.line_count()) == len(written(buffer))
+        assert pieces > 250 and buffer.reindexed < 60
+
+    def test_model_with_each_buffer(self):
+        for buffer in self.buffers():
+            model = WindowedLines(filename="", window_size=(2,3), buffer=buffer)
+            for char in "ab\ncd\nef":
+                model.insert(char)
+            assert model.cursor_row == 2 and model.top_window_row == 1
+            assert model.print_window() == "cd \nef "
+            model.up()
+            model.set_mark()
+            model.up()
+            model.left()
+            model.delete()
+            assert list(buffer.iter_lines()) == ["a", "ef"]
+            assert (model.cursor_row, model.cursor_position) == (0, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
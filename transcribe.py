@@ -0,0 +1,137 @@
+"""
+Transcribes phoneme-keyed text into words without the editor. Each run of letters is read
+as phoneme key codes, the same as typing it in phoneme mode, and replaced with its top
+candidate word, or with all of them separated by "|". Runs that are not valid codes, or
+that have no words, and everything between runs are copied through unchanged.
+
+    nick transcribe [--all] [--jobs N] [--dictionary PATH] [FILE ...]
+
+Input is streamed in chunks of lines, so memory does not grow with its size, and with
+--jobs the chunks are transcribed by a pool of processes, all of which map the one
+dictionary, while the output keeps the input's order.
+"""
+
+import argparse
+import re
+import sys
+from collections import deque
+from phonemes import PHONEME_CODES
+from phoneme_interpreter_interface import PhonemeInterpreterInterface
+
+CHUNK_LINES = 2048
+CACHE_TOKENS = 1 << 16
+TOKEN = re.compile(r"[A-Za-z]+")
+
+def parse_token(token:str) -> bytes:
+    """The phoneme sequence token's key codes spell, or None if they do not spell one."""
+    codes, chars = bytearray(), ""
+    for char in token.lower():
+        chars += char
+        if chars in PHONEME_CODES:
+            codes.append(PHONEME_CODES[chars])
+            chars = ""
+        elif len(chars) > 1:
+            return None
+    return bytes(codes) if codes and not chars else None
+
+class Transcriber:
+    def __init__(self, interpreter:PhonemeInterpreterInterface, all_candidates:bool=False):
+        self.interpreter = interpreter
+        self.all_candidates = all_candidates
+        self.cache:dict[str, str] = {}
+
+    def token(self, token:str) -> str:
+        """The transcription of one run of letters. Natural text repeats its words, so they
+        are cached, and the cache is emptied whenever it grows past CACHE_TOKENS."""
+        out = self.cache.get(token)
+        if out is None:
+            key = parse_token(token)
+            words = self.interpreter.interpret(key) if key else None
+            if not words:
+                out = token
+            else:
+                if token[0].isupper():
+                    words = [word.capitalize() for word in words]
+                out = "|".join(words) if self.all_candidates else words[0]
+            if len(self.cache) >= CACHE_TOKENS:
+                self.cache.clear()
+            self.cache[token] = out
+        return out
+
+    def replace(self, match) -> str:
+        return self.token(match.group())
+
+    def line(self, line:str) -> str:
+        return TOKEN.sub(self.replace, line)
+
+    def lines(self, lines:list[str]) -> str:
+        return "".join([TOKEN.sub(self.replace, line) for line in lines])
+
+def chunks(lines, size:int=CHUNK_LINES):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def input_lines(filenames:list[str]):
+    if not filenames:
+        yield from open(sys.stdin.fileno(), encoding="UTF-8", errors="surrogateescape", closefd=False)
+    for filename in filenames:
+        with open(filename, encoding="UTF-8", errors="surrogateescape") as f:
+            yield from f
+
+worker_transcriber:Transcriber = None
+
+def default_interpreter(dictionary:str=None) -> PhonemeInterpreterInterface:
+    from dict_phoneme_interpreter import DictPhonemeInterpreter
+    from binary_dictionary import open_dictionary
+    return DictPhonemeInterpreter(dictionary=open_dictionary(dictionary) if dictionary else None)
+
+def init_worker(all_candidates:bool, dictionary:str) -> None:
+    global worker_transcriber
+    worker_transcriber = Transcriber(default_interpreter(dictionary), all_candidates)
+
+def transcribe_chunk(chunk:list[str]) -> str:
+    return worker_transcriber.lines(chunk)
+
+def transcribe(lines, output, transcriber:Transcriber=None, jobs:int=1, all_candidates:bool=False,
+               dictionary:str=None, chunk_lines:int=CHUNK_LINES) -> None:
+    """Writes the transcription of lines to output. With more than one job the chunks go to
+    a process pool, at most two per process in flight at a time."""
+    if jobs <= 1:
+        transcriber = transcriber or Transcriber(default_interpreter(dictionary), all_candidates)
+        for chunk in chunks(lines, chunk_lines):
+            output.write(transcriber.lines(chunk))
+        return
+    from multiprocessing import Pool
+    with Pool(jobs, initializer=init_worker, initargs=(all_candidates, dictionary)) as pool:
+        pending = deque()
+        for chunk in chunks(lines, chunk_lines):
+            if len(pending) >= 2*jobs:
+                output.write(pending.popleft().get())
+            pending.append(pool.apply_async(transcribe_chunk, (chunk,)))
+        while pending:
+            output.write(pending.popleft().get())
+
+def main(argv:list[str]=None, output=None) -> None:
+    parser = argparse.ArgumentParser(prog="nick transcribe", description="Transcribe phoneme-keyed text into words.")
+    parser.add_argument("files", nargs="*", help="files to transcribe, standard input if none are given")
+    parser.add_argument("-a", "--all", action="store_true", help="write every candidate, separated by |")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of processes to transcribe with")
+    parser.add_argument("--dictionary", help="the dictionary file, or shm:NAME for a shared memory segment")
+    parser.add_argument("--chunk-lines", type=int, default=CHUNK_LINES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if output is None:
+        output = open(sys.stdout.fileno(), "w", encoding="UTF-8", errors="surrogateescape", closefd=False)
+    try:
+        transcribe(input_lines(args.files), output, jobs=args.jobs, all_candidates=args.all,
+                   dictionary=args.dictionary, chunk_lines=args.chunk_lines)
+    finally:
+        output.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import io
+import os
+import tempfile
+import unittest
+from binary_dictionary import write_dictionary
+from build_dictionary import parse_cmudict
+from phonemes import PhonemeEnums
+from test_phoneme_interpreter import TestPhonemeInterpreter
+from transcribe import Transcriber, parse_token, transcribe, main
+
+CMUDICT = """\
+hi HH AY1
+high HH AY1
+home HH OW1 M
+""".splitlines()
+
+class TranscribeTest(unittest.TestCase):
+    def test_parse_token(self):
+        assert parse_token("hhai") == bytes([PhonemeEnums.h.value, PhonemeEnums.aɪ.value])
+        assert parse_token("h") is None
+        assert parse_token("hk") is None
+
+    def test_transcriber(self):
+        transcriber = Transcriber(TestPhonemeInterpreter())
+        assert transcriber.line("Hhai, hq h!\n") == "Fee, fee h!\n"
+        transcriber = Transcriber(TestPhonemeInterpreter(), all_candidates=True)
+        assert transcriber.line("f 12\n") == "fee|fie|foe|fum 12\n"
+
+    def test_streams_in_order_across_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dictionary.bin")
+            write_dictionary(parse_cmudict(CMUDICT), path)
+            lines = [f"{i} hhai hhaom xx\n" for i in range(1000)]
+            expected = "".join(f"{i} hi home xx\n" for i in range(1000))
+            output = io.StringIO()
+            transcribe(iter(lines), output, jobs=3, dictionary=path, chunk_lines=7)
+            assert output.getvalue() == expected
+
+            source = os.path.join(directory, "input.txt")
+            with open(source, "w") as f:
+                f.write("Hhai\n")
+            output = io.StringIO()
+            main(["--all", "--dictionary", path, source], output=output)
+            assert output.getvalue() == "Hi|High\n"
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
@@ -0,0 +1,103 @@
+"""
+The undo/redo log. Every change to the text is recorded as an Edit that replaced the
+removed text at a position with the inserted text, so an edit costs the size of the
+text it touched rather than a snapshot of the buffer. Runs of typed characters and
+of backspaces are coalesced into one edit, and the oldest edits are evicted once the
+log grows past its memory cap.
+"""
+
+from collections import deque
+
+EDIT_OVERHEAD = 128
+MAX_BYTES = 16 << 20
+
+def text_end(row:int, col:int, text:str) -> tuple[int, int]:
+    """The position just after text when it is inserted at row and col."""
+    newlines = text.count("\n")
+    if not newlines:
+        return row, col+len(text)
+    return row+newlines, len(text)-text.rfind("\n")-1
+
+class Edit:
+    """At row and col, removed was replaced with inserted; cursor is where the cursor was before."""
+    __slots__ = ("row", "col", "removed", "inserted", "cursor")
+
+    def __init__(self, row:int, col:int, removed:str, inserted:str, cursor:tuple[int, int]):
+        self.row = row
+        self.col = col
+        self.removed = removed
+        self.inserted = inserted
+        self.cursor = cursor
+
+    def __repr__(self) -> str:
+        return f"Edit({self.row=}, {self.col=}, {self.removed=}, {self.inserted=})"
+
+    def size(self) -> int:
+        return EDIT_OVERHEAD+len(self.removed)+len(self.inserted)
+
+    def coalesce(self, edit) -> bool:
+        """Merges a following edit into this one if both are typing, or both backspacing, on one line."""
+        if "\n" in self.inserted+self.removed+edit.inserted+edit.removed:
+            return False
+        if not self.removed and not edit.removed and text_end(self.row, self.col, self.inserted) == (edit.row, edit.col):
+            self.inserted += edit.inserted
+            return True
+        if not self.inserted and not edit.inserted and (edit.row, edit.col+len(edit.removed)) == (self.row, self.col):
+            self.removed = edit.removed+self.removed
+            self.col = edit.col
+            return True
+        return False
+
+class UndoHistory:
+    def __init__(self, max_bytes:int=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.undo_stack:deque[Edit] = deque()
+        self.redo_stack:list[Edit] = []
+        self.size = 0
+        self.sealed = True
+
+    def clear(self) -> None:
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+        self.sealed = True
+
+    def seal(self) -> None:
+        """Stops the next edit from being coalesced into the last one."""
+        self.sealed = True
+
+    def record(self, edit:Edit) -> None:
+        for undone in self.redo_stack:
+            self.size -= undone.size()
+        self.redo_stack.clear()
+        if not self.sealed and self.undo_stack:
+            last = self.undo_stack[-1]
+            before = last.size()
+            if last.coalesce(edit):
+                self.size += last.size()-before
+                self.evict()
+                return
+        self.undo_stack.append(edit)
+        self.size += edit.size()
+        self.sealed = False
+        self.evict()
+
+    def evict(self) -> None:
+        while self.size > self.max_bytes and len(self.undo_stack) > 1:
+            self.size -= self.undo_stack.popleft().size()
+
+    def pop_undo(self) -> Edit:
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        self.redo_stack.append(edit)
+        self.sealed = True
+        return edit
+
+    def pop_redo(self) -> Edit:
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        self.undo_stack.append(edit)
+        self.sealed = True
+        return edit
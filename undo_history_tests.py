@@ -0,0 +1,95 @@
+import unittest
+from model import WindowedLines
+from undo_history import UndoHistory, Edit, text_end, EDIT_OVERHEAD
+
+def text(model:WindowedLines) -> str:
+    return "\n".join(model.buffer.iter_lines())
+
+class UndoHistoryTest(unittest.TestCase):
+    def test_text_end(self):
+        assert text_end(2, 3, "abc") == (2, 6)
+        assert text_end(2, 3, "ab\ncd\ne") == (4, 1)
+        assert text_end(2, 3, "ab\n") == (3, 0)
+
+    def test_typing_coalesces(self):
+        model = WindowedLines(filename="")
+        for char in "hello world\nbye":
+            model.insert(char)
+        assert len(model.history.undo_stack) == 3
+        model.undo()
+        assert text(model) == "hello world\n"
+        model.undo()
+        model.undo()
+        assert text(model) == ""
+        model.undo()
+        model.redo()
+        model.redo()
+        assert text(model) == "hello world\n"
+        assert (model.cursor_row, model.cursor_position) == (1, 0)
+
+    def test_backspace_and_region(self):
+        model = WindowedLines(filename="")
+        for char in "one\ntwo\nthree":
+            model.insert(char)
+        model.delete()
+        model.delete()
+        assert len(model.history.undo_stack) == 6
+        model.undo()
+        assert text(model) == "one\ntwo\nthree"
+        assert (model.cursor_row, model.cursor_position) == (2, 5)
+        model.up()
+        model.set_mark()
+        model.up()
+        model.left()
+        model.delete()
+        assert text(model) == "on\nthree"
+        model.undo()
+        assert text(model) == "one\ntwo\nthree"
+        assert (model.cursor_row, model.cursor_position) == (0, 2)
+        model.redo()
+        assert text(model) == "on\nthree"
+
+    def test_moving_seals_coalescing(self):
+        model = WindowedLines(filename="")
+        for char in "abc":
+            model.insert(char)
+        model.left()
+        model.right()
+        model.insert("d")
+        assert len(model.history.undo_stack) == 2
+        model.undo()
+        assert text(model) == "abc"
+        model.delete()
+        model.left()
+        model.right()
+        model.delete()
+        assert len(model.history.undo_stack) == 3
+        model.putch(ord("e"))
+        model.set_mark()
+        model.clear_mark()
+        model.putch(ord("f"))
+        assert len(model.history.undo_stack) == 5
+        model.undo()
+        assert text(model) == "ae"
+
+    def test_new_edit_clears_redo(self):
+        model = WindowedLines(filename="")
+        model.insert("a")
+        model.undo()
+        model.insert("b")
+        model.redo()
+        assert text(model) == "b"
+        assert not model.history.redo_stack
+
+    def test_memory_cap_evicts_oldest(self):
+        history = UndoHistory(max_bytes=3*(EDIT_OVERHEAD+10))
+        for row in range(10):
+            history.record(Edit(row, 0, "", "x"*10, (row, 0)))
+        assert len(history.undo_stack) == 3
+        assert history.undo_stack[0].row == 7
+        assert history.size <= history.max_bytes
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
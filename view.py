@@ -1,15 +1,58 @@
 import curses
 from model import WindowedLines
 
+# attributes for each kind of syntax token on terminals without colours
+STYLES = {
+    "keyword": curses.A_BOLD,
+    "builtin": curses.A_BOLD,
+    "decorator": curses.A_BOLD,
+    "section": curses.A_BOLD,
+    "key": curses.A_BOLD,
+    "comment": curses.A_DIM,
+    "string": curses.A_NORMAL,
+    "number": curses.A_NORMAL,
+}
+
+COLORS = {
+    "keyword": curses.COLOR_MAGENTA,
+    "builtin": curses.COLOR_CYAN,
+    "decorator": curses.COLOR_CYAN,
+    "section": curses.COLOR_MAGENTA,
+    "key": curses.COLOR_CYAN,
+    "comment": curses.COLOR_BLUE,
+    "string": curses.COLOR_GREEN,
+    "number": curses.COLOR_YELLOW,
+}
+
+def color_styles() -> dict[str, int]:
+    """Colour pairs for each kind of syntax token, or STYLES if the terminal has no colours.
+    Must be called after curses.initscr()."""
+    if not curses.has_colors():
+        return STYLES
+    curses.start_color()
+    curses.use_default_colors()
+    styles = {}
+    for pair, (kind, color) in enumerate(COLORS.items(), 1):
+        curses.init_pair(pair, color, -1)
+        styles[kind] = curses.color_pair(pair)
+    return styles
+
 class View:
-    def __init__(self, window:curses.window):
+    def __init__(self, window:curses.window, doupdate=curses.doupdate, styles:dict[str, int]=STYLES):
         self.window = window
+        self.styles = styles
         self.phoneme_panel:curses.window = None
+        self.doupdate = doupdate
+
+        self.rows_redrawn = 0
+        self.cells_redrawn = 0
+        self.last_rows_redrawn = 0
+        self.last_cells_redrawn = 0
 
     def toggle_panel(self, model:WindowedLines) -> curses.window:
-        if model.get_phoneme_mode():
-            self.phoneme_panel = self.window.subwin(self.window.getmaxyx()[0]-5, 0)
-            self.phoneme_panel.refresh()
+        if model.panel_visible():
+            if not self.phoneme_panel:
+                self.phoneme_panel = self.window.subwin(self.window.getmaxyx()[0]-5, 0)
         else:
             self.phoneme_panel = None
         return self.phoneme_panel
@@ -20,13 +63,33 @@ class View:
 
     def update_panel(self, text:str):
         if self.phoneme_panel:
-            self.phoneme_panel.addstr(text)
-            self.phoneme_panel.refresh()
+            rows, cols = self.phoneme_panel.getmaxyx()
+            self.phoneme_panel.erase()
+            for row, line in enumerate(text.split("\n")[:rows]):
+                self.phoneme_panel.move(row, 0)
+                self.phoneme_panel.addstr(line[:cols-1])
+            self.phoneme_panel.noutrefresh()
+
+    def redraw_rows(self, model:WindowedLines) -> None:
+        """Redraws only the window rows the model reports as damaged."""
+        rows = model.take_damage()
+        for row in rows:
+            self.window.move(row, 0)
+            self.window.addstr(model.window_row(row))
+            self.window.clrtoeol()
+            for x, width, kind in model.window_styles(row):
+                self.window.chgat(row, x, width, self.styles.get(kind, curses.A_NORMAL))
+            for x, width in model.window_highlights(row):
+                self.window.chgat(row, x, width, curses.A_REVERSE)
+        self.last_rows_redrawn = len(rows)
+        self.last_cells_redrawn = len(rows)*model.window_size[1]
+        self.rows_redrawn += self.last_rows_redrawn
+        self.cells_redrawn += self.last_cells_redrawn
 
     def update(self, model:WindowedLines):
-        self.window.erase()
-        self.window.addstr(model.print_window())
-        self.window.move(len(model.prev_lines)-model.top_window_row,min(model.cursor_position, model.window_size[1]))
-        self.window.refresh()
-        self.update_panel(text=model.get_panel_text())
-        self.toggle_panel(model=model)
+        self.redraw_rows(model=model)
+        if self.toggle_panel(model=model):
+            self.update_panel(text=model.get_panel_text())
+        self.window.move(*model.cursor_window_position())
+        self.window.noutrefresh()
+        self.doupdate()
@@ -0,0 +1,77 @@
+import unittest
+from model import WindowedLines
+from view import View
+from headless import HeadlessWindow
+
+class ViewTest(unittest.TestCase):
+    def setUp(self):
+        self.window = HeadlessWindow(4, 11)
+        self.view = View(window=self.window, doupdate=lambda: None)
+        self.model = WindowedLines(filename="", window_size=(4, 10))
+        for char in "one\ntwo\nthree":
+            self.model.insert(char)
+
+    def test_first_update_draws_everything(self):
+        self.view.update(model=self.model)
+        assert self.view.last_rows_redrawn == 4
+        assert [line.rstrip() for line in self.window.lines] == ["one", "two", "three", ""]
+
+    def test_keystroke_redraws_one_row(self):
+        self.view.update(model=self.model)
+        self.model.insert("!")
+        self.view.update(model=self.model)
+        assert self.view.last_rows_redrawn == 1
+        assert self.view.last_cells_redrawn == 10
+        self.model.left()
+        self.view.update(model=self.model)
+        assert self.view.last_rows_redrawn == 0
+        assert self.window.lines[2].rstrip() == "three!"
+
+    def test_new_line_redraws_rows_below(self):
+        self.view.update(model=self.model)
+        self.model.up()
+        self.model.insert("\n")
+        self.view.update(model=self.model)
+        assert self.view.last_rows_redrawn == 3
+        assert [line.rstrip() for line in self.window.lines] == ["one", "two", "", "three"]
+        self.model.delete()
+        self.view.update(model=self.model)
+        assert [line.rstrip() for line in self.window.lines] == ["one", "two", "three", ""]
+
+    def test_scroll_redraws_everything(self):
+        self.view.update(model=self.model)
+        for char in "\nfour\nfive":
+            self.model.insert(char)
+        self.view.update(model=self.model)
+        assert self.model.top_window_row > 0
+        assert self.view.last_rows_redrawn == 4
+        assert [line.rstrip() for line in self.window.lines] == [line.rstrip() for line in self.model.print_window().split("\n")]
+
+    def test_soft_wrap(self):
+        self.model.insert_text(" and a long tail")
+        self.model.toggle_wrap()
+        self.view.update(model=self.model)
+        assert [line.rstrip() for line in self.window.lines] == ["two", "three and", "a long", "tail"]
+        assert (self.window.y, self.window.x) == (3, 4)
+        self.model.up()
+        self.model.up()
+        assert (self.model.cursor_row, self.model.cursor_position) == (2, 4)
+        self.model.up()
+        self.model.up()
+        self.view.update(model=self.model)
+        assert self.model.top_window_row == 0 and self.window.lines[0].rstrip() == "one"
+        assert (self.window.y, self.window.x) == (0, 3)
+        self.model.down()
+        self.model.down()
+        self.model.insert("x")
+        self.view.update(model=self.model)
+        assert self.view.last_rows_redrawn == 2
+        assert [line.rstrip() for line in self.window.lines] == ["one", "two", "threxe", "and a"]
+        self.model.toggle_wrap()
+        self.view.update(model=self.model)
+        assert self.window.lines[2].rstrip() == "threxe and"
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")
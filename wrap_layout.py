@@ -0,0 +1,110 @@
+"""
+The layout of buffer lines soft-wrapped into visual rows of at most width columns. A line
+breaks after the last space that fits on a row, or at the width if there is none. Given
+a DisplayWidths, columns are counted as drawn, so wide characters and tabs fit too. The
+start column of each visual row of a line is cached, and a line's entry is dropped only
+when the line is edited or the width changes, so scrolling and moving the cursor through
+long lines costs a bisection per line rather than a scan of it.
+
+Positions in the layout are (row, sub) pairs: a buffer row and a visual row within it.
+"""
+
+from bisect import bisect_right
+from line_cache import LineCache
+
+class WrapLayout:
+    def __init__(self, buffer, width:int, widths=None):
+        self.buffer = buffer
+        self.widths = widths
+        self.width = max(width, 1)
+        self.cache = LineCache()
+
+    def resize(self, width:int) -> None:
+        if max(width, 1) != self.width:
+            self.width = max(width, 1)
+            self.cache.clear()
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def invalidate(self, row:int) -> None:
+        self.cache.invalidate(row)
+
+    def invalidate_from(self, row:int) -> None:
+        self.cache.invalidate_from(row)
+
+    def starts(self, row:int) -> list[int]:
+        """The column at which each visual row of the line at row starts."""
+        starts = self.cache.get(row)
+        if starts is None:
+            line = self.buffer.get_line(row)
+            columns = self.widths.prefix(row) if self.widths else None
+            starts = [0]
+            start, width = 0, self.width
+            if columns is None:
+                while len(line)-start > width:
+                    space = line.rfind(" ", start, start+width)
+                    start = space+1 if space >= start else start+width
+                    starts.append(start)
+            else:
+                while columns[-1]-columns[start] > width:
+                    fits = max(bisect_right(columns, columns[start]+width)-1, start+1)
+                    space = line.rfind(" ", start, fits)
+                    start = space+1 if space >= start else fits
+                    starts.append(start)
+            self.cache.put(row, starts)
+        return starts
+
+    def sub_row(self, row:int, col:int) -> int:
+        """The visual row within the line at row that shows col."""
+        return bisect_right(self.starts(row), col)-1
+
+    def span(self, row:int, sub:int) -> tuple[int, int]:
+        """The start and end columns of a visual row."""
+        starts = self.starts(row)
+        end = starts[sub+1] if sub+1 < len(starts) else len(self.buffer.get_line(row))
+        return starts[sub], end
+
+    def step(self, row:int, sub:int, count:int) -> tuple[int, int]:
+        """The position count visual rows after (row, sub), or before it if count is
+        negative, stopping at the start or end of the buffer."""
+        while count > 0:
+            if sub+1 < len(self.starts(row)):
+                sub += 1
+            elif self.buffer.has_line(row+1):
+                row, sub = row+1, 0
+            else:
+                break
+            count -= 1
+        while count < 0:
+            if sub > 0:
+                sub -= 1
+            elif row > 0:
+                row -= 1
+                sub = len(self.starts(row))-1
+            else:
+                break
+            count += 1
+        return row, sub
+
+    def distance(self, start:tuple[int, int], end:tuple[int, int], limit:int) -> int:
+        """How many visual rows end is after start, or limit if it is limit or more rows
+        after it. Negative if end is before start."""
+        if end < start:
+            return -1
+        count = 0
+        while start < end and count < limit:
+            start = self.step(*start, 1)
+            count += 1
+        return count
+
+    def visual_rows(self, row:int, sub:int, count:int) -> list[tuple[int, int, int]]:
+        """(row, start, end) for up to count visual rows from (row, sub) down."""
+        rows = []
+        while len(rows) < count and self.buffer.has_line(row):
+            starts = self.starts(row)
+            while sub < len(starts) and len(rows) < count:
+                rows.append((row, *self.span(row, sub)))
+                sub += 1
+            row, sub = row+1, 0
+        return rows
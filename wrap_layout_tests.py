@@ -0,0 +1,44 @@
+import unittest
+from list_text_buffer import ListTextBuffer
+from wrap_layout import WrapLayout
+
+class WrapLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.buffer = ListTextBuffer()
+        self.buffer.load(b"aaaa bbbb cccc\nabcdefghij\n\nend")
+        self.layout = WrapLayout(self.buffer, 6)
+
+    def test_starts(self):
+        assert self.layout.starts(0) == [0, 5, 10]
+        assert self.layout.starts(1) == [0, 6]
+        assert self.layout.starts(2) == [0]
+        assert self.layout.span(0, 1) == (5, 10)
+        assert self.layout.span(1, 1) == (6, 10)
+        assert self.layout.sub_row(0, 4) == 0 and self.layout.sub_row(0, 5) == 1 and self.layout.sub_row(0, 14) == 2
+
+    def test_walking_visual_rows(self):
+        assert self.layout.step(0, 0, 4) == (1, 1)
+        assert self.layout.step(1, 1, -3) == (0, 1)
+        assert self.layout.step(0, 1, -5) == (0, 0)
+        assert self.layout.step(2, 0, 9) == (3, 0)
+        assert self.layout.distance((0, 1), (2, 0), 10) == 4
+        assert self.layout.distance((0, 1), (2, 0), 2) == 2
+        assert self.layout.distance((2, 0), (0, 1), 10) == -1
+        assert self.layout.visual_rows(0, 2, 3) == [(0, 10, 14), (1, 0, 6), (1, 6, 10)]
+
+    def test_invalidation(self):
+        self.layout.starts(0)
+        self.layout.starts(3)
+        self.buffer.set_line(0, "short")
+        assert self.layout.starts(0) == [0, 5, 10]
+        self.layout.invalidate(0)
+        assert self.layout.starts(0) == [0]
+        self.layout.invalidate_from(1)
+        assert list(self.layout.cache) == [0]
+        self.layout.resize(3)
+        assert not self.layout.cache and self.layout.starts(0) == [0, 3]
+
+
+if __name__ == '__main__':
+    unittest.main()
+    print("All tests pass\n")